@@ -1,5 +1,6 @@
 import React, { useState, useRef, useEffect } from 'react';
 import { motion, AnimatePresence } from 'framer-motion';
+import { getSessionId, authHeaders } from '../session';
 
 const ChatAssistant = () => {
     const [isOpen, setIsOpen] = useState(false);
@@ -37,23 +38,64 @@ const ChatAssistant = () => {
                 content: m.content
             })).concat(userMessage);
 
-            const response = await fetch('http://localhost:8000/api/chat', {
+            // Stream the reply over Server-Sent Events so tokens show up as they are generated
+            const response = await fetch('http://localhost:8000/api/chat/stream', {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json',
+                    ...authHeaders(),
                 },
-                body: JSON.stringify({ history }),
+                body: JSON.stringify({ history, session_id: getSessionId() }),
             });
 
-            const data = await response.json();
-            const aiResponse = data.response;
+            if (!response.ok || !response.body) {
+                throw new Error(`Chat request failed with status ${response.status}`);
+            }
 
-            setMessages(prev => [...prev, {
-                role: 'assistant',
-                content: aiResponse.content,
-                type: aiResponse.type || 'text',
-                data: aiResponse.data
-            }]);
+            // The first event appends the assistant bubble, later ones update it in place
+            let started = false;
+            const updateReply = (patch) => {
+                const isFirst = !started;
+                started = true;
+                setMessages(prev => {
+                    if (isFirst) {
+                        return [...prev, { role: 'assistant', content: '', type: 'text', data: null, ...patch({ content: '' }) }];
+                    }
+                    const last = prev[prev.length - 1];
+                    return [...prev.slice(0, -1), { ...last, ...patch(last) }];
+                });
+            };
+
+            const reader = response.body.getReader();
+            const decoder = new TextDecoder();
+            let buffer = '';
+
+            while (true) {
+                const { value, done } = await reader.read();
+                if (done) break;
+                buffer += decoder.decode(value, { stream: true });
+
+                const frames = buffer.split('\n\n');
+                buffer = frames.pop();
+                for (const frame of frames) {
+                    const event = frame.match(/^event: (.*)$/m)?.[1];
+                    const payload = frame.match(/^data: (.*)$/m)?.[1];
+                    if (!event || !payload) continue;
+                    const data = JSON.parse(payload);
+
+                    if (event === 'token') {
+                        updateReply(last => ({ content: last.content + data.content }));
+                    } else if (event === 'status') {
+                        updateReply(() => ({ content: data.content }));
+                    } else if (event === 'message' || event === 'search_results' || event === 'error') {
+                        updateReply(() => ({
+                            content: data.content,
+                            type: data.type || 'text',
+                            data: data.data
+                        }));
+                    }
+                }
+            }
         } catch (error) {
             console.error('Chat Error:', error);
             setMessages(prev => [...prev, { role: 'assistant', content: "Sorry, I'm having trouble connecting to the server. Please ensure the backend is running." }]);
@@ -1,5 +1,6 @@
 import React, { useState } from 'react';
 import { Search, MapPin, Code, Star, CheckCircle, Loader, Github, Linkedin, Award } from 'lucide-react';
+import { getSessionId, authHeaders } from '../session';
 
 const Dashboard = () => {
     const [searchTerm, setSearchTerm] = useState("");
@@ -17,11 +18,12 @@ const Dashboard = () => {
         try {
             const response = await fetch(`http://localhost:8000/api/find-nearby`, {
                 method: 'POST',
-                headers: { 'Content-Type': 'application/json' },
+                headers: { 'Content-Type': 'application/json', ...authHeaders() },
                 body: JSON.stringify({
                     username: githubUsername,
                     skill: searchTerm,
-                    manual_location: manualLocation
+                    manual_location: manualLocation,
+                    session_id: getSessionId()
                 })
             });
             const data = await response.json();
@@ -44,7 +46,8 @@ const Dashboard = () => {
             setSearched(true);
             try {
                 // Fetch from our backend
-                const response = await fetch(`http://localhost:8000/api/search?query=${searchTerm}`);
+                const params = new URLSearchParams({ query: searchTerm, session_id: getSessionId() });
+                const response = await fetch(`http://localhost:8000/api/search?${params}`, { headers: authHeaders() });
                 const data = await response.json();
                 setCandidates(data.candidates);
             } catch (error) {
@@ -1,6 +1,7 @@
 import React, { useState, useEffect } from 'react';
 import { motion, AnimatePresence } from 'framer-motion';
 import { Search, Sparkles, User, Briefcase, Code, MapPin, Sliders, ExternalLink, Filter, X, CheckCircle, Github } from 'lucide-react';
+import { getSessionId, authHeaders } from '../session';
 
 const SearchPage = () => {
     const [query, setQuery] = useState('');
@@ -16,7 +17,8 @@ const SearchPage = () => {
             setIsLoading(true);
             try {
                 // In production, use environment variable for API URL
-                const response = await fetch(`http://localhost:8000/api/search?query=${query}`);
+                const params = new URLSearchParams({ query, session_id: getSessionId() });
+                const response = await fetch(`http://localhost:8000/api/search?${params}`, { headers: authHeaders() });
                 const data = await response.json();
                 setResults(data.candidates);
             } catch (error) {
@@ -0,0 +1,16 @@
+// One id per browser tab, so each tab pages through search results on its
+// own; the server scopes it to the signed-in user.
+export const getSessionId = () => {
+    let id = sessionStorage.getItem('sessionId');
+    if (!id) {
+        id = crypto.randomUUID();
+        sessionStorage.setItem('sessionId', id);
+    }
+    return id;
+};
+
+// Bearer header for the stored token, if signed in
+export const authHeaders = () => {
+    const token = localStorage.getItem('token');
+    return token ? { 'Authorization': `Bearer ${token}` } : {};
+};
@@ -1,18 +1,372 @@
 import random
-import ollama
 import json
+import os
+import asyncio
+import hashlib
+import uuid
+from contextlib import asynccontextmanager
+from caching import TTLCache, SingleFlight
+from app_logging import get_logger
+from metrics import upstream_call
 
-def calculate_match_score(candidate_profile, job_requirements):
+log = get_logger("ai_engine")
+
+OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "llama3.2:3b")
+# At most this many generations run at once; others wait in a short queue
+INFERENCE_CONCURRENCY = int(os.getenv("INFERENCE_CONCURRENCY", "2"))
+# Callers beyond this many waiters are rejected immediately
+INFERENCE_MAX_QUEUE = int(os.getenv("INFERENCE_MAX_QUEUE", "8"))
+# Seconds a single Ollama call may take before it is abandoned
+INFERENCE_TIMEOUT = float(os.getenv("INFERENCE_TIMEOUT", "60"))
+# Embedding calls get their own slots so searches never queue behind chat generations
+EMBED_CONCURRENCY = int(os.getenv("EMBED_CONCURRENCY", "2"))
+# Approximate prompt tokens per chat turn, system prompt included
+CHAT_HISTORY_TOKEN_BUDGET = int(os.getenv("CHAT_HISTORY_TOKEN_BUDGET", "1500"))
+# Rolling summaries of folded turns, per conversation id
+CHAT_SUMMARY_MAX_CHARS = int(os.getenv("CHAT_SUMMARY_MAX_CHARS", "2000"))
+CHAT_SUMMARY_MAX_ENTRIES = int(os.getenv("CHAT_SUMMARY_MAX_ENTRIES", "1024"))
+CHAT_SUMMARY_TTL = float(os.getenv("CHAT_SUMMARY_TTL", "3600"))
+# Summaries wait for an idle model; after this many seconds the excerpts are kept as they are
+CHAT_SUMMARY_MAX_DELAY = float(os.getenv("CHAT_SUMMARY_MAX_DELAY", "120"))
+# Generated mock profiles per (skill, location), bounded by count and size
+MOCK_POOL_SIZE = int(os.getenv("MOCK_POOL_SIZE", "6"))
+MOCK_POOL_TTL = float(os.getenv("MOCK_POOL_TTL", str(24 * 3600)))
+MOCK_POOL_MAX_ENTRIES = int(os.getenv("MOCK_POOL_MAX_ENTRIES", "256"))
+MOCK_POOL_MAX_BYTES = int(os.getenv("MOCK_POOL_MAX_BYTES", str(4 * 1024 * 1024)))
+# Pools generated in the background while the model is idle
+MOCK_PREWARM_ENABLED = os.getenv("MOCK_PREWARM_ENABLED", "true").lower() in ("1", "true", "yes")
+MOCK_PREWARM_SKILLS = [s.strip() for s in os.getenv("MOCK_PREWARM_SKILLS", "Python,React,Java,Go,Machine Learning").split(",") if s.strip()]
+MOCK_PREWARM_LOCATIONS = [s.strip() for s in os.getenv("MOCK_PREWARM_LOCATIONS", "Remote,London,New York,Bangalore").split(",") if s.strip()]
+
+class InferenceOverloaded(Exception):
+    """
+    Raised when the inference queue is full; callers should answer 503.
+    """
+
+class InferencePool:
+    """
+    Runs Ollama calls on the async client so the event loop keeps serving
+    other requests, with a concurrency cap and a bounded wait queue.
+    """
+
+    def __init__(self, concurrency=INFERENCE_CONCURRENCY, max_queue=INFERENCE_MAX_QUEUE, timeout=INFERENCE_TIMEOUT,
+                 embed_concurrency=EMBED_CONCURRENCY):
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.embed_concurrency = embed_concurrency
+        self.waiting = 0
+        self.running = 0
+        self.embed_waiting = 0
+        self.embed_running = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._embed_semaphore = asyncio.Semaphore(embed_concurrency)
+        self._client = None
+
+    @staticmethod
+    def _build_client():
+        # Imported on first use so importing the app does not load the Ollama client
+        import ollama
+        return ollama.AsyncClient()
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = self._build_client()
+        return self._client
+
+    async def warm(self):
+        """
+        Imports ollama and builds the client on a worker thread, so the
+        first chat or search does not pay for it on the event loop. Makes
+        no request to Ollama.
+        """
+        if self._client is None:
+            client = await asyncio.to_thread(self._build_client)
+            if self._client is None:
+                self._client = client
+
+    def check_admission(self):
+        """
+        Raises InferenceOverloaded if a new caller would exceed the queue.
+        """
+        if self._semaphore.locked() and self.waiting >= self.max_queue:
+            self.rejected += 1
+            raise InferenceOverloaded(f"{self.waiting} inference requests already queued")
+
+    @asynccontextmanager
+    async def slot(self):
+        """
+        Holds one inference slot for the duration of the block.
+        """
+        self.check_admission()
+        self.waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        self.running += 1
+        try:
+            yield self.client
+        finally:
+            self.running -= 1
+            self._semaphore.release()
+
+    def idle(self):
+        return not self.running and not self.waiting
+
+    async def wait_idle(self, timeout=None, poll=1.0):
+        """
+        Waits until no generation is running or queued, so background work
+        only takes a slot no user is waiting for. Returns False if `timeout`
+        seconds pass first.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        while not self.idle():
+            if deadline is not None and loop.time() >= deadline:
+                return False
+            await asyncio.sleep(poll)
+        return True
+
+    async def chat(self, messages, timeout=None, **kwargs):
+        async with self.slot() as client:
+            try:
+                with upstream_call("ollama", "chat"):
+                    return await asyncio.wait_for(
+                        client.chat(model=OLLAMA_MODEL, messages=messages, **kwargs),
+                        timeout or self.timeout,
+                    )
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+                raise
+
+    async def embed(self, model, texts, timeout=None):
+        """
+        Embeds a batch of texts in one call; returns one vector per text.
+        Uses the embedding slots, not the chat ones, and `timeout` covers
+        the wait for a slot as well as the call itself.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + (timeout or self.timeout)
+        self.embed_waiting += 1
+        try:
+            await asyncio.wait_for(self._embed_semaphore.acquire(), deadline - loop.time())
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise
+        finally:
+            self.embed_waiting -= 1
+        self.embed_running += 1
+        try:
+            with upstream_call("ollama", "embed"):
+                response = await asyncio.wait_for(
+                    self.client.embed(model=model, input=texts), max(deadline - loop.time(), 0.001)
+                )
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise
+        finally:
+            self.embed_running -= 1
+            self._embed_semaphore.release()
+        return response["embeddings"]
+
+    def stats(self):
+        return {
+            "concurrency": self.concurrency,
+            "running": self.running,
+            "waiting": self.waiting,
+            "embed_concurrency": self.embed_concurrency,
+            "embed_running": self.embed_running,
+            "embed_waiting": self.embed_waiting,
+            "rejected": self.rejected,
+            "timeouts": self.timeouts,
+        }
+
+INFERENCE_POOL = InferencePool()
+
+SUMMARY_PROMPT = """
+    Summarize this earlier part of a conversation between a recruiter and
+    Trace, an AI talent assistant, in a few short sentences. Keep the roles,
+    skills, locations, candidates and searches that were discussed.
+    """
+
+def estimate_tokens(text):
+    # Roughly four characters per token for English text
+    return len(str(text or "")) // 4 + 1
+
+def _message_tokens(message):
+    return estimate_tokens(message.get("content")) + 4  # Role and framing
+
+def _fingerprint(messages):
+    return hashlib.sha1(
+        json.dumps([[m.get("role"), m.get("content")] for m in messages], default=str).encode()
+    ).hexdigest()
+
+def _excerpts(messages, per_message=300):
+    lines = []
+    for message in messages:
+        text = " ".join(str(message.get("content") or "").split())
+        if len(text) > per_message:
+            text = text[:per_message - 3] + "..."
+        lines.append(f"{'User' if message.get('role') == 'user' else 'Assistant'}: {text}")
+    return "\n".join(lines)
+
+# Per-turn model latency is bucketed by conversation length, in messages
+_LENGTH_BUCKETS = ((4, "1-4"), (16, "5-16"), (64, "17-64"), (None, "65+"))
+
+class ConversationWindow:
+    """
+    Fits chat history into a token budget. The system prompt and the newest
+    turns go to the model verbatim; older turns are folded into a rolling
+    summary, capped at a quarter of the budget and cached per conversation
+    id (the caller's user-scoped session key). Newly folded turns are added
+    as short excerpts and the model condenses the summary in the background
+    while it is otherwise idle, so no request waits on summarization.
+    """
+
+    def __init__(self, budget=CHAT_HISTORY_TOKEN_BUDGET, max_entries=CHAT_SUMMARY_MAX_ENTRIES, ttl=CHAT_SUMMARY_TTL):
+        self.budget = budget
+        self.summary_chars = min(CHAT_SUMMARY_MAX_CHARS, budget)  # ~budget / 4 tokens
+        self.summaries = TTLCache(max_entries=max_entries, max_bytes=None, ttl=ttl)
+        self._tasks = {}  # conversation id -> background summarization
+        self.folds = 0
+        self.summarized = 0
+        self.summary_errors = 0
+        self.summary_skipped = 0
+        self.turns = 0
+        self.history_tokens_total = 0
+        self.prompt_tokens_total = 0
+        self.latency = {label: [0, 0.0] for _, label in _LENGTH_BUCKETS}  # label -> [turns, total ms]
+
+    def _split(self, history, budget):
+        """
+        Index where the verbatim tail starts: the newest messages that fit
+        `budget`, and always at least the last one.
+        """
+        used = 0
+        for i in range(len(history) - 1, -1, -1):
+            used += _message_tokens(history[i])
+            if used > budget and i < len(history) - 1:
+                return i + 1
+        return 0
+
+    def _cached(self, conversation_id, history):
+        entry = self.summaries.get(conversation_id)
+        # A client that edited or restarted the conversation gets a fresh summary
+        if entry and entry["covered"] < len(history) and entry["fingerprint"] == _fingerprint(history[:entry["covered"]]):
+            return entry
+        return None
+
+    def build(self, history, system_prompt, conversation_id):
+        """
+        Returns the messages to send to the model for this turn.
+        """
+        budget = self.budget - estimate_tokens(system_prompt)
+        entry = self._cached(conversation_id, history)
+        covered, summary = (entry["covered"], entry["summary"]) if entry else (0, "")
+        if covered == 0 and self._split(history, budget) == 0:
+            return [{'role': 'system', 'content': system_prompt}] + history
+
+        budget -= estimate_tokens("x" * self.summary_chars)
+        split = self._split(history, budget)
+        if split > covered:
+            # Fold down to half the budget so the next few turns reuse this summary
+            split = max(split, self._split(history, budget // 2))
+            summary = f"{summary}\n{_excerpts(history[covered:split])}".strip()[-self.summary_chars:]
+            fingerprint = _fingerprint(history[:split])
+            self.summaries.set(conversation_id, {"covered": split, "fingerprint": fingerprint, "summary": summary})
+            self.folds += 1
+            self._summarize_later(conversation_id, fingerprint, summary)
+        else:
+            split = covered
+
+        messages = [{'role': 'system', 'content': system_prompt}]
+        if split:
+            messages.append({'role': 'system', 'content': f"Summary of the earlier conversation:\n{summary}"})
+        return messages + history[split:]
+
+    def _summarize_later(self, conversation_id, fingerprint, text):
+        """
+        Condenses a freshly folded summary with the model, off the request
+        path and only while no chat is running or queued.
+        """
+        if conversation_id in self._tasks:
+            return
+
+        async def run():
+            try:
+                if not await INFERENCE_POOL.wait_idle(timeout=CHAT_SUMMARY_MAX_DELAY):
+                    self.summary_skipped += 1
+                    return
+                response = await INFERENCE_POOL.chat([
+                    {'role': 'system', 'content': SUMMARY_PROMPT},
+                    {'role': 'user', 'content': text},
+                ])
+                summary = response['message']['content'].strip()[:self.summary_chars]
+                current = self.summaries.peek(conversation_id)
+                # Drop the result if the conversation was folded again meanwhile
+                if summary and current is not None and current["fingerprint"] == fingerprint:
+                    self.summaries.set(conversation_id, {**current, "summary": summary})
+                    self.summarized += 1
+            except Exception as e:
+                self.summary_errors += 1
+                log.warning("chat_summary_failed", conversation_id=conversation_id, error=str(e))
+            finally:
+                self._tasks.pop(conversation_id, None)
+
+        self._tasks[conversation_id] = asyncio.create_task(run())
+
+    async def close(self):
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def record(self, history, messages, elapsed_ms):
+        """
+        Records one model turn's latency against the conversation length.
+        """
+        self.turns += 1
+        self.history_tokens_total += sum(_message_tokens(m) for m in history)
+        self.prompt_tokens_total += sum(_message_tokens(m) for m in messages)
+        label = next(label for limit, label in _LENGTH_BUCKETS if limit is None or len(history) <= limit)
+        self.latency[label][0] += 1
+        self.latency[label][1] += elapsed_ms
+
+    def stats(self):
+        return {
+            "budget": self.budget,
+            "turns": self.turns,
+            "history_tokens_avg": round(self.history_tokens_total / self.turns) if self.turns else None,
+            "prompt_tokens_avg": round(self.prompt_tokens_total / self.turns) if self.turns else None,
+            "folds": self.folds,
+            "summarized": self.summarized,
+            "summary_errors": self.summary_errors,
+            "summary_skipped": self.summary_skipped,
+            "summarizing": len(self._tasks),
+            "summaries": len(self.summaries),
+            "latency_ms_by_length": {
+                label: round(total / turns, 1) for label, (turns, total) in self.latency.items() if turns
+            },
+        }
+
+CONVERSATION_WINDOW = ConversationWindow()
+
+def calculate_match_score(candidate_profile, job_requirements, deterministic=False):
     """
     Mock AI function to calculate match score.
     Returns a score between 0-100 and a reason.
+    deterministic=True skips the random adjustment so results can be cached.
     """
     # Simple keyword matching for prototype
     matched_skills = [s for s in candidate_profile.get('skills', []) if s in job_requirements.get('skills', [])]
     base_score = len(matched_skills) * 20
     
     # Add some "AI" randomness/nuance
-    ai_adjustment = random.randint(-5, 15)
+    ai_adjustment = 0 if deterministic else random.randint(-5, 15)
     final_score = min(100, max(0, base_score + ai_adjustment))
     
     return {
@@ -35,63 +389,173 @@ def analyze_interview_response(response_text):
         "feedback": feedback
     }
 
-def generate_mock_candidates(skill, location, count=3):
+# Ollama structured output: generation is constrained to this JSON schema
+MOCK_CANDIDATES_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "candidates": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "name": {"type": "string"},
+                    "role": {"type": "string"},
+                    "bio": {"type": "string"},
+                    "skills": {"type": "array", "items": {"type": "string"}},
+                    "experience": {"type": "string"},
+                    "score": {"type": "integer"},
+                },
+                "required": ["name", "role", "bio", "skills", "experience", "score"],
+            },
+        },
+    },
+    "required": ["candidates"],
+}
+
+def _fallback_candidates(skill, location):
+    # Fallback static data if LLM explodes
+    return [
+         {
+            "id": 9991, 
+            "name": "AI Generated Dev", 
+            "role": f"{skill} Specialist",
+            "bio": f"Expert in {skill} based in {location}",
+            "location": location,
+            "skills": [skill, "System Design", "Cloud"],
+            "score": 85,
+            "verified": True,
+            "image": "https://api.dicebear.com/7.x/avataaars/svg?seed=AI"
+        }
+    ]
+
+def _pool_key(skill, location):
+    return (" ".join(str(skill).lower().split()), " ".join(str(location).lower().split()))
+
+class MockCandidatePool:
     """
-    Generates realistic mock candidates using local LLM when external APIs fail.
+    Caches LLM-generated mock profiles per normalized (skill, location).
+    Generation uses Ollama's JSON-schema output, so replies parse without
+    markdown stripping; identical concurrent misses share one generation.
+    A background worker pre-generates pools for common skills and
+    locations whenever the inference pool is idle.
     """
-    prompt = f"""
+
+    def __init__(self, size=MOCK_POOL_SIZE, ttl=MOCK_POOL_TTL, max_entries=MOCK_POOL_MAX_ENTRIES, max_bytes=MOCK_POOL_MAX_BYTES):
+        self.size = size
+        self.ttl = ttl
+        self.pools = TTLCache(max_entries=max_entries, max_bytes=max_bytes, ttl=ttl)
+        self.flights = SingleFlight()
+        self.generated = 0
+        self.failures = 0
+        self.prewarmed = 0
+        self._worker = None
+
+    async def _generate(self, skill, location, count):
+        prompt = f"""
     Generate {count} realistic developer profiles for a {skill} expert based in {location}.
-    Return ONLY a JSON array. Each object must have:
-    - id: random integer
-    - name: realistic name
-    - role: e.g. "Senior {skill} Engineer"
-    - bio: short professional tagline (max 10 words)
-    - skills: list of 3-5 relevant skills
-    - experience: e.g. "4 years"
-    - location: "{location}"
-    - image: "https://api.dicebear.com/7.x/avataaars/svg?seed=" + name
-    - score: integer between 75 and 98
-    - verified: boolean (true)
-    
-    JSON format only. No markdown.
+    Each profile has a realistic name, a role such as "Senior {skill} Engineer",
+    a short professional bio (max 10 words), 3-5 relevant skills, experience
+    such as "4 years", and a score between 75 and 98.
     """
-    
-    try:
-        response = ollama.chat(model='llama3.2:3b', messages=[
-            {'role': 'user', 'content': prompt},
-        ])
-        
-        content = response['message']['content']
-        # Clean potential markdown code blocks
-        content = content.replace("```json", "").replace("```", "").strip()
-        
-        candidates = json.loads(content)
-        return candidates
-    except Exception as e:
-        print(f"LLM Generation Failed: {e}")
-        # Fallback static data if LLM explodes
-        return [
-             {
-                "id": 9991, 
-                "name": "AI Generated Dev", 
-                "role": f"{skill} Specialist",
-                "bio": f"Expert in {skill} based in {location}",
+        response = await INFERENCE_POOL.chat(
+            [{'role': 'user', 'content': prompt}],
+            format=MOCK_CANDIDATES_SCHEMA,
+        )
+        profiles = json.loads(response['message']['content'])["candidates"]
+        candidates = [
+            {
+                "id": random.randint(10000, 99999),
+                "name": p["name"],
+                "role": p["role"],
+                "bio": p["bio"],
+                "skills": list(p["skills"])[:5],
+                "experience": p["experience"],
                 "location": location,
-                "skills": [skill, "System Design", "Cloud"],
-                "score": 85,
+                "image": f"https://api.dicebear.com/7.x/avataaars/svg?seed={p['name']}",
+                "score": min(98, max(75, int(p["score"]))),
                 "verified": True,
-                "image": f"https://api.dicebear.com/7.x/avataaars/svg?seed=AI"
             }
+            for p in profiles[:count]
         ]
+        if not candidates:
+            raise ValueError("model returned no profiles")
+        self.generated += 1
+        return candidates
 
-from integrations import search_candidates
+    async def get(self, skill, location, count=3):
+        """
+        Returns `count` mock candidates, from the cached pool when it holds
+        enough, else from one shared generation that refills it.
+        """
+        key = _pool_key(skill, location)
+        pool = self.pools.get(key)
+        if pool is None or len(pool) < count:
+            size = max(self.size, count)
+            pool = await self.flights.do((key, size), lambda: self._generate(skill, location, size))
+            self.pools.set(key, pool)
+        return random.sample(pool, min(count, len(pool)))
+
+    async def _prewarm(self):
+        while True:
+            for skill in MOCK_PREWARM_SKILLS:
+                for location in MOCK_PREWARM_LOCATIONS:
+                    if self.pools.peek(_pool_key(skill, location)) is not None:
+                        continue
+                    # Only use the model while no user request is waiting on it
+                    await INFERENCE_POOL.wait_idle()
+                    try:
+                        await self.get(skill, location, self.size)
+                        self.prewarmed += 1
+                    except Exception as e:
+                        self.failures += 1
+                        log.warning("mock_prewarm_failed", skill=skill, location=location, error=str(e))
+            # Come back before the pools expire
+            await asyncio.sleep(max(60.0, self.ttl / 2))
 
-async def chat_with_assistant(history):
+    def start(self):
+        """
+        Starts the pre-generation worker. Called from the FastAPI lifespan.
+        """
+        if MOCK_PREWARM_ENABLED and self._worker is None:
+            self._worker = asyncio.create_task(self._prewarm())
+
+    async def close(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            await asyncio.gather(self._worker, return_exceptions=True)
+            self._worker = None
+
+    def stats(self):
+        stats = self.pools.stats()
+        stats.update({
+            "generated": self.generated,
+            "failures": self.failures,
+            "prewarmed": self.prewarmed,
+            "prewarming": self._worker is not None and not self._worker.done(),
+        })
+        return stats
+
+MOCK_CANDIDATE_POOL = MockCandidatePool()
+
+async def generate_mock_candidates(skill, location, count=3):
     """
-    Chat with the AI assistant using Ollama.
-    Supports tool calling for search.
+    Generates realistic mock candidates using local LLM when external APIs fail.
+    Served from MOCK_CANDIDATE_POOL, so repeated (skill, location) pairs skip
+    generation.
     """
-    system_prompt = """
+    try:
+        return await MOCK_CANDIDATE_POOL.get(skill, location, count)
+    except InferenceOverloaded:
+        raise
+    except Exception as e:
+        MOCK_CANDIDATE_POOL.failures += 1
+        log.warning("mock_generation_failed", skill=skill, location=location, error=str(e))
+        return _fallback_candidates(skill, location)
+
+from integrations import search_candidates
+from chat_router import CHAT_ROUTER, SEARCH_REPLY_TEMPLATE
+
+SYSTEM_PROMPT = """
     You are Trace, an expert AI Talent Acquisition Assistant.
     
     TOOL USE:
@@ -112,55 +576,194 @@ async def chat_with_assistant(history):
     For other queries, just answer helpfuly.
     Keep responses concise.
     """
-    
-    messages = [{'role': 'system', 'content': system_prompt}] + history
-    
-            
-    try:
-        # Use sync client for now as python-ollama is sync, wrap if needed but blocking is fine for local
-        response = ollama.chat(model='llama3.2:3b', messages=messages)
-        content = response['message']['content'].strip()
+
+TOOL_PREFIXES = ("SEARCH_NEXT:", "SEARCH:")
+
+CHAT_ERROR_REPLY = {
+    "type": "text",
+    "content": "I'm having trouble connecting to my brain right now.",
+    "data": None
+}
+
+async def _handle_reply(content, session_id):
+    """
+    Turns the model's reply into a chat response, running the search tool
+    when the reply starts with SEARCH: or SEARCH_NEXT:.
+    """
+    if content.startswith("SEARCH:"):
+        query = content.replace("SEARCH:", "").strip()
+        # Perform the search (New Search)
+        candidates = await search_candidates(query, load_more=False, session_id=session_id)
         
-        if content.startswith("SEARCH:"):
-            query = content.replace("SEARCH:", "").strip()
-            # Perform the search (New Search)
-            candidates = await search_candidates(query, load_more=False)
-            
-            return {
-                "type": "search_results",
-                "content": f"I've found top candidates for '{query}'.",
-                "data": candidates
-            }
-            
-        elif content.startswith("SEARCH_NEXT:"):
-            query = content.replace("SEARCH_NEXT:", "").strip()
-            # Perform the search (Load More)
-            candidates = await search_candidates(query, load_more=True)
-            
-            if not candidates:
-                return {
-                    "type": "text",
-                    "content": "I couldn't find any more candidates matching that description.",
-                    "data": None
-                }
-            
-            return {
-                "type": "search_results",
-                "content": "Here are some other candidates that might be a better fit.",
-                "data": candidates
-            }
-            
-        else:
+        return {
+            "type": "search_results",
+            "content": SEARCH_REPLY_TEMPLATE.format(query=query),
+            "data": candidates
+        }
+        
+    elif content.startswith("SEARCH_NEXT:"):
+        query = content.replace("SEARCH_NEXT:", "").strip()
+        # Perform the search (Load More)
+        candidates = await search_candidates(query, load_more=True, session_id=session_id)
+        
+        if not candidates:
             return {
                 "type": "text",
-                "content": content,
+                "content": "I couldn't find any more candidates matching that description.",
                 "data": None
             }
-            
-    except Exception as e:
-        print(f"Chat Error: {e}")
+        
+        return {
+            "type": "search_results",
+            "content": "Here are some other candidates that might be a better fit.",
+            "data": candidates
+        }
+        
+    else:
         return {
             "type": "text",
-            "content": "I'm having trouble connecting to my brain right now.",
+            "content": content,
             "data": None
         }
+
+async def chat_with_assistant(history, session_id=None):
+    """
+    Chat with the AI assistant using Ollama.
+    Supports tool calling for search; `session_id` scopes SEARCH_NEXT paging
+    and identifies the conversation for its history summary. Without one
+    the turn shares no state with other calls.
+    """
+    if session_id is None:
+        session_id = uuid.uuid4().hex
+    try:
+        # Clear search turns and repeated conversations skip the model
+        content = _answer_locally(history)
+        if content is None:
+            messages = CONVERSATION_WINDOW.build(history, SYSTEM_PROMPT, session_id)
+            # Async client via the inference pool, so generation never blocks the event loop
+            started = asyncio.get_running_loop().time()
+            response = await INFERENCE_POOL.chat(messages)
+            content = response['message']['content'].strip()
+            elapsed_ms = (asyncio.get_running_loop().time() - started) * 1000
+            CHAT_ROUTER.remember(history, content, elapsed_ms)
+            CONVERSATION_WINDOW.record(history, messages, elapsed_ms)
+        return await _handle_reply(content, session_id)
+            
+    except InferenceOverloaded:
+        raise
+    except Exception:
+        log.error("chat_failed", exc_info=True)
+        return dict(CHAT_ERROR_REPLY)
+
+def _answer_locally(history):
+    """
+    Returns a reply for the turn without generating one: a fast-path
+    SEARCH: / SEARCH_NEXT: for clear search requests, else a cached model
+    reply for the same recent history. None means the model must answer.
+    """
+    return CHAT_ROUTER.route(history) or CHAT_ROUTER.lookup(history)
+
+def _reply_mode(text):
+    """
+    Decides from the first streamed characters whether the reply is a tool
+    call ("tool"), plain text ("text"), or still undecided (None).
+    """
+    text = text.lstrip()
+    if text.startswith(TOOL_PREFIXES):
+        return "tool"
+    if any(prefix.startswith(text) for prefix in TOOL_PREFIXES):
+        return None
+    return "text"
+
+# Time-to-first-byte of streamed chat replies, in milliseconds
+STREAM_STATS = {"streams": 0, "ttfb_ms_total": 0.0, "ttfb_ms_last": None}
+
+def stream_stats():
+    stats = dict(STREAM_STATS)
+    total = stats.pop("ttfb_ms_total")
+    stats["ttfb_ms_avg"] = round(total / stats["streams"], 1) if stats["streams"] else None
+    return stats
+
+async def stream_chat_with_assistant(history, session_id=None):
+    """
+    Streaming variant of chat_with_assistant. Yields (event, data) pairs:
+    "token" chunks for plain answers, "status" then "search_results" for
+    tool calls, and a final "done" carrying timing.
+
+    Tokens are held back only until the reply can no longer be a
+    SEARCH: / SEARCH_NEXT: prefix. Turns answered without the model are
+    sent whole, and their "done" event carries local=True.
+    """
+    if session_id is None:
+        session_id = uuid.uuid4().hex
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    ttfb_ms = None
+    deadline = started + INFERENCE_POOL.timeout
+    buffer = ""
+    mode = None
+
+    def first_byte():
+        nonlocal ttfb_ms
+        if ttfb_ms is None:
+            ttfb_ms = round((loop.time() - started) * 1000, 1)
+            STREAM_STATS["streams"] += 1
+            STREAM_STATS["ttfb_ms_total"] += ttfb_ms
+            STREAM_STATS["ttfb_ms_last"] = ttfb_ms
+
+    try:
+        content = _answer_locally(history)
+        if content is not None:
+            first_byte()
+            if _reply_mode(content) == "tool":
+                yield "status", {"content": "Searching for candidates..."}
+                reply = await _handle_reply(content, session_id)
+                yield reply["type"] if reply["type"] == "search_results" else "message", reply
+            else:
+                yield "token", {"content": content}
+                yield "message", {"type": "text", "content": content, "data": None}
+            yield "done", {"ttfb_ms": ttfb_ms, "total_ms": round((loop.time() - started) * 1000, 1), "local": True}
+            return
+
+        messages = CONVERSATION_WINDOW.build(history, SYSTEM_PROMPT, session_id)
+        async with INFERENCE_POOL.slot() as client:
+            with upstream_call("ollama", "chat_stream"):
+                stream = await client.chat(model=OLLAMA_MODEL, messages=messages, stream=True)
+                chunks = stream.__aiter__()
+                while True:
+                    try:
+                        part = await asyncio.wait_for(chunks.__anext__(), max(0.0, deadline - loop.time()))
+                    except StopAsyncIteration:
+                        break
+                    token = part['message']['content']
+                    buffer += token
+                    if mode is None:
+                        mode = _reply_mode(buffer)
+                        if mode == "text":
+                            first_byte()
+                            yield "token", {"content": buffer.lstrip()}
+                        elif mode == "tool":
+                            first_byte()
+                            yield "status", {"content": "Searching for candidates..."}
+                    elif mode == "text" and token:
+                        yield "token", {"content": token}
+
+        content = buffer.strip()
+        elapsed_ms = (loop.time() - started) * 1000
+        CHAT_ROUTER.remember(history, content, elapsed_ms)
+        CONVERSATION_WINDOW.record(history, messages, elapsed_ms)
+        if mode == "text":
+            yield "message", {"type": "text", "content": content, "data": None}
+        else:
+            reply = await _handle_reply(content, session_id)
+            first_byte()
+            yield reply["type"] if reply["type"] == "search_results" else "message", reply
+    except InferenceOverloaded:
+        first_byte()
+        yield "error", {"type": "text", "content": "The assistant is busy, please retry shortly.", "data": None}
+    except Exception:
+        log.error("chat_stream_failed", exc_info=True)
+        first_byte()
+        yield "error", dict(CHAT_ERROR_REPLY)
+
+    yield "done", {"ttfb_ms": ttfb_ms, "total_ms": round((loop.time() - started) * 1000, 1)}
@@ -0,0 +1,196 @@
+import contextvars
+import datetime
+import json
+import os
+import queue
+import random
+import sys
+import threading
+import time
+import traceback
+import uuid
+
+LEVELS = {"DEBUG": 10, "INFO": 20, "WARNING": 30, "ERROR": 40}
+_LEVEL_NAMES = {number: name.lower() for name, number in LEVELS.items()}
+
+# DEBUG, INFO, WARNING or ERROR; events below the level cost one comparison
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# "json" for one object per line, "text" for a human-readable line
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()
+# Fraction of DEBUG events kept when DEBUG is enabled
+LOG_DEBUG_SAMPLE_RATE = float(os.getenv("LOG_DEBUG_SAMPLE_RATE", "1.0"))
+# Events waiting for the writer thread; further events are dropped and counted
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
+# Id of the HTTP request being served, attached to every event it logs
+REQUEST_ID = contextvars.ContextVar("request_id", default=None)
+
+LOG_STATS = {"written": 0, "dropped": 0, "sampled_out": 0}
+
+# Nothing below WARNING is kept until configure_logging() runs (scripts, benchmarks)
+_level = LEVELS["WARNING"]
+_queue = queue.SimpleQueue()
+_writer = None
+_STOP = object()
+
+
+def _format_json(event):
+    created, level, logger, name, fields, request_id, exc = event
+    record = {
+        "ts": datetime.datetime.fromtimestamp(created, datetime.timezone.utc).isoformat(timespec="milliseconds"),
+        "level": _LEVEL_NAMES[level],
+        "logger": logger,
+        "event": name,
+    }
+    if request_id:
+        record["request_id"] = request_id
+    record.update(fields)
+    if exc:
+        record["exc"] = exc
+    return json.dumps(record, default=str)
+
+
+def _format_text(event):
+    created, level, logger, name, fields, request_id, exc = event
+    stamp = time.strftime("%H:%M:%S", time.localtime(created))
+    pairs = " ".join(f"{k}={v}" for k, v in fields.items())
+    line = f"{stamp} {_LEVEL_NAMES[level].upper():<7} {logger} [{request_id or '-'}] {name} {pairs}".rstrip()
+    return f"{line}\n{exc}".rstrip() if exc else line
+
+
+class _Writer(threading.Thread):
+    """
+    Drains the event queue off the event loop: formats events and writes
+    them to `stream` in batches, one flush per batch.
+    """
+
+    def __init__(self, stream, formatter):
+        super().__init__(name="app-logging", daemon=True)
+        self.stream = stream
+        self.formatter = formatter
+
+    def run(self):
+        while True:
+            batch = [_queue.get()]
+            while len(batch) < 512:
+                try:
+                    batch.append(_queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = any(event is _STOP for event in batch)
+            lines = [self.formatter(event) for event in batch if event is not _STOP]
+            if lines:
+                try:
+                    self.stream.write("\n".join(lines) + "\n")
+                    self.stream.flush()
+                    LOG_STATS["written"] += len(lines)
+                except Exception:
+                    LOG_STATS["dropped"] += len(lines)
+            if stop:
+                return
+
+
+class EventLogger:
+    """
+    Logs named events with structured fields: log.info("search", query=q).
+    Each event carries the current request id and is queued for the writer
+    thread; formatting and I/O never happen on the caller.
+    """
+
+    def __init__(self, name):
+        self.name = name
+
+    def _emit(self, level, event, fields, exc_info=False):
+        exc = traceback.format_exc().rstrip() if exc_info else None
+        event = (time.time(), level, self.name, event, fields, REQUEST_ID.get(), exc)
+        if _writer is None:
+            # Not configured: warnings and errors still reach stderr
+            sys.stderr.write(_format_text(event) + "\n")
+        elif _queue.qsize() >= LOG_QUEUE_SIZE:
+            LOG_STATS["dropped"] += 1
+        else:
+            _queue.put(event)
+
+    def debug(self, event, **fields):
+        if _level > 10:
+            return
+        # High-volume debug events are sampled before they cost a queue slot
+        if LOG_DEBUG_SAMPLE_RATE < 1.0 and random.random() >= LOG_DEBUG_SAMPLE_RATE:
+            LOG_STATS["sampled_out"] += 1
+            return
+        self._emit(10, event, fields)
+
+    def info(self, event, **fields):
+        if _level <= 20:
+            self._emit(20, event, fields)
+
+    def warning(self, event, **fields):
+        if _level <= 30:
+            self._emit(30, event, fields)
+
+    def error(self, event, exc_info=False, **fields):
+        self._emit(40, event, fields, exc_info)
+
+
+def get_logger(name):
+    return EventLogger(name)
+
+
+def configure_logging(level=None, fmt=None, stream=None):
+    """
+    Starts the writer thread. Called from the FastAPI lifespan; calling it
+    again restarts the writer with the new settings.
+    """
+    global _level, _writer
+    shutdown_logging()
+    _level = LEVELS.get((level or LOG_LEVEL).upper(), LEVELS["INFO"])
+    formatter = _format_text if (fmt or LOG_FORMAT) == "text" else _format_json
+    _writer = _Writer(stream or sys.stdout, formatter)
+    _writer.start()
+
+
+def shutdown_logging():
+    """
+    Writes out queued events and stops the writer thread.
+    """
+    global _level, _writer
+    if _writer is not None:
+        _queue.put(_STOP)
+        _writer.join(timeout=5)
+        _writer = None
+        _level = LEVELS["WARNING"]
+
+
+def log_stats():
+    return {
+        "level": _LEVEL_NAMES[_level].upper(),
+        "debug_sample_rate": LOG_DEBUG_SAMPLE_RATE,
+        "queued": _queue.qsize(),
+        **LOG_STATS,
+    }
+
+
+class RequestIdMiddleware:
+    """
+    ASGI middleware that gives each HTTP request an id, from X-Request-ID or
+    freshly generated, for its log events and the response header.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        request_id = dict(scope["headers"]).get(b"x-request-id", b"").decode("latin-1")[:64] or uuid.uuid4().hex[:16]
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [(b"x-request-id", request_id.encode("latin-1"))]
+            await send(message)
+
+        token = REQUEST_ID.set(request_id)
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            REQUEST_ID.reset(token)
@@ -1,15 +1,37 @@
 from datetime import datetime, timedelta
 from typing import Optional
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import asyncio
+import os
+import time
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from pydantic import BaseModel
+from caching import TTLCache
+from metrics import upstream_call
 
 # Configuration (In production, load from env vars)
 SECRET_KEY = "your-secret-key-change-this-in-production"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
-pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
+# Argon2 cost parameters; stored hashes with other settings are upgraded on login
+ARGON2_TIME_COST = int(os.getenv("ARGON2_TIME_COST", "3"))
+ARGON2_MEMORY_COST = int(os.getenv("ARGON2_MEMORY_COST", "65536"))  # KiB
+ARGON2_PARALLELISM = int(os.getenv("ARGON2_PARALLELISM", "4"))
+
+# Hashing runs off the event loop. argon2-cffi releases the GIL, so threads
+# scale across cores; "process" is available for other schemes.
+PASSWORD_HASH_EXECUTOR = os.getenv("PASSWORD_HASH_EXECUTOR", "thread")
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(os.cpu_count() or 1)))
+
+pwd_context = CryptContext(
+    schemes=["argon2"],
+    deprecated="auto",
+    argon2__rounds=ARGON2_TIME_COST,
+    argon2__memory_cost=ARGON2_MEMORY_COST,
+    argon2__parallelism=ARGON2_PARALLELISM,
+)
 
 class Token(BaseModel):
     access_token: str
@@ -37,6 +59,64 @@ def verify_password(plain_password, hashed_password):
 def get_password_hash(password):
     return pwd_context.hash(password)
 
+def verify_and_update_password(plain_password, hashed_password):
+    """
+    Returns (valid, new_hash); new_hash is set when the stored hash was made
+    with different cost parameters and should be replaced.
+    """
+    if not hashed_password:
+        return False, None
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+_hash_executor = None
+
+def _get_hash_executor():
+    global _hash_executor
+    if _hash_executor is None:
+        if PASSWORD_HASH_EXECUTOR == "process":
+            _hash_executor = ProcessPoolExecutor(max_workers=PASSWORD_HASH_WORKERS)
+        else:
+            _hash_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="pwd-hash")
+    return _hash_executor
+
+def shutdown_hash_executor():
+    global _hash_executor
+    if _hash_executor is not None:
+        _hash_executor.shutdown(wait=False)
+        _hash_executor = None
+
+async def hash_password_async(password):
+    loop = asyncio.get_running_loop()
+    with upstream_call("argon2", "hash"):
+        return await loop.run_in_executor(_get_hash_executor(), get_password_hash, password)
+
+async def verify_and_update_password_async(plain_password, hashed_password):
+    loop = asyncio.get_running_loop()
+    with upstream_call("argon2", "verify"):
+        return await loop.run_in_executor(
+            _get_hash_executor(), verify_and_update_password, plain_password, hashed_password
+        )
+
+# Verified claims per token, kept until the token's own expiry at the latest
+TOKEN_CLAIMS_CACHE_SIZE = int(os.getenv("TOKEN_CLAIMS_CACHE_SIZE", "4096"))
+TOKEN_CLAIMS_CACHE_TTL = float(os.getenv("TOKEN_CLAIMS_CACHE_TTL", "300"))
+
+TOKEN_CLAIMS_CACHE = TTLCache(max_entries=TOKEN_CLAIMS_CACHE_SIZE)
+
+def decode_access_token(token: str):
+    """
+    Verifies a JWT and returns its claims, reusing a previous verification
+    of the same token. Raises JWTError if the token is invalid.
+    """
+    claims = TOKEN_CLAIMS_CACHE.get(token)
+    if claims is not None:
+        return claims
+    claims = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    remaining = claims.get("exp", 0) - time.time()
+    if remaining > 0:
+        TOKEN_CLAIMS_CACHE.set(token, claims, ttl=min(remaining, TOKEN_CLAIMS_CACHE_TTL))
+    return claims
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -0,0 +1,76 @@
+"""
+Candidate search latency: CandidateIndex versus the old linear substring
+scan over MOCK_CANDIDATES-shaped records, from 1k up to 1M candidates.
+
+    python bench/bench_candidate_index.py [--sizes 1000,10000,100000,1000000]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from search_index import CandidateIndex, _matches
+
+FIRST = ["Sarah", "Marcus", "Emma", "Alex", "Priya", "Kenji", "Lena", "Omar", "Chloe", "Diego"]
+LAST = ["Chen", "Johnson", "Wilson", "Rodriguez", "Patel", "Sato", "Novak", "Haddad", "Martin", "Silva"]
+LEVELS = ["Junior", "Senior", "Staff", "Lead", "Principal"]
+ROLES = ["React Developer", "Full Stack Engineer", "UI/UX Designer", "Backend Engineer", "Data Scientist",
+         "DevOps Engineer", "Mobile Developer", "ML Engineer"]
+SKILLS = ["React", "TypeScript", "Node.js", "Python", "FastAPI", "Figma", "Tailwind CSS", "Go", "Docker",
+          "Kubernetes", "PyTorch", "SQL", "Rust", "Swift", "Kotlin", "AWS", "GraphQL", "Terraform"]
+QUERIES = ["react", "senior", "kubernetes", "sarah chen", "ml engineer", "swi", "terraform", "principal data"]
+
+
+def make_candidates(count, rng):
+    return [
+        {
+            "id": n,
+            "name": f"{rng.choice(FIRST)} {rng.choice(LAST)}{n}",
+            "role": f"{rng.choice(LEVELS)} {rng.choice(ROLES)}",
+            "skills": rng.sample(SKILLS, 3),
+        }
+        for n in range(count)
+    ]
+
+
+def time_ms(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=lambda v: [int(x) for x in v.split(",")], default=[1000, 10000, 100000, 1000000])
+    parser.add_argument("--limit", type=int, default=20, help="results per query, as a search page would ask for")
+    args = parser.parse_args()
+    rng = random.Random(7)
+
+    print(f"{'candidates':>10} {'build':>9} {'index/query':>12} {'scan/query':>11} {'suggest':>9}")
+    for size in args.sizes:
+        candidates = make_candidates(size, rng)
+        start = time.perf_counter()
+        index = CandidateIndex(candidates)
+        build = time.perf_counter() - start
+
+        repeat = 3 if size >= 100000 else 10
+        indexed = statistics.mean(
+            time_ms(lambda q=q: index.search(q, limit=args.limit), repeat) for q in QUERIES
+        )
+        scanned = statistics.mean(
+            time_ms(lambda q=q: [c for c in candidates if _matches(c, q)][:args.limit], max(1, repeat // 3))
+            for q in QUERIES
+        )
+        suggest = time_ms(lambda: index.suggest("k"), repeat)
+        print(f"{size:>10} {build:>8.2f}s {indexed:>10.2f}ms {scanned:>9.2f}ms {suggest:>7.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Grows one conversation turn by turn against an Ollama stub whose latency
+rises with prompt size, and reports per-turn latency and prompt size with
+the token-budgeted window and with the full history sent every turn.
+
+    python bench/bench_chat_history.py [--turns 60] [--budget 1500]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stubs import OllamaStubHandler, StubServer
+
+REPLY = " ".join(["Strong tech leads pair deep technical judgement with clear communication."] * 4)
+
+
+def check(label, condition):
+    print(f"{'PASS' if condition else 'FAIL'}  {label}")
+    if not condition:
+        sys.exit(1)
+
+
+async def converse(ai_engine, window, turns, label):
+    ai_engine.CONVERSATION_WINDOW = window
+    # Both modes replay the same questions; without this the second would be all cache hits
+    ai_engine.CHAT_ROUTER.cache.clear()
+    model_calls = ai_engine.CHAT_ROUTER.model_calls
+    history = []
+    latencies = []
+    for n in range(turns):
+        # Unique, non-search questions so neither the fast path nor the reply cache answers
+        history.append({"role": "user", "content": f"What should I ask candidate number {n} about their last project?"})
+        start = time.perf_counter()
+        reply = await ai_engine.chat_with_assistant(history, session_id=label)
+        latencies.append((time.perf_counter() - start) * 1000)
+        history.append({"role": "assistant", "content": reply["content"]})
+    check(f"every {label} turn reached the model",
+          ai_engine.CHAT_ROUTER.model_calls - model_calls == turns and window.stats()["turns"] == turns)
+    return latencies
+
+
+def report(label, latencies, window):
+    quarter = max(1, len(latencies) // 4)
+    first, last = statistics.median(latencies[:quarter]), statistics.median(latencies[-quarter:])
+    stats = window.stats()
+    print(f"{label:<12} first-quarter p50={first:7.1f}ms  last-quarter p50={last:7.1f}ms  "
+          f"prompt_tokens_avg={stats['prompt_tokens_avg']}  folds={stats['folds']}")
+    print(f"             latency by length {stats['latency_ms_by_length']}")
+
+
+async def run(args):
+    import ai_engine
+
+    ai_engine.CHAT_ROUTER.fast_path = False
+    windowed = ai_engine.ConversationWindow(budget=args.budget)
+    report("windowed", await converse(ai_engine, windowed, args.turns, "windowed"), windowed)
+    unbounded = ai_engine.ConversationWindow(budget=10 ** 9)
+    report("unbounded", await converse(ai_engine, unbounded, args.turns, "unbounded"), unbounded)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=60)
+    parser.add_argument("--budget", type=int, default=1500)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--prompt-latency", type=float, default=0.02)
+    args = parser.parse_args()
+
+    with StubServer(OllamaStubHandler, latency=args.latency, prompt_latency=args.prompt_latency, reply=REPLY) as stub:
+        os.environ["OLLAMA_HOST"] = stub.url
+        os.environ["CANDIDATE_STORE_ENABLED"] = "false"
+        os.environ["SEMANTIC_RANKING_ENABLED"] = "false"
+        asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
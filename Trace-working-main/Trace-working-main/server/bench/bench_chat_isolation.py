@@ -0,0 +1,87 @@
+"""
+Checks that search latency stays flat while chat generations are in
+flight. Runs searches alone, then alongside slow chats through the
+inference pool, then alongside the old blocking ollama.chat call.
+
+    python bench/bench_chat_isolation.py [--chat-latency 1.0] [--chats 4]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stubs import GitHubStubHandler, OllamaStubHandler, StubServer
+
+
+async def timed_searches(integrations, label, count):
+    latencies = []
+    for n in range(count):
+        start = time.perf_counter()
+        # Unique query per call so the session store never short-circuits
+        await integrations.search_candidates(f"{label} {n}")
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def report(label, latencies):
+    print(f"{label:<28} p50={statistics.median(latencies):8.1f}ms  max={max(latencies):8.1f}ms")
+
+
+async def run(args):
+    import database
+    import integrations
+    import ai_engine
+
+    # The candidate store runs as it does by default, against the bench's SQLite file
+    await database.ensure_schema("create")
+
+    history = [{"role": "user", "content": "What makes a good tech lead?"}]
+
+    report("search alone", await timed_searches(integrations, "alone", args.searches))
+
+    searches = asyncio.create_task(timed_searches(integrations, "pooled", args.searches))
+    chats = [asyncio.create_task(ai_engine.chat_with_assistant(history)) for _ in range(args.chats)]
+    report("search + pooled chats", await searches)
+    await asyncio.gather(*chats)
+
+    import ollama
+
+    async def blocking_chat():
+        # What chat_with_assistant used to do: sync call on the event loop
+        ollama.chat(model=ai_engine.OLLAMA_MODEL, messages=history)
+
+    searches = asyncio.create_task(timed_searches(integrations, "blocking", args.searches))
+    chats = [asyncio.create_task(blocking_chat()) for _ in range(args.chats)]
+    report("search + blocking chats", await searches)
+    await asyncio.gather(*chats)
+
+    print(f"inference pool: {ai_engine.INFERENCE_POOL.stats()}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chat-latency", type=float, default=1.0)
+    parser.add_argument("--github-latency", type=float, default=0.01)
+    parser.add_argument("--chats", type=int, default=4)
+    parser.add_argument("--searches", type=int, default=10)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="trace-isolation-")
+    with StubServer(GitHubStubHandler, latency=args.github_latency) as github, \
+            StubServer(OllamaStubHandler, latency=args.chat_latency) as ollama_stub:
+        os.environ["GITHUB_API_URL"] = github.url
+        os.environ["GITHUB_CACHE_ENABLED"] = "false"
+        os.environ["OLLAMA_HOST"] = ollama_stub.url
+        # A throwaway database and vector index, so no MySQL server or driver is needed
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'isolation.db')}"
+        os.environ["VECTOR_INDEX_DIR"] = os.path.join(workdir, "vectors")
+        asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Shows that slow database queries no longer serialize unrelated requests.
+
+Uses a SQLite file whose cursors sleep before every statement to stand in
+for a slow MySQL. Fires concurrent /api/login calls (unknown email, so no
+password hashing) and, alongside them, times GET / requests. The same
+load is repeated against a handler that uses the old blocking Session on
+the event loop.
+
+    python bench/bench_db_concurrency.py [--query-latency 0.1] [--logins 10]
+"""
+import argparse
+import asyncio
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+QUERY_LATENCY = 0.1
+
+
+class SlowCursor(sqlite3.Cursor):
+    def execute(self, *args, **kwargs):
+        time.sleep(QUERY_LATENCY)
+        return super().execute(*args, **kwargs)
+
+
+class SlowConnection(sqlite3.Connection):
+    def cursor(self, factory=SlowCursor):
+        return super().cursor(factory)
+
+
+async def measure(client, path, logins):
+    async def login():
+        start = time.perf_counter()
+        await client.post(path, json={"email": "nobody@example.com", "password": "x"})
+        return time.perf_counter() - start
+
+    async def pings():
+        # Latency is measured from when each ping was due, so time spent
+        # waiting for a blocked event loop counts against it
+        latencies = []
+        first = time.perf_counter()
+        for n in range(10):
+            due = first + n * QUERY_LATENCY / 4
+            await asyncio.sleep(max(0.0, due - time.perf_counter()))
+            await client.get("/")
+            latencies.append((time.perf_counter() - due) * 1000)
+        return latencies
+
+    start = time.perf_counter()
+    ping_task = asyncio.create_task(pings())
+    await asyncio.gather(*(login() for _ in range(logins)))
+    wall = time.perf_counter() - start
+    return wall, await ping_task
+
+
+async def run(args):
+    import httpx
+    from sqlalchemy import create_engine, select
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+    from sqlalchemy.orm import sessionmaker
+
+    import database
+    import main
+    import models
+
+    # Tables are created by the lifespan, which ASGITransport does not run
+    await database.ensure_schema("create")
+
+    slow_args = {"factory": SlowConnection, "check_same_thread": False}
+    database.AsyncSessionLocal = async_sessionmaker(
+        create_async_engine(database.ASYNC_DATABASE_URL, connect_args=slow_args),
+        expire_on_commit=False,
+    )
+    BlockingSession = sessionmaker(bind=create_engine(database.SQLALCHEMY_DATABASE_URL, connect_args=slow_args))
+
+    @main.app.post("/bench/blocking-login")
+    async def blocking_login(form_data: main.LoginRequest):
+        # The pre-async pattern: sync Session queried directly on the event loop
+        with BlockingSession() as db:
+            db.execute(select(models.User).where(models.User.email == form_data.email)).scalars().first()
+        return {"detail": "Incorrect username or password"}
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for label, path in (("async /api/login", "/api/login"), ("blocking Session", "/bench/blocking-login")):
+            wall, pings = await measure(client, path, args.logins)
+            print(
+                f"{label:<18} {args.logins} logins in {wall * 1000:7.1f}ms  "
+                f"GET / p50={statistics.median(pings):7.1f}ms max={max(pings):7.1f}ms"
+            )
+
+
+def main():
+    global QUERY_LATENCY
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--query-latency", type=float, default=0.1)
+    parser.add_argument("--logins", type=int, default=10)
+    args = parser.parse_args()
+    QUERY_LATENCY = args.query_latency
+
+    db_path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Compares sequential vs concurrent GitHub detail lookups in
+fetch_github_users against a local stub with fixed per-request latency.
+
+    python bench/bench_github_fanout.py [--latency 0.05] [--limit 15]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stubs import GitHubStubHandler, StubServer
+
+
+async def timed(fetch, query, limit, concurrency, rounds):
+    best = None
+    for _ in range(rounds):
+        start = time.perf_counter()
+        users = await fetch(query, limit=limit, concurrency=concurrency)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, len(users)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--limit", type=int, default=15)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    with StubServer(GitHubStubHandler, latency=args.latency) as stub:
+        os.environ["GITHUB_API_URL"] = stub.url
+        import integrations
+
+        print(f"Stub GitHub at {stub.url}, latency {args.latency * 1000:.0f}ms, limit {args.limit}")
+
+        async def run():
+            await integrations.start_http_client()
+            try:
+                for concurrency in (1, 4, integrations.GITHUB_DETAIL_CONCURRENCY, args.limit):
+                    elapsed, count = await timed(
+                        integrations.fetch_github_users, "python", args.limit, concurrency, args.rounds
+                    )
+                    print(f"concurrency={concurrency:<3} users={count:<3} best wall-clock={elapsed * 1000:8.1f}ms")
+            finally:
+                await integrations.close_http_client()
+
+        asyncio.run(run())
+        print(f"HTTP client: {integrations.http_client_stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,263 @@
+"""
+Load test for the main API routes against local stand-ins: stub GitHub
+and Ollama servers with fixed latency, and a throwaway SQLite database.
+Each scenario runs at every concurrency level; throughput and latency
+percentiles are printed and saved as JSON so runs can be compared across
+commits.
+
+    python bench/bench_load.py [--levels 1,8,32] [--requests 200]
+    python bench/bench_load.py --compare bench/results/load-abc1234.json
+
+The app runs in-process behind httpx's ASGI transport, so the load
+generator shares its event loop: absolute numbers are lower than behind
+uvicorn, but runs on the same machine are comparable.
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stubs import GitHubStubHandler, OllamaStubHandler, StubServer
+
+SCENARIOS = ("match", "search", "find-nearby", "login", "chat")
+SKILLS = ["Python", "React", "Go", "Rust", "Java", "Kubernetes", "Machine Learning", "TypeScript", "Docker", "SQL"]
+LOCATIONS = ["London", "Berlin", "Remote", "New York", "Bangalore"]
+CREDENTIALS = {"email": "demo@trace.ai", "password": "password123"}
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+def build_request(scenario, n, vary, level=0):
+    """
+    The n-th request of a scenario as (method, path, kwargs). With `vary`,
+    inputs rotate through a fixed set so caches see a realistic mix of hits
+    and misses; the sequence is the same on every run. Each `level` gets
+    inputs of its own, so one level never runs on caches warmed by another.
+    """
+    rng = random.Random(n if vary else 0)
+    skill = rng.choice(SKILLS)
+    session_id = f"load-{level}-{n % 20}"
+    if scenario == "match":
+        return "POST", "/api/match", {"json": {
+            "user_skills": rng.sample(SKILLS, 4), "required_skills": rng.sample(SKILLS, 3),
+        }}
+    if scenario == "search":
+        return "GET", "/api/search", {"params": {"query": f"{skill.lower()} team{level}", "session_id": session_id}}
+    if scenario == "find-nearby":
+        return "POST", "/api/find-nearby", {"json": {
+            "skill": f"{skill} team{level}", "manual_location": rng.choice(LOCATIONS), "session_id": session_id,
+        }}
+    if scenario == "login":
+        return "POST", "/api/login", {"json": CREDENTIALS}
+    if scenario == "chat":
+        topic = n % 50 if vary else 0
+        return "POST", "/api/chat", {"json": {
+            "history": [{"role": "user", "content": f"Any tips for keeping standup number {topic} short in team {level}?"}],
+            "session_id": session_id,
+        }}
+    raise ValueError(scenario)
+
+
+def cache_counters(main, scenario):
+    """
+    (hits, misses) so far of the cache in front of a scenario, or None if
+    it has none.
+    """
+    if scenario in ("search", "find-nearby"):
+        results = main.SEARCH_SESSIONS.results
+        return results.hits, results.misses
+    if scenario == "chat":
+        from ai_engine import CHAT_ROUTER
+        # Fast-path turns never reach the cache or the model
+        return CHAT_ROUTER.cache.hits, CHAT_ROUTER.model_calls
+    return None
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return None
+    # Nearest-rank, so p99 of 200 samples is an observed latency
+    return sorted_values[max(0, math.ceil(p / 100 * len(sorted_values)) - 1)]
+
+
+async def drive(client, scenario, requests, concurrency, vary, offset=0, level=0):
+    queue = iter(range(offset, offset + requests))
+    latencies, statuses = [], {}
+
+    async def worker():
+        for n in queue:
+            method, path, kwargs = build_request(scenario, n, vary, level)
+            start = time.perf_counter()
+            try:
+                resp = await client.request(method, path, **kwargs)
+                status = str(resp.status_code)
+            except Exception as e:
+                status = type(e).__name__
+            latencies.append((time.perf_counter() - start) * 1000)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "scenario": scenario,
+        "concurrency": concurrency,
+        "requests": requests,
+        "errors": sum(count for status, count in statuses.items() if not status.startswith("2")),
+        "statuses": statuses,
+        "duration_s": round(elapsed, 3),
+        "throughput_rps": round(requests / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "max_ms": round(latencies[-1], 2),
+    }
+
+
+async def run(args):
+    import httpx
+    import main
+
+    results = []
+    async with main.lifespan(main.app):
+        # The schema is created in the background; wait as a load balancer would
+        deadline = time.monotonic() + 30
+        ready, detail = await main.READINESS.check()
+        while not ready:
+            if time.monotonic() > deadline:
+                sys.exit(f"App never became ready: {detail}")
+            await asyncio.sleep(0.05)
+            ready, detail = await main.READINESS.check()
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            # First login creates the demo user
+            await client.post("/api/login", json=CREDENTIALS)
+            for scenario in args.scenarios:
+                if args.warmup:
+                    # Inputs of its own, so the measured levels still start cold
+                    await drive(client, scenario, args.warmup, min(args.warmup, 4), args.vary,
+                                offset=10**6, level=len(args.levels))
+                for level, concurrency in enumerate(args.levels):
+                    before = cache_counters(main, scenario)
+                    result = await drive(client, scenario, args.requests, concurrency, args.vary, level=level)
+                    after = cache_counters(main, scenario)
+                    if before is not None:
+                        result["cache_hits"] = after[0] - before[0]
+                        result["cache_misses"] = after[1] - before[1]
+                    results.append(result)
+                    cache = f"  cache hits={result['cache_hits']} misses={result['cache_misses']}" if before else ""
+                    print(
+                        f"{scenario:<12} c={concurrency:<4} {result['throughput_rps']:8.1f} req/s  "
+                        f"p50={result['p50_ms']:8.1f}ms  p95={result['p95_ms']:8.1f}ms  "
+                        f"p99={result['p99_ms']:8.1f}ms  errors={result['errors']}{cache}"
+                    )
+    return results
+
+
+def git_commit():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True)
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True, text=True)
+        return commit.stdout.strip(), bool(dirty.stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+
+
+def compare(baseline_path, results, threshold):
+    """
+    Prints per-scenario changes against a saved run; returns the number of
+    regressions (throughput down or p95 up by more than `threshold`).
+    """
+    with open(baseline_path) as f:
+        baseline = {(r["scenario"], r["concurrency"]): r for r in json.load(f)["results"]}
+    regressions = 0
+    print(f"\nAgainst {baseline_path}:")
+    for result in results:
+        before = baseline.get((result["scenario"], result["concurrency"]))
+        if before is None:
+            continue
+        rps = result["throughput_rps"] / before["throughput_rps"] - 1 if before["throughput_rps"] else 0.0
+        p95 = result["p95_ms"] / before["p95_ms"] - 1 if before["p95_ms"] else 0.0
+        regressed = rps < -threshold or p95 > threshold
+        regressions += regressed
+        print(
+            f"{result['scenario']:<12} c={result['concurrency']:<4} throughput {rps:+7.1%}  p95 {p95:+7.1%}"
+            f"{'  REGRESSION' if regressed else ''}"
+        )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", type=lambda v: v.split(","), default=list(SCENARIOS),
+                        help=f"comma-separated subset of {','.join(SCENARIOS)}")
+    parser.add_argument("--levels", type=lambda v: [int(x) for x in v.split(",")], default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=200, help="requests per scenario and level")
+    parser.add_argument("--warmup", type=int, default=10, help="unmeasured requests per scenario")
+    parser.add_argument("--no-vary", dest="vary", action="store_false", help="repeat one input per scenario")
+    parser.add_argument("--github-latency", type=float, default=0.05)
+    parser.add_argument("--github-rate-limit", type=int, default=None,
+                        help="stub GitHub allows this many requests per token per minute")
+    parser.add_argument("--ollama-latency", type=float, default=0.2)
+    parser.add_argument("--out", help="result file (default bench/results/load-<commit>.json)")
+    parser.add_argument("--compare", help="earlier result file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.1, help="relative change counted as a regression")
+    args = parser.parse_args()
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    workdir = tempfile.mkdtemp(prefix="trace-load-")
+    limits = {"per_token": args.github_rate_limit, "window": 60} if args.github_rate_limit else None
+    with StubServer(GitHubStubHandler, latency=args.github_latency, total_count=500, limits=limits) as github, \
+            StubServer(OllamaStubHandler, latency=args.ollama_latency) as ollama:
+        os.environ.update({
+            "GITHUB_API_URL": github.url,
+            "OLLAMA_HOST": ollama.url,
+            "DATABASE_URL": f"sqlite:///{os.path.join(workdir, 'load.db')}",
+            "GITHUB_CACHE_PATH": os.path.join(workdir, "github_cache.sqlite3"),
+            # Stub GitHub is the limit under test, not the client-side pacing
+            "GITHUB_RATE_PER_SECOND": os.environ.get("GITHUB_RATE_PER_SECOND", "1000"),
+            "GITHUB_BURST": os.environ.get("GITHUB_BURST", "1000"),
+            # Only requests under test reach the Ollama stub
+            "MOCK_PREWARM_ENABLED": "false",
+            "LOG_LEVEL": os.environ.get("LOG_LEVEL", "WARNING"),
+        })
+        print(f"Stub GitHub {args.github_latency * 1000:.0f}ms, stub Ollama {args.ollama_latency * 1000:.0f}ms, "
+              f"SQLite in {workdir}")
+        results = asyncio.run(run(args))
+
+    commit, dirty = git_commit()
+    report = {
+        "meta": {
+            "commit": commit,
+            "dirty": dirty,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "args": {k: v for k, v in vars(args).items() if k not in ("out", "compare")},
+        },
+        "results": results,
+    }
+    out = args.out or os.path.join(RESULTS_DIR, f"load-{commit or 'unknown'}{'-dirty' if dirty else ''}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Saved {out}")
+
+    if args.compare and compare(args.compare, results, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Measures what logging costs the event loop per request: the old
+print(f"DEBUG: ...") lines against app_logging with debug off, debug on,
+and debug sampled. Output goes to a temp file, like stdout piped to a log
+collector.
+
+    python bench/bench_logging.py [--requests 20000] [--events 10]
+"""
+import argparse
+import importlib
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def print_request(events, user, flush):
+    # What a request used to do: one synchronous stdout write per step
+    for n in range(events):
+        print(f"DEBUG: step {n} for user {user}: fetched {n * 3} rows", flush=flush)
+    print(f"DEBUG: request done for user {user}", flush=flush)
+
+
+def log_request(log, events, user):
+    for n in range(events):
+        log.debug("step", step=n, user=user, rows=n * 3)
+    log.info("request_done", user=user)
+
+
+def timed(label, requests, fn):
+    start = time.perf_counter()
+    for n in range(requests):
+        fn(n)
+    per_request_us = (time.perf_counter() - start) / requests * 1e6
+    print(f"{label:<28} {per_request_us:8.2f}us per request", file=sys.__stdout__)
+    return per_request_us
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--events", type=int, default=10, help="debug events per request")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryFile("w") as out:
+        sys.stdout = out
+        try:
+            timed("print(), block-buffered", args.requests, lambda n: print_request(args.events, f"u{n}", False))
+            # Containers usually run with PYTHONUNBUFFERED=1
+            baseline = timed("print(), unbuffered", args.requests, lambda n: print_request(args.events, f"u{n}", True))
+        finally:
+            sys.stdout = sys.__stdout__
+
+        for label, level, rate in (
+            ("app_logging, debug off", "INFO", "1.0"),
+            ("app_logging, debug sampled", "DEBUG", "0.1"),
+            ("app_logging, debug on", "DEBUG", "1.0"),
+        ):
+            os.environ["LOG_DEBUG_SAMPLE_RATE"] = rate
+            app_logging = importlib.reload(importlib.import_module("app_logging"))
+            app_logging.configure_logging(level=level, stream=out)
+            log = app_logging.get_logger("bench")
+            cost = timed(label, args.requests, lambda n: log_request(log, args.events, f"u{n}"))
+            stats = app_logging.log_stats()
+            app_logging.shutdown_logging()
+            print(f"{'':<28} {baseline / cost:8.1f}x faster than unbuffered print()  dropped={stats['dropped']} "
+                  f"sampled_out={stats['sampled_out']}", file=sys.__stdout__)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Login throughput with argon2 in the hashing executor versus verifying on
+the event loop, at a few concurrency levels. Uses a throwaway SQLite DB
+and the demo account.
+
+    python bench/bench_login_throughput.py [--logins 32] [--levels 1,4,16]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+CREDENTIALS = {"email": "demo@trace.ai", "password": "password123"}
+
+
+async def loop_lag(stop):
+    """
+    Worst overshoot of a 10ms sleep while logins run: how long the event
+    loop was unavailable to other requests.
+    """
+    worst = 0.0
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(0.01)
+        worst = max(worst, time.perf_counter() - start - 0.01)
+    return worst * 1000
+
+
+async def drive(client, path, logins, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    stop = asyncio.Event()
+    lag = asyncio.create_task(loop_lag(stop))
+
+    async def one():
+        async with semaphore:
+            start = time.perf_counter()
+            resp = await client.post(path, json=CREDENTIALS)
+            assert resp.status_code == 200, resp.text
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(logins)))
+    rate = logins / (time.perf_counter() - start)
+    stop.set()
+    return rate, latencies, await lag
+
+
+async def run(args):
+    import httpx
+    from fastapi import HTTPException
+
+    import auth
+    import database
+    import main
+
+    # Tables are created by the lifespan, which ASGITransport does not run
+    await database.ensure_schema("create")
+
+    @main.app.post("/bench/blocking-login")
+    async def blocking_login(form_data: main.LoginRequest):
+        # The previous pattern: argon2 verify directly on the event loop
+        async for db in main.get_async_db():
+            db_user = await main.get_user_by_email(db, form_data.email)
+        if not auth.verify_password(form_data.password, db_user.hashed_password):
+            raise HTTPException(status_code=401)
+        return {"ok": True}
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        # First login creates the demo user
+        await client.post("/api/login", json=CREDENTIALS)
+        print(f"hash workers: {auth.PASSWORD_HASH_WORKERS} ({auth.PASSWORD_HASH_EXECUTOR})")
+        for concurrency in args.levels:
+            for label, path in (("executor", "/api/login"), ("on-loop", "/bench/blocking-login")):
+                rate, latencies, lag = await drive(client, path, args.logins, concurrency)
+                print(
+                    f"concurrency={concurrency:<3} {label:<9} {rate:7.1f} logins/s  "
+                    f"p50={statistics.median(latencies):7.1f}ms  max loop lag={lag:7.1f}ms"
+                )
+    auth.shutdown_hash_executor()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--logins", type=int, default=32)
+    parser.add_argument("--levels", type=lambda v: [int(x) for x in v.split(",")], default=[1, 4, 16])
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
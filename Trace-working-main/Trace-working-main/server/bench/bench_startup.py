@@ -0,0 +1,147 @@
+"""
+Cold-start time of the API: each run starts a fresh interpreter against
+a new SQLite database, imports main, runs the lifespan and waits for
+/readyz to pass. Reports import, lifespan and time-to-ready (from process
+spawn), which heavy modules were imported eagerly, and the slowest
+imports, and saves the result as JSON like bench_load.py.
+
+    python bench/bench_startup.py [--runs 5] [--compare bench/results/startup-abc1234.json]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stubs import CertsStubHandler, StubServer
+from bench_load import RESULTS_DIR, git_commit
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Modules that should load on first use, not while the worker boots
+LAZY_MODULES = ("ollama", "google.auth", "numpy")
+
+PROBE = """
+import asyncio, json, sys, time
+started = time.perf_counter()
+import main
+import_ms = (time.perf_counter() - started) * 1000
+eager = [m for m in %r if m in sys.modules]
+
+async def boot():
+    began = time.perf_counter()
+    async with main.lifespan(main.app):
+        lifespan_ms = (time.perf_counter() - began) * 1000
+        ready = False
+        while not ready and time.perf_counter() - began < %f:
+            ready, detail = await main.READINESS.check()
+            if not ready:
+                await asyncio.sleep(0.01)
+        return lifespan_ms, ready, detail, time.time()
+
+lifespan_ms, ready, detail, ready_at = asyncio.run(boot())
+print(json.dumps({"import_ms": import_ms, "lifespan_ms": lifespan_ms, "ready": ready,
+                  "detail": detail, "ready_at": ready_at, "eager": eager}))
+"""
+
+
+def boot_once(env, timeout, importtime=False):
+    workdir = tempfile.mkdtemp(prefix="trace-startup-")
+    env = dict(env, **{
+        "DATABASE_URL": f"sqlite:///{os.path.join(workdir, 'startup.db')}",
+        "GITHUB_CACHE_PATH": os.path.join(workdir, "github_cache.sqlite3"),
+        "VECTOR_INDEX_DIR": os.path.join(workdir, "vector_index"),
+    })
+    command = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-c", PROBE % (LAZY_MODULES, timeout)]
+    spawned = time.time()
+    proc = subprocess.run(command, cwd=SERVER_DIR, env=env, capture_output=True, text=True, timeout=timeout + 60)
+    if proc.returncode != 0:
+        sys.exit(f"Startup failed:\n{proc.stderr[-2000:]}")
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    result["ready_ms"] = (result.pop("ready_at") - spawned) * 1000
+    return result, proc.stderr
+
+
+def slowest_imports(stderr, top=10):
+    """
+    Top-level imports by cumulative time from `python -X importtime` output.
+    """
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # Nested imports are indented two more spaces per level
+        if not name.startswith("  "):
+            rows.append((int(cumulative) / 1000, name.strip()))
+    return [{"module": name, "ms": round(ms, 1)} for ms, name in sorted(rows, reverse=True)[:top]]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=30.0, help="seconds to wait for readiness")
+    parser.add_argument("--out", help="result file (default bench/results/startup-<commit>.json)")
+    parser.add_argument("--compare", help="earlier result file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.15, help="relative slowdown counted as a regression")
+    args = parser.parse_args()
+
+    certs_state = {"certs": {}, "max_age": 3600}
+    with StubServer(CertsStubHandler, state=certs_state) as certs:
+        env = dict(os.environ, GOOGLE_CERTS_URL=certs.url, MOCK_PREWARM_ENABLED="false",
+                   LOG_LEVEL=os.environ.get("LOG_LEVEL", "WARNING"))
+        runs = [boot_once(env, args.timeout)[0] for _ in range(args.runs)]
+        _, importtime = boot_once(env, args.timeout, importtime=True)
+
+    not_ready = [r["detail"] for r in runs if not r["ready"]]
+    if not_ready:
+        sys.exit(f"Never became ready: {not_ready[0]}")
+    if certs_state.get("requests") and os.environ.get("GOOGLE_CERTS_PREFETCH", "false").lower() not in ("1", "true", "yes"):
+        sys.exit(f"Startup fetched Google certs {certs_state['requests']} times; it should make no outbound requests")
+    summary = {
+        phase: round(statistics.median(r[phase] for r in runs), 1)
+        for phase in ("import_ms", "lifespan_ms", "ready_ms")
+    }
+    eager = runs[0]["eager"]
+    slowest = slowest_imports(importtime)
+    print(f"median of {args.runs}: import={summary['import_ms']}ms  lifespan={summary['lifespan_ms']}ms  "
+          f"spawn-to-ready={summary['ready_ms']}ms")
+    print(f"eagerly imported: {', '.join(eager) or 'none of ' + ', '.join(LAZY_MODULES)}")
+    for row in slowest:
+        print(f"  {row['ms']:8.1f}ms  {row['module']}")
+
+    commit, dirty = git_commit()
+    report = {
+        "meta": {"commit": commit, "dirty": dirty, "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                 "python": sys.version.split()[0], "runs": args.runs},
+        "summary": summary,
+        "eager_imports": eager,
+        "slowest_imports": slowest,
+        "runs": runs,
+    }
+    out = args.out or os.path.join(RESULTS_DIR, f"startup-{commit or 'unknown'}{'-dirty' if dirty else ''}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Saved {out}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            before = json.load(f)["summary"]
+        regressed = False
+        print(f"\nAgainst {args.compare}:")
+        for phase, ms in summary.items():
+            change = ms / before[phase] - 1 if before.get(phase) else 0.0
+            regressed |= change > args.threshold
+            print(f"  {phase:<12} {before.get(phase)}ms -> {ms}ms  ({change:+.1%})"
+                  f"{'  REGRESSION' if change > args.threshold else ''}")
+        if regressed:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
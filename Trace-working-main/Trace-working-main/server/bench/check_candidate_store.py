@@ -0,0 +1,98 @@
+"""
+Exercises the local candidate store against a GitHub stub and a SQLite
+database: enriched results are bulk-upserted in the background, queries
+with the same terms are answered without GitHub, and stale answers refresh
+in the background. A failing database trips the breaker and searches go
+to GitHub.
+
+    python bench/check_candidate_store.py
+"""
+import asyncio
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stubs import GitHubStubHandler, StubServer
+
+
+def check(label, condition):
+    print(f"{'PASS' if condition else 'FAIL'}  {label}")
+    if not condition:
+        sys.exit(1)
+
+
+async def run(state):
+    import candidate_store
+    import database
+    import integrations
+    import models
+    from sqlalchemy import func, select
+
+    async with database.async_engine.begin() as conn:
+        await conn.run_sync(models.Base.metadata.create_all)
+    await integrations.start_http_client()
+    store = integrations.CANDIDATE_STORE
+
+    first = await integrations.search_candidates("react developer")
+    check("first search goes to GitHub", len(first) == 3 and state["searches"] == 1)
+    check("results are stored after the response", store.upserted == 0 and store._tasks)
+    await asyncio.gather(*store._tasks)
+    async with database.AsyncSessionLocal() as db:
+        stored = await db.scalar(select(func.count()).select_from(models.Candidate))
+    check("enriched profiles are stored", stored == 15 and store.upserted == 15)
+
+    integrations.SEARCH_SESSIONS.clear()
+    again = await integrations.search_candidates("react engineer")
+    check("overlapping query is answered locally", len(again) == 3 and state["searches"] == 1)
+    near = await integrations.search_candidates("react", location="London")
+    check("skill + location lookup is answered locally", len(near) == 3 and state["searches"] == 1)
+    check("% in a location is not a wildcard", await store.lookup("react", location="%") is None)
+
+    # Same users found again under another skill: rows are updated, not duplicated
+    integrations.SEARCH_SESSIONS.clear()
+    await integrations.search_candidates("python developer")
+    await asyncio.gather(*store._tasks)
+    async with database.AsyncSessionLocal() as db:
+        stored = await db.scalar(select(func.count()).select_from(models.Candidate))
+        skills = await db.scalar(select(func.count()).select_from(models.CandidateSkill))
+    check("upsert keeps one row per login", stored == 15 and skills == 30 and state["searches"] == 2)
+    check("every query term must match", await store.lookup("python django") is None
+          and await store.lookup("python react") is not None)
+
+    candidate_store.CANDIDATE_STALE_AFTER = 0
+    integrations.SEARCH_SESSIONS.clear()
+    stale = await integrations.search_candidates("react engineer")
+    check("stale answer is served immediately", len(stale) == 3 and state["searches"] == 2)
+    await asyncio.gather(*store._tasks)
+    check("stale answer refreshes in the background", state["searches"] == 3 and store.refreshes == 1)
+
+    def broken_session():
+        raise ConnectionError("database unreachable")
+
+    store._session = broken_session
+    for _ in range(candidate_store.CANDIDATE_BREAKER_FAILURES):
+        await store.lookup("react")
+    check("repeated failures open the breaker", not store.available())
+    integrations.SEARCH_SESSIONS.clear()
+    fallback = await integrations.search_candidates("react engineer")
+    check("searches fall back to GitHub while it is open", len(fallback) == 3 and state["searches"] == 4)
+
+    print(f"      stats {store.stats()}")
+    await store.close()
+    await integrations.close_http_client()
+
+
+def main():
+    state = {}
+    with tempfile.TemporaryDirectory() as tmp, StubServer(GitHubStubHandler, total_count=40, state=state) as stub:
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'trace.db')}"
+        os.environ["GITHUB_API_URL"] = stub.url
+        os.environ["GITHUB_CACHE_ENABLED"] = "false"
+        os.environ["SEMANTIC_RANKING_ENABLED"] = "false"
+        asyncio.run(run(state))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Checks the chat fast path: clear search and "more" turns are routed without
+the model, ambiguous turns are not, and repeated conversations are answered
+from the reply cache. Then times chat turns against a slow Ollama stub.
+
+    python bench/check_chat_router.py [--chat-latency 1.0]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stubs import GitHubStubHandler, OllamaStubHandler, StubServer
+
+SEARCH_REPLY = "I've found top candidates for 'React developer London'."
+
+ROUTED = [
+    ("Find me a React developer in London", "SEARCH: React developer London"),
+    ("Can you find someone who knows Rust", "SEARCH: Rust"),
+    ("We need two senior Go engineers based in Berlin", "SEARCH: two senior Go engineers Berlin"),
+    ("I'm looking for a data scientist with experience in PyTorch", "SEARCH: data scientist PyTorch"),
+    ("more", "SEARCH_NEXT: React developer London"),
+    ("Show me more please", "SEARCH_NEXT: React developer London"),
+    ("These aren't good", "SEARCH_NEXT: React developer London"),
+]
+TO_MODEL = [
+    "What makes a good tech lead?",
+    "find candidates",
+    "I need a break",
+    "Tell me more about the second one",
+    "Can you find someone who knows Rust?",
+    "I need advice on how to interview senior engineers",
+    "We need to write a job description for a React developer",
+    "Show me how to evaluate a designer portfolio",
+    "Can you find a way to make onboarding easier for new developers?",
+    "Find tips for managing remote engineers",
+    "I need help onboarding new developers",
+]
+
+
+def check(label, condition):
+    print(f"{'PASS' if condition else 'FAIL'}  {label}")
+    if not condition:
+        sys.exit(1)
+
+
+def check_routing():
+    from chat_router import ChatRouter
+
+    router = ChatRouter(fast_path=True)
+    earlier = [
+        {"role": "user", "content": "Find me a React developer in London"},
+        {"role": "assistant", "content": SEARCH_REPLY},
+    ]
+    routed = [(text, router.route(earlier + [{"role": "user", "content": text}])) for text, _ in ROUTED]
+    wrong = [(text, got) for (text, want), (_, got) in zip(ROUTED, routed) if got != want]
+    for text, got in wrong:
+        print(f"      {text!r} -> {got!r}")
+    check("clear search and 'more' turns skip the model", not wrong)
+    misrouted = [(t, got) for t in TO_MODEL if (got := router.route([{"role": "user", "content": t}])) is not None]
+    for text, got in misrouted:
+        print(f"      {text!r} -> {got!r}")
+    check("questions, advice and ambiguous turns go to the model", not misrouted)
+    check("'more' with no earlier search goes to the model", router.route([{"role": "user", "content": "more"}]) is None)
+
+
+async def timed_chat(ai_engine, history):
+    start = time.perf_counter()
+    reply = await ai_engine.chat_with_assistant(history, session_id="bench")
+    return reply, (time.perf_counter() - start) * 1000
+
+
+async def run():
+    import ai_engine
+    import integrations
+
+    await integrations.start_http_client()
+    router = ai_engine.CHAT_ROUTER
+
+    search = [{"role": "user", "content": "Find me a React developer in London"}]
+    reply, search_ms = await timed_chat(ai_engine, search)
+    check("a clear search returns results without a model call", reply["type"] == "search_results" and router.model_calls == 0)
+
+    question = [{"role": "user", "content": "What makes a good tech lead?"}]
+    _, cold_ms = await timed_chat(ai_engine, question)
+    _, warm_ms = await timed_chat(ai_engine, [{"role": "user", "content": "  what makes a good TECH lead "}])
+    check("a repeated conversation is served from the reply cache", router.model_calls == 1 and router.cache.hits == 1)
+    print(f"      fast-path search {search_ms:.0f}ms, model turn {cold_ms:.0f}ms, cached turn {warm_ms:.1f}ms")
+    print(f"      stats {router.stats()}")
+    await integrations.close_http_client()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chat-latency", type=float, default=1.0)
+    args = parser.parse_args()
+
+    check_routing()
+    with StubServer(GitHubStubHandler) as github, StubServer(OllamaStubHandler, latency=args.chat_latency) as ollama:
+        os.environ["GITHUB_API_URL"] = github.url
+        os.environ["OLLAMA_HOST"] = ollama.url
+        os.environ["GITHUB_CACHE_ENABLED"] = "false"
+        os.environ["CANDIDATE_STORE_ENABLED"] = "false"
+        os.environ["SEMANTIC_RANKING_ENABLED"] = "false"
+        asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
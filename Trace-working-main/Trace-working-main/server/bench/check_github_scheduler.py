@@ -0,0 +1,124 @@
+"""
+Exercises the GitHub scheduler against a stub that emits X-RateLimit-*
+headers: token rotation, waiting for a window reset instead of hitting 403,
+retrying 429s, interactive-before-background ordering, and failing fast
+(with a local fallback in /api/search) once the quota is gone.
+
+    python bench/check_github_scheduler.py
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+
+from stubs import GitHubStubHandler, StubServer
+
+
+def check(label, condition):
+    print(f"{'PASS' if condition else 'FAIL'}  {label}")
+    if not condition:
+        sys.exit(1)
+
+
+def serve(**options):
+    return StubServer(GitHubStubHandler, total_count=15, **options)
+
+
+async def check_rotation(integrations, scheduler_cls):
+    limits = {"per_token": 20, "window": 60}
+    with serve(limits=limits) as stub:
+        integrations.GITHUB_API_URL = stub.url
+        scheduler = integrations.GITHUB_SCHEDULER = scheduler_cls(tokens=["a", "b"])
+        first = await integrations.search_candidates("go developer")
+        second = await integrations.search_candidates("rust developer")
+        check("searches succeed across two tokens", len(first) == 3 and len(second) == 3)
+        check("both tokens carry traffic", set(limits["by_token"]) == {"Bearer a", "Bearer b"})
+        check("quota is tracked, no 403 reaches GitHub", scheduler.rate_limited == 0)
+
+
+async def check_reset_wait(scheduler_cls, client):
+    with serve(limits={"per_token": 3, "window": 1}) as stub:
+        scheduler = scheduler_cls(tokens=["a"], max_wait=5)
+        start = time.perf_counter()
+        statuses = [
+            (await scheduler.request(client, "GET", f"{stub.url}/users/user{n}")).status_code for n in range(6)
+        ]
+        elapsed = time.perf_counter() - start
+        check("exhausted quota waits for the reset instead of failing", statuses == [200] * 6 and scheduler.rate_limited == 0)
+        print(f"      6 requests on a 3-per-window token took {elapsed:.2f}s")
+
+
+async def check_retry(scheduler_cls, client):
+    with serve(limits={"per_token": 100, "throttle": 2}) as stub:
+        scheduler = scheduler_cls(tokens=["a"])
+        resp = await scheduler.request(client, "GET", f"{stub.url}/users/user1")
+        check("429 + Retry-After is retried", resp.status_code == 200 and scheduler.retries == 2)
+
+
+async def check_priority(github_scheduler, client):
+    with serve() as stub:
+        scheduler = github_scheduler.GitHubScheduler(tokens=[], rate=10, burst=1)
+        order = []
+
+        async def call(label, priority):
+            with github_scheduler.github_priority(priority):
+                await scheduler.request(client, "GET", f"{stub.url}/users/{label}")
+            order.append(label)
+
+        background = [asyncio.create_task(call(f"bg{n}", github_scheduler.BACKGROUND)) for n in range(6)]
+        await asyncio.sleep(0.05)
+        await call("interactive", github_scheduler.INTERACTIVE)
+        await asyncio.gather(*background)
+        check("interactive request jumps the background queue", order.index("interactive") <= 2)
+        print(f"      completion order: {order}")
+
+
+async def check_fail_fast(integrations, scheduler_cls):
+    import database
+    import main
+
+    await database.ensure_schema("create")
+
+    with serve(limits={"per_token": 1, "window": 60}) as stub:
+        integrations.GITHUB_API_URL = stub.url
+        integrations.GITHUB_SCHEDULER = scheduler_cls(tokens=["a"], max_wait=1)
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://t") as api:
+            # The first search spends the token's one search call for this window
+            await api.get("/api/search", params={"query": "go"})
+            resp = (await api.get("/api/search", params={"query": "python"})).json()
+        check("/api/search reports the limit and serves local results",
+              resp.get("rate_limited") and resp["retry_after"] > 0 and resp["candidates"])
+
+
+async def run():
+    import github_scheduler
+    import integrations
+
+    await integrations.start_http_client()
+    client = integrations.get_http_client()
+    await check_rotation(integrations, github_scheduler.GitHubScheduler)
+    await check_reset_wait(github_scheduler.GitHubScheduler, client)
+    await check_retry(github_scheduler.GitHubScheduler, client)
+    await check_priority(github_scheduler, client)
+    await check_fail_fast(integrations, github_scheduler.GitHubScheduler)
+    print(f"      stats {integrations.GITHUB_SCHEDULER.stats()}")
+    await integrations.close_http_client()
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'trace.db')}"
+        os.environ["GITHUB_CACHE_ENABLED"] = "false"
+        os.environ["CANDIDATE_STORE_ENABLED"] = "false"
+        os.environ["SEMANTIC_RANKING_ENABLED"] = "false"
+        asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
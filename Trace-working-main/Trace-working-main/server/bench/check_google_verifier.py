@@ -0,0 +1,108 @@
+"""
+Exercises GoogleTokenVerifier against a local certs server and a local
+token signer: cached certs, Cache-Control expiry with background refresh,
+and a single refetch on an unknown key id.
+
+    python bench/check_google_verifier.py
+"""
+import asyncio
+import datetime
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.x509.oid import NameOID
+from google.auth import crypt, jwt
+
+from stubs import CertsStubHandler, StubServer
+
+
+def make_key(kid):
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, kid)])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(name).issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - datetime.timedelta(days=1))
+        .not_valid_after(now + datetime.timedelta(days=1))
+        .sign(key, hashes.SHA256())
+    )
+    private_pem = key.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    )
+    signer = crypt.RSASigner.from_string(private_pem, key_id=kid)
+    return signer, cert.public_bytes(serialization.Encoding.PEM).decode()
+
+
+def sign(signer, email="recruiter@example.com"):
+    now = int(time.time())
+    return jwt.encode(signer, {
+        "iss": "https://accounts.google.com",
+        "aud": "trace-test-client",
+        "sub": "1234",
+        "email": email,
+        "name": "Test Recruiter",
+        "iat": now,
+        "exp": now + 600,
+    }).decode()
+
+
+def check(label, condition):
+    print(f"{'PASS' if condition else 'FAIL'}  {label}")
+    if not condition:
+        sys.exit(1)
+
+
+async def run(stub_url, state, keys):
+    import google_verifier
+    google_verifier.GOOGLE_CERTS_REFRESH_MARGIN = 1
+    google_verifier.GOOGLE_CERTS_MIN_REFETCH_INTERVAL = 0
+    verifier = google_verifier.GoogleTokenVerifier(certs_url=stub_url, audience="trace-test-client")
+
+    claims = await verifier.verify(sign(keys["k1"][0]))
+    check("valid token verifies", claims["email"] == "recruiter@example.com")
+    for _ in range(20):
+        await verifier.verify(sign(keys["k1"][0]))
+    check("certs fetched once for 21 logins", state["requests"] == 1)
+
+    # Google rotates in a new key; the first token using it triggers one refetch
+    state["certs"] = {"k1": keys["k1"][1], "k2": keys["k2"][1]}
+    await verifier.verify(sign(keys["k2"][0]))
+    check("unknown kid refetches once", state["requests"] == 2 and verifier.unknown_kid_refetches == 1)
+
+    try:
+        await verifier.verify(sign(keys["k3"][0]))
+        check("token from an unpublished key is rejected", False)
+    except ValueError:
+        check("token from an unpublished key is rejected", state["requests"] == 3)
+
+    # max-age=2 with a 1s margin: the background refresh fires after ~1s
+    state["max_age"] = 2
+    await verifier._refresh()
+    before = state["requests"]
+    await asyncio.sleep(1.5)
+    check("background refresh runs before expiry", state["requests"] == before + 1)
+    start = time.perf_counter()
+    await verifier.verify(sign(keys["k1"][0]))
+    check("verify after refresh needs no fetch", state["requests"] == before + 1)
+    print(f"      cached verify took {(time.perf_counter() - start) * 1000:.2f}ms; stats {verifier.stats()}")
+    verifier.close()
+
+
+def main():
+    keys = {kid: make_key(kid) for kid in ("k1", "k2", "k3")}
+    state = {"certs": {"k1": keys["k1"][1]}, "max_age": 3600}
+    with StubServer(CertsStubHandler, state=state) as stub:
+        asyncio.run(run(stub.url + "/oauth2/v1/certs", state, keys))
+
+
+if __name__ == "__main__":
+    main()
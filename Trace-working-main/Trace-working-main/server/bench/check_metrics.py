@@ -0,0 +1,148 @@
+"""
+Checks the /metrics registry: concurrent recording from many threads loses
+no observations, the exposition is valid Prometheus text, the middleware
+labels requests by route template and status, upstream calls record their
+outcome, and recording stays cheap enough to sit on every request.
+
+    python bench/check_metrics.py [--observations 200000]
+"""
+import argparse
+import asyncio
+import os
+import re
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import metrics
+from metrics import Histogram, Registry, MetricsMiddleware, upstream_call
+
+SAMPLE_LINE = re.compile(r'^[a-zA-Z_:][a-zA-Z0-9_:]*(\{([a-zA-Z_][a-zA-Z0-9_]*="([^"\\]|\\.)*",?)*\})? [-+0-9.eInf]+$')
+
+
+def check(label, condition):
+    print(f"{'PASS' if condition else 'FAIL'}  {label}")
+    if not condition:
+        sys.exit(1)
+
+
+def value(text, sample):
+    for line in text.splitlines():
+        if line.startswith(sample + " "):
+            return float(line.rsplit(" ", 1)[1])
+    return None
+
+
+class Route:
+    def __init__(self, path):
+        self.path = path
+
+
+async def fake_app(scope, receive, send):
+    # What Starlette's router does: record the matched route, then respond
+    if scope["path"].startswith("/api/users/"):
+        scope["route"] = Route("/api/users/{user_id}")
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"{}"})
+    elif scope["path"] == "/boom":
+        scope["route"] = Route("/boom")
+        raise RuntimeError("boom")
+    else:
+        await send({"type": "http.response.start", "status": 404, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+
+async def call(app, path):
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        pass
+
+    try:
+        await app({"type": "http", "method": "GET", "path": path, "headers": []}, receive, send)
+    except RuntimeError:
+        pass
+
+
+async def upstream_checks():
+    with upstream_call("github", "search") as c:
+        c["outcome"] = "200"
+    try:
+        with upstream_call("ollama", "chat"):
+            raise ValueError("model down")
+    except ValueError:
+        pass
+    task = asyncio.ensure_future(_slow_upstream())
+    await asyncio.sleep(0.01)
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+
+
+async def _slow_upstream():
+    with upstream_call("db", "select"):
+        await asyncio.sleep(10)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--observations", type=int, default=200000)
+    args = parser.parse_args()
+
+    registry = Registry()
+    histogram = registry.register(Histogram("t_seconds", "Test.", ("route",)))
+    threads, per_thread = 8, args.observations // 8
+
+    def record():
+        for n in range(per_thread):
+            histogram.observe((n % 100) / 1000, "/a")
+
+    workers = [threading.Thread(target=record) for _ in range(threads)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    text = registry.render()
+    check(f"{threads} threads x {per_thread} observations all counted",
+          value(text, 't_seconds_count{route="/a"}') == threads * per_thread)
+    check("+Inf bucket equals count", value(text, 't_seconds_bucket{route="/a",le="+Inf"}') == threads * per_thread)
+    check("buckets are cumulative",
+          value(text, 't_seconds_bucket{route="/a",le="0.05"}') <= value(text, 't_seconds_bucket{route="/a",le="0.1"}'))
+
+    app = MetricsMiddleware(fake_app)
+
+    async def requests():
+        for path in ("/api/users/1", "/api/users/2", "/nope", "/boom"):
+            await call(app, path)
+        await upstream_checks()
+
+    asyncio.run(requests())
+    text = metrics.METRICS.render()
+    check("requests grouped by route template",
+          value(text, 'trace_http_request_duration_seconds_count{route="/api/users/{user_id}",method="GET",status="200"}') == 2)
+    check("unmatched paths share one series",
+          value(text, 'trace_http_request_duration_seconds_count{route="unmatched",method="GET",status="404"}') == 1)
+    check("exceptions recorded as 500",
+          value(text, 'trace_http_request_duration_seconds_count{route="/boom",method="GET",status="500"}') == 1)
+    check("no requests left in flight", value(text, "trace_http_requests_in_flight") == 0)
+    for labels in ('upstream="github",operation="search",outcome="200"',
+                   'upstream="ollama",operation="chat",outcome="error"',
+                   'upstream="db",operation="select",outcome="cancelled"'):
+        check(f"upstream {labels}", value(text, f"trace_upstream_request_duration_seconds_count{{{labels}}}") == 1)
+    check("upstream in-flight gauges back to zero",
+          all(v == 0 for v in (value(text, f'trace_upstream_requests_in_flight{{upstream="{u}"}}') for u in ("github", "ollama", "db"))))
+    malformed = [l for l in text.splitlines() if l and not l.startswith("#") and not SAMPLE_LINE.match(l)]
+    check("every sample line is valid exposition format", not malformed)
+
+    start = time.perf_counter()
+    for n in range(args.observations):
+        histogram.observe(0.02, "/a")
+    observe_us = (time.perf_counter() - start) / args.observations * 1e6
+    print(f"      observe(): {observe_us:.2f}us per call")
+    check("recording costs under 5us", observe_us < 5)
+
+
+if __name__ == "__main__":
+    main()
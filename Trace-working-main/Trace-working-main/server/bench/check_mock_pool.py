@@ -0,0 +1,87 @@
+"""
+Checks the mock candidate pool against an Ollama stub: generation asks for
+JSON-schema output, repeated (skill, location) pairs are served from the
+cache, concurrent misses share one generation, and the background worker
+pre-generates pools for the configured skills and locations.
+
+    python bench/check_mock_pool.py [--chat-latency 0.5]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stubs import OllamaStubHandler, StubServer
+
+
+def check(label, condition):
+    print(f"{'PASS' if condition else 'FAIL'}  {label}")
+    if not condition:
+        sys.exit(1)
+
+
+def structured(request):
+    # One profile per requested candidate, named after the prompt's count
+    prompt = request["messages"][-1]["content"]
+    count = int(prompt.split("Generate ", 1)[1].split()[0])
+    return {"candidates": [
+        {"name": f"Dev {n}", "role": "Engineer", "bio": "Builds things", "skills": ["Go", "SQL", "Docker"],
+         "experience": f"{n + 2} years", "score": 90}
+        for n in range(count)
+    ]}
+
+
+async def run(state):
+    import ai_engine
+
+    pool = ai_engine.MOCK_CANDIDATE_POOL
+    start = time.perf_counter()
+    first = await ai_engine.generate_mock_candidates("Go", "Berlin")
+    cold_ms = (time.perf_counter() - start) * 1000
+    check("generation requests structured JSON output", state["formats"] == 1)
+    check("profiles parse without the 9991 fallback", len(first) == 3 and all(c["id"] != 9991 for c in first))
+
+    start = time.perf_counter()
+    again = await ai_engine.generate_mock_candidates("  go", "BERLIN ")
+    warm_ms = (time.perf_counter() - start) * 1000
+    check("a repeated (skill, location) is served from the pool", len(again) == 3 and state["chats"] == 1)
+    print(f"      generated in {cold_ms:.0f}ms, cached in {warm_ms:.2f}ms")
+
+    await asyncio.gather(*(ai_engine.generate_mock_candidates("Rust", "Oslo") for _ in range(5)))
+    check("concurrent misses share one generation", state["chats"] == 2)
+
+    ai_engine.MOCK_PREWARM_SKILLS[:] = ["Python", "React"]
+    ai_engine.MOCK_PREWARM_LOCATIONS[:] = ["Remote"]
+    pool.start()
+    for _ in range(100):
+        if pool.prewarmed == 2:
+            break
+        await asyncio.sleep(0.05)
+    await pool.close()
+    check("the background worker pre-generates common pools", pool.prewarmed == 2)
+    print(f"      stats {pool.stats()}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chat-latency", type=float, default=0.5)
+    args = parser.parse_args()
+
+    state = {"formats": 0}
+
+    def counted(request):
+        state["formats"] += 1
+        return structured(request)
+
+    with StubServer(OllamaStubHandler, latency=args.chat_latency, structured=counted, state=state) as stub:
+        os.environ["OLLAMA_HOST"] = stub.url
+        os.environ["CANDIDATE_STORE_ENABLED"] = "false"
+        os.environ["SEMANTIC_RANKING_ENABLED"] = "false"
+        asyncio.run(run(state))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Checks on-demand request profiling and the event-loop watchdog against a
+small ASGI app: only requests carrying the admin token are profiled, the
+profile covers time spent awaiting and tasks the request spawned, both
+export formats are well formed, and a blocking call inside a handler is
+reported by name.
+
+    python bench/check_profiling.py
+"""
+import asyncio
+import json
+import os
+import subprocess
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ["PROFILE_ADMIN_TOKEN"] = "secret"
+os.environ["PROFILE_INTERVAL_MS"] = "2"
+os.environ["LOOP_BLOCK_THRESHOLD_MS"] = "50"
+
+from profiling import ProfilingMiddleware, LOOP_WATCHDOG, PROFILES
+
+
+def check(label, condition):
+    print(f"{'PASS' if condition else 'FAIL'}  {label}")
+    if not condition:
+        sys.exit(1)
+
+
+async def fetch_upstream():
+    await asyncio.sleep(0.05)
+
+
+async def background_enrichment():
+    await asyncio.sleep(0.05)
+
+
+def blocking_handler_step():
+    # A synchronous call on the event loop, like ollama.chat or an inline argon2 hash
+    subprocess.run([sys.executable, "-c", "import time; time.sleep(0.3)"], check=True)
+
+
+async def app(scope, receive, send):
+    await fetch_upstream()
+    await asyncio.create_task(background_enrichment())
+    if scope["path"] == "/api/login":
+        blocking_handler_step()
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+
+async def call(app, path, headers=(), query=b""):
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": "GET", "path": path, "headers": list(headers), "query_string": query}
+    await app(scope, receive, send)
+    return dict(sent[0]["headers"]).get(b"x-profile-id", b"").decode() or None
+
+
+async def main():
+    LOOP_WATCHDOG.start()
+    wrapped = ProfilingMiddleware(app)
+
+    check("requests without a token are not profiled", await call(wrapped, "/api/search") is None)
+    check("a wrong token is ignored", await call(wrapped, "/api/search", [(b"x-profile-token", b"guess")]) is None)
+
+    profile_id = await call(wrapped, "/api/search", [(b"x-profile-token", b"secret")])
+    profile = PROFILES.peek(profile_id)
+    check("token header profiles the request and returns X-Profile-Id", profile is not None)
+    stacks = profile.collapsed().splitlines()
+    check("profile shows the handler awaiting upstream",
+          any("app;__main__.fetch_upstream;" in s and "[awaiting]" in s for s in stacks))
+    check("tasks spawned by the request are sampled",
+          any(s.startswith("__main__.background_enrichment;") for s in stacks))
+    doc = json.loads(json.dumps(profile.speedscope()))
+    shape = doc["profiles"][0]
+    check("speedscope export is well formed",
+          len(shape["samples"]) == len(shape["weights"]) and all(
+              i < len(doc["shared"]["frames"]) for sample in shape["samples"] for i in sample))
+    print(f"      {profile.summary()['samples']} samples over {profile.duration_ms}ms")
+
+    check("the token is not accepted in the query string",
+          await call(wrapped, "/api/search", query=b"profile=secret") is None)
+    check("the task factory is only installed while a profile runs",
+          asyncio.get_running_loop().get_task_factory() is None)
+    profile_id = await call(wrapped, "/api/login", [(b"x-profile-token", b"secret")])
+    await asyncio.sleep(0.1)  # Let the watchdog see the loop recover
+    report = LOOP_WATCHDOG.report()
+    blocks = [b for b in report["recent"] if b["culprit"] == "subprocess.run"]
+    check("the blocked request was profiled", PROFILES.peek(profile_id) is not None)
+    check("watchdog names the blocking call", bool(blocks))
+    check("blocking caller is the handler function", blocks and blocks[0]["caller"].endswith("blocking_handler_step"))
+    check("block duration roughly matches", blocks and 200 <= blocks[0]["duration_ms"] <= 600)
+    check("block is attached to the profiled request", PROFILES.peek(profile_id).blocks[:1] == blocks[:1])
+    print(f"      {blocks[0]['culprit']} <- {blocks[0]['caller']}: {blocks[0]['duration_ms']}ms")
+    await LOOP_WATCHDOG.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
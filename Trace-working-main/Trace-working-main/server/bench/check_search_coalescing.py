@@ -0,0 +1,92 @@
+"""
+Fires identical searches concurrently against a slow GitHub stub and checks
+they share one upstream fetch, plus SingleFlight's error and cancellation
+behaviour.
+
+    python bench/check_search_coalescing.py [--callers 20]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stubs import GitHubStubHandler, StubServer
+
+
+def check(label, condition):
+    print(f"{'PASS' if condition else 'FAIL'}  {label}")
+    if not condition:
+        sys.exit(1)
+
+
+async def check_single_flight():
+    from caching import SingleFlight
+
+    flights = SingleFlight()
+
+    async def boom():
+        await asyncio.sleep(0.05)
+        raise RuntimeError("upstream down")
+
+    outcomes = await asyncio.gather(*(flights.do("k", boom) for _ in range(3)), return_exceptions=True)
+    check("an upstream error reaches every caller", all(isinstance(o, RuntimeError) for o in outcomes))
+    check("the key is released after a failure", flights.stats()["in_flight"] == 0)
+
+    started = []
+
+    async def slow():
+        started.append(1)
+        await asyncio.sleep(0.1)
+        return "ok"
+
+    first = asyncio.create_task(flights.do("s", slow))
+    second = asyncio.create_task(flights.do("s", slow))
+    await asyncio.sleep(0.01)
+    first.cancel()
+    check("a cancelled caller leaves the shared fetch running", await second == "ok" and len(started) == 1)
+
+    lone = asyncio.create_task(flights.do("t", slow))
+    await asyncio.sleep(0.01)
+    lone.cancel()
+    await asyncio.gather(lone, return_exceptions=True)
+    await asyncio.sleep(0)
+    check("the fetch is cancelled once every caller has gone", flights.abandoned == 1 and flights.stats()["in_flight"] == 0)
+
+
+async def run(state, callers):
+    import integrations
+
+    await integrations.start_http_client()
+    start = time.perf_counter()
+    pages = await asyncio.gather(*(
+        integrations.search_candidates("Rust  developer" if n % 2 else "rust developer", session_id=f"s{n}")
+        for n in range(callers)
+    ))
+    elapsed = time.perf_counter() - start
+    check(f"{callers} identical searches share one GitHub search", state["searches"] == 1)
+    check("every caller gets the same first page", all(p == pages[0] and len(p) == 3 for p in pages))
+    print(f"      {callers} callers in {elapsed * 1000:.0f}ms; {state['profiles']} profile fetches")
+    print(f"      stats {integrations.SEARCH_FLIGHTS.stats()}")
+    await integrations.close_http_client()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--callers", type=int, default=20)
+    args = parser.parse_args()
+
+    asyncio.run(check_single_flight())
+    state = {}
+    with StubServer(GitHubStubHandler, latency=0.1, state=state) as stub:
+        os.environ["GITHUB_API_URL"] = stub.url
+        os.environ["GITHUB_CACHE_ENABLED"] = "false"
+        os.environ["CANDIDATE_STORE_ENABLED"] = "false"
+        os.environ["SEMANTIC_RANKING_ENABLED"] = "false"
+        asyncio.run(run(state, args.callers))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Pages through a search well past the first GitHub page against a slow stub
+and checks further pages are fetched lazily, prefetched in the background,
+and served from memory by load_more. A user who catches up with a
+prefetch promotes it, and a failed page is retried rather than ending
+the results.
+
+    python bench/check_search_pagination.py [--total 40] [--latency 0.1]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stubs import GitHubStubHandler, StubServer
+
+
+def check(label, condition):
+    print(f"{'PASS' if condition else 'FAIL'}  {label}")
+    if not condition:
+        sys.exit(1)
+
+
+async def run(state, total, latency):
+    import integrations
+
+    await integrations.start_http_client()
+    seen = list(await integrations.search_candidates("go developer", session_id="a"))
+    check("the first search fetches one GitHub page", state["searches"] == 1)
+
+    timings = []
+    while True:
+        start = time.perf_counter()
+        batch = await integrations.search_candidates("go developer", load_more=True, session_id="a")
+        timings.append(time.perf_counter() - start)
+        if not batch:
+            break
+        seen.extend(batch)
+        # Give the background prefetch a moment, as a user reading results would
+        await asyncio.sleep(latency * 5)
+
+    usernames = [c["username"] for c in seen]
+    check(f"load_more pages through all {total} users", len(usernames) == total)
+    check("no user is shown twice", len(set(usernames)) == total)
+    pages = -(-total // integrations.GITHUB_PAGE_SIZE)
+    check(f"each of the {pages} GitHub pages is fetched once", state["searches"] == pages)
+    stats = integrations.search_page_stats()
+    check("further pages come from background prefetch", stats["prefetches"] >= pages - 1 and stats["foreground_waits"] == 0)
+    print(f"      {len(timings)} load_more calls, slowest {max(timings) * 1000:.1f}ms")
+
+    other = await integrations.search_candidates("go developer", load_more=True, session_id="b")
+    check("another session reads the shared buffer from its own cursor", [c["username"] for c in other] == usernames[3:6])
+
+    # Reading past the buffer while its prefetch is in flight joins it, at interactive priority
+    await integrations.search_candidates("rust developer", session_id="c")
+    prefetches = integrations.search_page_stats()["prefetches"]
+    while integrations.search_page_stats()["prefetches"] == prefetches:
+        await integrations.search_candidates("rust developer", load_more=True, session_id="c")
+    await integrations.search_candidates("rust developer", load_more=True, session_id="c")
+    check("a page already being prefetched is not prefetched again",
+          integrations.search_page_stats()["prefetches"] == prefetches + 1)
+    for _ in range(integrations.SEARCH_PREFETCH_MARGIN // 3 + 2):
+        await integrations.search_candidates("rust developer", load_more=True, session_id="c")
+    check("a prefetch a user is waiting on is promoted",
+          integrations.search_page_stats()["promoted"] >= 1 and integrations.GITHUB_SCHEDULER.stats()["promoted"] >= 1)
+
+    # A failed page is retried later instead of ending the results
+    found = list(await integrations.search_candidates("java developer", session_id="d"))
+    state["fail_searches"] = 1
+    for _ in range(total):
+        if len(found) >= total:
+            break
+        found.extend(await integrations.search_candidates("java developer", load_more=True, session_id="d"))
+        await asyncio.sleep(latency * 5)
+    stats = integrations.search_page_stats()
+    check("a failed GitHub page does not mark the results exhausted", stats["failed"] == 1 and len(found) == total)
+    print(f"      stats {stats}")
+    await integrations.cancel_prefetches()
+    await integrations.close_http_client()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--total", type=int, default=40)
+    parser.add_argument("--latency", type=float, default=0.1)
+    args = parser.parse_args()
+
+    state = {}
+    with StubServer(GitHubStubHandler, latency=args.latency, total_count=args.total, state=state) as stub:
+        os.environ["GITHUB_API_URL"] = stub.url
+        os.environ["GITHUB_CACHE_ENABLED"] = "false"
+        os.environ["CANDIDATE_STORE_ENABLED"] = "false"
+        os.environ["SEMANTIC_RANKING_ENABLED"] = "false"
+        asyncio.run(run(state, args.total, args.latency))
+
+
+if __name__ == "__main__":
+    main()
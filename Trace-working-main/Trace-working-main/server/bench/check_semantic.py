@@ -0,0 +1,97 @@
+"""
+Exercises the semantic ranking stage against a local Ollama embeddings
+stub: batched and incremental embedding, the on-disk index being written
+off the loop and surviving a reload, "frontend" finding React developers,
+and falling back to the keyword order when Ollama is down.
+
+    python bench/check_semantic.py
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from stubs import OllamaStubHandler, StubServer
+
+POOL = [
+    {"id": 1, "name": "Sarah Chen", "role": "Senior Developer", "skills": ["React", "TypeScript"]},
+    {"id": 2, "name": "Alex Rodriguez", "role": "Backend Engineer", "skills": ["Go", "Docker", "Kubernetes"]},
+    {"id": 3, "name": "Emma Wilson", "role": "UI/UX Designer", "skills": ["Figma", "User Research"]},
+]
+
+
+def check(label, condition):
+    print(f"{'PASS' if condition else 'FAIL'}  {label}")
+    if not condition:
+        sys.exit(1)
+
+
+async def run(state, index_dir):
+    import semantic
+
+    ranker = semantic.SemanticRanker(semantic.VectorIndex(index_dir))
+    hits = await ranker.search("frontend", POOL, k=3, min_similarity=0.3)
+    check("'frontend' finds the React developer first", hits and hits[0]["id"] == 1)
+    check("pool embedded in one batched call", state["embed_calls"] == 2 and state["embedded"] == 4)
+
+    await ranker.search("frontend", POOL, k=3)
+    check("unchanged candidates and cached query are not re-embedded", state["embed_calls"] == 2)
+
+    edited = [dict(POOL[1], skills=["Go", "gRPC"])] + POOL[:1] + POOL[2:]
+    await ranker.search("frontend", edited, k=3)
+    check("only the changed candidate is re-embedded", state["embedded"] == 5)
+
+    check("upserts leave the disk write to the debounced save",
+          not os.path.exists(ranker.index.manifest_path) and ranker.stats()["unsaved"])
+    await ranker.close()
+    check("close persists pending upserts", ranker.stats()["saves"] == 1 and not ranker.stats()["unsaved"])
+    reloaded = semantic.VectorIndex(index_dir)
+    check("index reloads from disk", reloaded.count == 3 and reloaded.stale(
+        [(semantic.candidate_key(c), semantic.candidate_text(c)) for c in edited]) == [])
+
+    results = [dict(c, score=90 - i) for i, c in enumerate([POOL[2], POOL[1], POOL[0]])]
+    ranked = await ranker.rerank("frontend", results)
+    check("rerank lifts the semantic match over higher scores", ranked[0]["id"] == 1 and "relevance" in ranked[0])
+
+    # 20k vectors: brute-force top-k over the memory-mapped index
+    big = semantic.VectorIndex(os.path.join(index_dir, "big"))
+    rng = np.random.default_rng(0)
+    big.upsert([(f"k{i}", str(i)) for i in range(20000)], rng.standard_normal((20000, 64)))
+    start = time.perf_counter()
+    big.search(rng.standard_normal(64), k=10)
+    print(f"      top-10 over 20000 vectors: {(time.perf_counter() - start) * 1000:.2f}ms")
+
+
+async def run_offline(index_dir):
+    import semantic
+
+    ranker = semantic.SemanticRanker(semantic.VectorIndex(index_dir))
+    results = [dict(c, score=90 - i) for i, c in enumerate(POOL)]
+    start = time.perf_counter()
+    ranked = await ranker.rerank("frontend", results)
+    check("Ollama down: keyword order is kept", ranked == results)
+    again = await ranker.rerank("frontend", results)
+    check("Ollama down: later searches skip the stage", again == results and ranker.stats()["backoff_remaining"] > 0)
+    print(f"      degraded rerank took {(time.perf_counter() - start) * 1000:.2f}ms")
+
+
+def main():
+    state = {}
+    aliases = {"frontend": "react"}
+    with tempfile.TemporaryDirectory() as index_dir:
+        with StubServer(OllamaStubHandler, aliases=aliases, state=state) as stub:
+            os.environ["OLLAMA_HOST"] = stub.url
+            asyncio.run(run(state, index_dir))
+        # Nothing listening any more: the stage must degrade, not fail
+        import ai_engine
+        ai_engine.INFERENCE_POOL._client = None
+        asyncio.run(run_offline(os.path.join(index_dir, "offline")))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+"""
+Local stand-ins for the upstream services TRACE talks to, so benchmarks
+can run without network access or API quota.
+"""
+import hashlib
+import json
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+_LIMITS_LOCK = threading.Lock()
+
+
+class StubServer:
+    """
+    Runs a handler class on a background thread. Use as a context manager;
+    `url` is the base URL to point the app at.
+    """
+
+    def __init__(self, handler_cls, **options):
+        handler = type(handler_cls.__name__, (handler_cls,), {"options": options})
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self.httpd.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class _JSONHandler(BaseHTTPRequestHandler):
+    options = {}
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in {**getattr(self, "extra_headers", {}), **(headers or {})}.items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class GitHubStubHandler(_JSONHandler):
+    """
+    Serves /search/users and /users/<login> with the fields TRACE reads.
+
+    Options:
+      latency     - seconds to sleep before every response
+      total_count - number of users the search pretends to have
+      state       - dict; "searches" and "profiles" count requests served.
+                    Set "fail_searches" to answer the next N searches with 502.
+      limits      - dict enabling X-RateLimit-* headers: "per_token" requests
+                    per "window" seconds for each Authorization value, then
+                    403 until the window resets. Set "throttle" to answer the
+                    next N requests with 429 + Retry-After. "by_token" counts
+                    requests per token.
+
+    Profiles carry an ETag and honour If-None-Match with 304 responses.
+    """
+
+    def rate_limit(self, resource):
+        """
+        Applies `limits`; returns False if a 403/429 was already sent.
+        """
+        limits = self.options.get("limits")
+        self.extra_headers = {}
+        if limits is None:
+            return True
+        with _LIMITS_LOCK:
+            token = self.headers.get("Authorization") or "anonymous"
+            by_token = limits.setdefault("by_token", {})
+            by_token[token] = by_token.get(token, 0) + 1
+            if limits.get("throttle", 0) > 0:
+                limits["throttle"] -= 1
+                self.send_json(429, {"message": "You have exceeded a secondary rate limit"}, {"Retry-After": "1"})
+                return False
+            now = time.time()
+            windows = limits.setdefault("windows", {})
+            window = windows.get((token, resource))
+            if window is None or now >= window["reset"]:
+                window = windows[(token, resource)] = {"used": 0, "reset": now + limits.get("window", 60)}
+            window["used"] += 1
+            remaining = limits["per_token"] - window["used"]
+        self.extra_headers = {
+            "X-RateLimit-Limit": str(limits["per_token"]),
+            "X-RateLimit-Remaining": str(max(0, remaining)),
+            "X-RateLimit-Reset": str(int(window["reset"]) + 1),
+            "X-RateLimit-Resource": resource,
+        }
+        if remaining < 0:
+            self.send_json(403, {"message": "API rate limit exceeded"})
+            return False
+        return True
+
+    def base_url(self):
+        return f"http://{self.headers.get('Host')}"
+
+    def do_GET(self):
+        time.sleep(self.options.get("latency", 0.0))
+        parsed = urlparse(self.path)
+        query = parse_qs(parsed.query)
+
+        state = self.options.get("state")
+        if not self.rate_limit("search" if parsed.path.startswith("/search/") else "core"):
+            return
+
+        if parsed.path == "/search/users":
+            if state is not None:
+                state["searches"] = state.get("searches", 0) + 1
+                if state.get("fail_searches", 0) > 0:
+                    state["fail_searches"] -= 1
+                    self.send_json(502, {"message": "Server Error"})
+                    return
+            per_page = int(query.get("per_page", ["30"])[0])
+            page = int(query.get("page", ["1"])[0])
+            total = self.options.get("total_count", 100)
+            start = (page - 1) * per_page
+            items = [
+                {
+                    "id": n,
+                    "login": f"user{n}",
+                    "url": f"{self.base_url()}/users/user{n}",
+                    "html_url": f"https://github.com/user{n}",
+                    "avatar_url": f"https://avatars.example/{n}",
+                }
+                for n in range(start, min(total, start + per_page))
+            ]
+            self.send_json(200, {"total_count": total, "items": items})
+        elif parsed.path.startswith("/users/"):
+            if state is not None:
+                state["profiles"] = state.get("profiles", 0) + 1
+            login = parsed.path.rsplit("/", 1)[-1]
+            n = int("".join(ch for ch in login if ch.isdigit()) or 0)
+            profile = {
+                "login": login,
+                "name": f"User {n}",
+                "bio": "Stub profile",
+                "location": "London",
+                "avatar_url": f"https://avatars.example/{n}",
+                "public_repos": n % 40,
+                "followers": n * 3 % 200,
+            }
+            etag = '"%s"' % hashlib.sha1(json.dumps(profile).encode()).hexdigest()
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                for key, value in self.extra_headers.items():
+                    self.send_header(key, value)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.send_json(200, profile, {"ETag": etag})
+        else:
+            self.send_json(404, {"message": "Not Found"})
+
+
+class OllamaStubHandler(_JSONHandler):
+    """
+    Serves POST /api/chat like a local Ollama, including NDJSON streaming,
+    and POST /api/embed with hashed bag-of-words vectors.
+
+    Options:
+      latency - seconds to "generate" the whole reply
+      prompt_latency - extra seconds per 1000 prompt characters, like
+                       prompt evaluation on a real model
+      reply   - assistant message content
+      structured - callable(request) returning the object to send, as JSON
+                   content, when a chat request sets `format`
+      aliases - {word: word} folded together before embedding, so related
+                terms ("frontend" -> "react") land close to each other
+      state   - dict; "embed_calls" and "embedded" count /api/embed usage,
+                "chats" counts /api/chat requests
+    """
+
+    EMBED_DIM = 64
+
+    def _embed(self, text):
+        aliases = self.options.get("aliases", {})
+        vector = [0.0] * self.EMBED_DIM
+        for word in text.lower().replace(",", " ").replace(".", " ").split():
+            word = aliases.get(word, word)
+            vector[zlib.crc32(word.encode()) % self.EMBED_DIM] += 1.0
+        return vector
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        request = json.loads(self.rfile.read(length) or b"{}")
+        if self.path == "/api/embed":
+            texts = request.get("input") or []
+            texts = [texts] if isinstance(texts, str) else texts
+            state = self.options.get("state")
+            if state is not None:
+                state["embed_calls"] = state.get("embed_calls", 0) + 1
+                state["embedded"] = state.get("embedded", 0) + len(texts)
+            self.send_json(200, {"model": request.get("model", "stub"), "embeddings": [self._embed(t) for t in texts]})
+            return
+        if self.path != "/api/chat":
+            self.send_json(404, {"error": "not found"})
+            return
+        state = self.options.get("state")
+        if state is not None:
+            state["chats"] = state.get("chats", 0) + 1
+        prompt_chars = sum(len(str(m.get("content") or "")) for m in request.get("messages") or [])
+        latency = self.options.get("latency", 0.0) + self.options.get("prompt_latency", 0.0) * prompt_chars / 1000
+        reply = self.options.get("reply", "Happy to help.")
+        if request.get("format") and self.options.get("structured"):
+            reply = json.dumps(self.options["structured"](request))
+
+        def chunk(content, done):
+            return {
+                "model": request.get("model", "stub"),
+                "created_at": "2024-01-01T00:00:00Z",
+                "message": {"role": "assistant", "content": content},
+                "done": done,
+            }
+
+        if not request.get("stream"):
+            time.sleep(latency)
+            self.send_json(200, chunk(reply, True))
+            return
+
+        # Stream word by word, spreading the latency across tokens
+        tokens = [word + " " for word in reply.split(" ")]
+        tokens[-1] = tokens[-1].rstrip()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        for token in tokens:
+            time.sleep(latency / len(tokens))
+            self.wfile.write(json.dumps(chunk(token, False)).encode() + b"\n")
+            self.wfile.flush()
+        self.wfile.write(json.dumps(chunk("", True)).encode() + b"\n")
+        self.close_connection = True
+
+
+class CertsStubHandler(_JSONHandler):
+    """
+    Serves Google-style signing certs ({kid: PEM}) at any path.
+
+    Options:
+      state - dict with "certs" and "max_age"; mutate it to rotate keys.
+              "requests" is incremented on every fetch.
+    """
+
+    def do_GET(self):
+        state = self.options["state"]
+        state["requests"] = state.get("requests", 0) + 1
+        self.send_json(200, state["certs"], {
+            "Cache-Control": f"public, max-age={state.get('max_age', 3600)}, must-revalidate",
+        })
@@ -0,0 +1,179 @@
+import asyncio
+import json
+import time
+from collections import OrderedDict
+
+
+def approx_size(value):
+    """
+    Rough in-memory footprint of a JSON-like value, in bytes.
+    """
+    try:
+        return len(json.dumps(value, default=str))
+    except (TypeError, ValueError):
+        return 0
+
+
+class TTLCache:
+    """
+    In-process LRU cache with optional per-entry TTL.
+
+    Entries are evicted least-recently-used first once either `max_entries`
+    or `max_bytes` (measured with `sizeof`) is exceeded. Expired entries are
+    dropped lazily on access and during eviction.
+    """
+
+    def __init__(self, max_entries=1024, max_bytes=None, ttl=None, sizeof=approx_size):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.sizeof = sizeof
+        self._data = OrderedDict()  # key -> (value, expires_at, size)
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def _expired(self, expires_at, now):
+        return expires_at is not None and expires_at <= now
+
+    def _drop(self, key):
+        _, _, size = self._data.pop(key)
+        self._bytes -= size
+
+    def get(self, key, default=None):
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+        value, expires_at, _ = entry
+        if self._expired(expires_at, time.monotonic()):
+            self._drop(key)
+            self.expirations += 1
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def peek(self, key, default=None):
+        """
+        Like get() but without touching LRU order or stats.
+        """
+        entry = self._data.get(key)
+        if entry is None or self._expired(entry[1], time.monotonic()):
+            return default
+        return entry[0]
+
+    def set(self, key, value, ttl=None):
+        if key in self._data:
+            self._drop(key)
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl else None
+        size = self.sizeof(value) if self.max_bytes else 0
+        self._data[key] = (value, expires_at, size)
+        self._bytes += size
+        self._evict()
+
+    def values(self):
+        """
+        Live values, least recently used first, without touching LRU order or stats.
+        """
+        now = time.monotonic()
+        return [value for value, expires_at, _ in list(self._data.values()) if not self._expired(expires_at, now)]
+
+    def pop(self, key, default=None):
+        if key not in self._data:
+            return default
+        value = self._data[key][0]
+        self._drop(key)
+        return value
+
+    def clear(self):
+        self._data.clear()
+        self._bytes = 0
+
+    def _evict(self):
+        now = time.monotonic()
+        while self._data and (
+            len(self._data) > self.max_entries
+            or (self.max_bytes and self._bytes > self.max_bytes)
+        ):
+            key = next(iter(self._data))
+            if self._expired(self._data[key][1], now):
+                self.expirations += 1
+            else:
+                self.evictions += 1
+            self._drop(key)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._data),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls for the same key onto one in-flight task.
+
+    Every caller awaits the shared task through asyncio.shield, so one
+    caller being cancelled does not cancel the work for the others; the
+    task is only cancelled once every caller has gone. Exceptions reach all
+    callers, and the key is released as soon as the task finishes, so the
+    next call after a failure starts fresh.
+    """
+
+    def __init__(self):
+        self._flights = {}  # key -> [task, waiters]
+        self.calls = 0
+        self.coalesced = 0
+        self.abandoned = 0
+
+    def _finished(self, key, flight, task):
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        if not task.cancelled():
+            task.exception()  # Marks the exception as retrieved
+
+    async def do(self, key, fn):
+        """
+        Returns the result of `fn()` (a coroutine function), shared with any
+        identical call already in flight.
+        """
+        self.calls += 1
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = [asyncio.create_task(fn()), 0]
+            self._flights[key] = flight
+            flight[0].add_done_callback(lambda task: self._finished(key, flight, task))
+        else:
+            self.coalesced += 1
+        task = flight[0]
+        flight[1] += 1
+        try:
+            return await asyncio.shield(task)
+        finally:
+            flight[1] -= 1
+            if flight[1] == 0 and not task.done():
+                self.abandoned += 1
+                task.cancel()
+
+    def stats(self):
+        return {
+            "calls": self.calls,
+            "coalesced": self.coalesced,
+            "abandoned": self.abandoned,
+            "in_flight": len(self._flights),
+            "coalesced_rate": round(self.coalesced / self.calls, 3) if self.calls else 0.0,
+        }
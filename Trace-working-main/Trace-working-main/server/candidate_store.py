@@ -0,0 +1,253 @@
+import asyncio
+import datetime
+import os
+import time
+
+from sqlalchemy import func, select
+
+from app_logging import get_logger
+
+log = get_logger("candidate_store")
+
+CANDIDATE_STORE_ENABLED = os.getenv("CANDIDATE_STORE_ENABLED", "true").lower() in ("1", "true", "yes")
+# Stored profiles older than this are still served, but refreshed in the background
+CANDIDATE_STALE_AFTER = float(os.getenv("CANDIDATE_STALE_AFTER", str(24 * 3600)))
+# A local answer needs at least this many matches, otherwise GitHub is asked
+CANDIDATE_LOCAL_MIN_RESULTS = int(os.getenv("CANDIDATE_LOCAL_MIN_RESULTS", "10"))
+# Rows per INSERT ... ON DUPLICATE KEY / ON CONFLICT statement
+CANDIDATE_UPSERT_BATCH = int(os.getenv("CANDIDATE_UPSERT_BATCH", "500"))
+# A lookup slower than this counts as a failure and the search goes to GitHub
+CANDIDATE_LOOKUP_TIMEOUT = float(os.getenv("CANDIDATE_LOOKUP_TIMEOUT", "1"))
+# After this many failures in a row the store is skipped for CANDIDATE_RETRY_AFTER seconds
+CANDIDATE_BREAKER_FAILURES = int(os.getenv("CANDIDATE_BREAKER_FAILURES", "3"))
+CANDIDATE_RETRY_AFTER = float(os.getenv("CANDIDATE_RETRY_AFTER", "30"))
+
+# Words that say nothing about the skill, so "react developer" and
+# "react engineer" share stored answers
+GENERIC_TERMS = {"developer", "developers", "dev", "devs", "engineer", "engineers",
+                 "programmer", "programmers", "expert", "experts"}
+
+
+def query_terms(query):
+    """
+    The lowercased terms a query is stored and looked up under, without
+    generic role words or duplicates. A local answer must match all of them.
+    """
+    terms = {word[:100] for word in (query or "").lower().split() if word not in GENERIC_TERMS}
+    return sorted(terms)
+
+
+def _like_pattern(text):
+    # % and _ in user input are literal characters, not wildcards
+    escaped = text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def _upsert(dialect, table, rows, keys, update):
+    """
+    Dialect-specific bulk upsert: MySQL ON DUPLICATE KEY UPDATE, SQLite (and
+    Postgres) ON CONFLICT DO UPDATE. An empty `update` ignores duplicates.
+    """
+    if dialect == "mysql":
+        from sqlalchemy.dialects.mysql import insert
+        stmt = insert(table).values(rows)
+        if update:
+            return stmt.on_duplicate_key_update({col: stmt.inserted[col] for col in update})
+        return stmt.prefix_with("IGNORE")
+    if dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        from sqlalchemy.dialects.postgresql import insert
+    stmt = insert(table).values(rows)
+    if update:
+        return stmt.on_conflict_do_update(index_elements=keys, set_={col: stmt.excluded[col] for col in update})
+    return stmt.on_conflict_do_nothing(index_elements=keys)
+
+
+class CandidateStore:
+    """
+    Keeps every enriched search result in the `candidates` table, tagged
+    with the query's terms, so repeated or overlapping queries (same terms,
+    same location) are answered from the database instead of GitHub. Writes
+    happen in the background; stale answers trigger one background refresh
+    per query.
+
+    Database errors never fail a search: the store reports a miss and the
+    caller goes to GitHub as before. After repeated failures the store is
+    skipped entirely for a while.
+    """
+
+    def __init__(self, enabled=CANDIDATE_STORE_ENABLED):
+        self.enabled = enabled
+        self.local_hits = 0
+        self.local_misses = 0
+        self.upserted = 0
+        self.refreshes = 0
+        self.errors = 0
+        self.consecutive_failures = 0
+        self.disabled_until = 0.0
+        self._refreshing = set()
+        self._tasks = set()
+
+    def _session(self):
+        # Imported on first use so modules that only need GitHub access
+        # (benchmarks, scripts) do not require database settings
+        from database import AsyncSessionLocal
+        return AsyncSessionLocal()
+
+    def available(self):
+        return self.enabled and time.monotonic() >= self.disabled_until
+
+    def _failed(self, event, error, **fields):
+        self.errors += 1
+        self.consecutive_failures += 1
+        if self.consecutive_failures >= CANDIDATE_BREAKER_FAILURES:
+            self.disabled_until = time.monotonic() + CANDIDATE_RETRY_AFTER
+            fields["retry_after"] = CANDIDATE_RETRY_AFTER
+        log.warning(event, error=str(error) or type(error).__name__, **fields)
+
+    async def _query(self, stmt):
+        async with self._session() as db:
+            return (await db.execute(stmt)).all()
+
+    async def lookup(self, query, location=None, limit=15):
+        """
+        Returns (candidates, stale) from the local store, best score first,
+        or None when there are too few matches to skip GitHub.
+        """
+        terms = query_terms(query)
+        if not terms or not self.available():
+            return None
+        try:
+            # Inside the guard: importing models creates the engine, which needs the DB driver
+            import models
+            # Candidates tagged with every term of the query
+            matching = (
+                select(models.CandidateSkill.candidate_id)
+                .where(models.CandidateSkill.skill.in_(terms))
+                .group_by(models.CandidateSkill.candidate_id)
+                .having(func.count() == len(terms))
+            )
+            stmt = (
+                select(models.Candidate.profile, models.Candidate.fetched_at)
+                .where(models.Candidate.id.in_(matching))
+                .order_by(models.Candidate.score.desc(), models.Candidate.id)
+                .limit(limit)
+            )
+            if location:
+                stmt = stmt.where(models.Candidate.location.ilike(_like_pattern(location), escape="\\"))
+            rows = await asyncio.wait_for(self._query(stmt), CANDIDATE_LOOKUP_TIMEOUT)
+        except Exception as e:
+            self._failed("candidate_lookup_failed", e)
+            return None
+        self.consecutive_failures = 0
+
+        if len(rows) < min(limit, CANDIDATE_LOCAL_MIN_RESULTS):
+            self.local_misses += 1
+            return None
+        self.local_hits += 1
+        cutoff = datetime.datetime.utcnow() - datetime.timedelta(seconds=CANDIDATE_STALE_AFTER)
+        stale = any(fetched_at < cutoff for _, fetched_at in rows)
+        return [profile for profile, _ in rows], stale
+
+    def schedule_upsert(self, query, candidates):
+        """
+        Runs `upsert` in the background, so storing results never delays
+        the search that fetched them.
+        """
+        if not candidates or not self.available():
+            return
+        task = asyncio.create_task(self.upsert(query, candidates))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def upsert(self, query, candidates):
+        """
+        Bulk-upserts enriched candidates and tags them with the query's terms.
+        """
+        if not candidates or not self.available():
+            return
+        terms = query_terms(query)
+        now = datetime.datetime.utcnow()
+        # One row per login; a later duplicate in the same batch wins
+        rows = list({
+            c["username"]: {
+                "login": c["username"],
+                "name": c.get("name"),
+                "location": (c.get("location") or "")[:255] or None,
+                "bio": c.get("bio"),
+                "score": c.get("score", 0),
+                "profile": c,
+                "fetched_at": now,
+            }
+            for c in candidates if c.get("username")
+        }.values())
+        try:
+            import models
+            async with self._session() as db:
+                dialect = db.get_bind().dialect.name
+                candidates_table = models.Candidate.__table__
+                for start in range(0, len(rows), CANDIDATE_UPSERT_BATCH):
+                    batch = rows[start:start + CANDIDATE_UPSERT_BATCH]
+                    await db.execute(_upsert(
+                        dialect, candidates_table, batch, ["login"],
+                        ["name", "location", "bio", "score", "profile", "fetched_at"],
+                    ))
+                    if terms:
+                        ids = (await db.execute(
+                            select(models.Candidate.id).where(models.Candidate.login.in_([r["login"] for r in batch]))
+                        )).scalars().all()
+                        await db.execute(_upsert(
+                            dialect, models.CandidateSkill.__table__,
+                            [{"candidate_id": i, "skill": term} for i in ids for term in terms],
+                            ["candidate_id", "skill"], [],
+                        ))
+                await db.commit()
+            self.upserted += len(rows)
+            self.consecutive_failures = 0
+        except Exception as e:
+            self._failed("candidate_upsert_failed", e, rows=len(rows))
+
+    def schedule_refresh(self, key, refresh):
+        """
+        Runs `refresh()` (a coroutine function) in the background, at most
+        once at a time per key.
+        """
+        if key in self._refreshing:
+            return
+        self._refreshing.add(key)
+        self.refreshes += 1
+
+        async def run():
+            try:
+                await refresh()
+            except Exception as e:
+                log.warning("candidate_refresh_failed", key=key, error=str(e))
+            finally:
+                self._refreshing.discard(key)
+
+        task = asyncio.create_task(run())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def close(self):
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def stats(self):
+        lookups = self.local_hits + self.local_misses
+        return {
+            "enabled": self.enabled,
+            "local_hits": self.local_hits,
+            "local_misses": self.local_misses,
+            "hit_rate": round(self.local_hits / lookups, 3) if lookups else 0.0,
+            "upserted": self.upserted,
+            "refreshes": self.refreshes,
+            "refreshing": len(self._refreshing),
+            "errors": self.errors,
+            "backoff_remaining": round(max(0.0, self.disabled_until - time.monotonic()), 1),
+        }
+
+
+CANDIDATE_STORE = CandidateStore()
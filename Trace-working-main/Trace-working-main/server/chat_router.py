@@ -0,0 +1,163 @@
+import os
+import re
+from caching import TTLCache
+
+# Answer clear search / "more" turns locally instead of asking the model
+CHAT_FAST_PATH_ENABLED = os.getenv("CHAT_FAST_PATH_ENABLED", "true").lower() in ("1", "true", "yes")
+# Model replies are cached per normalized tail of the conversation
+CHAT_CACHE_MAX_ENTRIES = int(os.getenv("CHAT_CACHE_MAX_ENTRIES", "512"))
+CHAT_CACHE_TTL = float(os.getenv("CHAT_CACHE_TTL", "600"))
+CHAT_CACHE_HISTORY = int(os.getenv("CHAT_CACHE_HISTORY", "6"))
+
+# Reply text for search turns; the terms are read back from history on "more"
+SEARCH_REPLY_TEMPLATE = "I've found top candidates for '{query}'."
+_SEARCH_REPLY = re.compile(r"I've found top candidates for '(.+)'\.")
+
+# Role nouns a search request can be after
+_ROLE = (
+    r"(?:dev|devs|developers?|engineers?|programmers?|coders?|designers?|scientists?|architects?|"
+    r"analysts?|candidates?|people|someone|somebody|experts?|specialists?|freelancers?|"
+    r"contributors?|maintainers?|researchers?|interns?|leads?|talent|teammates?|co-?founders?)"
+)
+# "find (me) (a) <skills> <role> (in London / with Rust / who knows Go)": the role has to be
+# the object of the request, so "need advice on interviewing engineers" goes to the model
+_SEARCH_REQUEST = re.compile(
+    r"^(?:please\s+)?(?:(?:can|could|would)\s+you\s+)?(?:please\s+)?"
+    r"(?:find|search\s+for|search|look\s+for|show\s+me|get\s+me|hire|recruit|source|"
+    r"(?:i|we)\s+need|(?:i'?m|i\s+am|we'?re|we\s+are)\s+looking\s+for|looking\s+for)\s+"
+    r"(?:(?:me|us)\s+)?(?:(?:a|an|some|any|a\s+few|a\s+couple\s+of|few)\s+)?"
+    r"(?P<terms>(?:(?!(?:to|on|of|how|the|way|my|our|your|about)\b)[\w.+#/-]+,?\s+){0,4}?" + _ROLE + r")\b"
+    r"(?P<rest>,?\s+(?:in|from|at|near|based|with|who|that|knowing)\b.*)?$",
+    re.IGNORECASE,
+)
+# Questions and requests for advice or writing go to the model even if they name a role
+_NOT_A_SEARCH = re.compile(r"\?|\b(?:how|what|why|advice|tips|help|write)\b", re.IGNORECASE)
+_NEXT_REQUEST = re.compile(
+    r"^(?:(?:show|give|get|find)\s+(?:me\s+)?)?(?:some\s+|any\s+)?"
+    r"(?:next|more|others|other\s+ones|other\s+candidates|more\s+candidates|different\s+ones|"
+    r"someone\s+else|anyone\s+else|next\s+page|load\s+more)"
+    r"(?:\s+(?:please|candidates|people|results|ones))?$"
+    r"|^(?:these|they|those)\s+(?:are\s*n[o']?t|are\s+not)\s+(?:good|great|right|a\s+good\s+fit)(?:\s+enough)?$"
+    r"|^none\s+of\s+(?:these|them|those)(?:\s+work)?$",
+    re.IGNORECASE,
+)
+# Filler dropped from extracted search terms ("a React dev in London" -> "React dev London")
+_FILLER = {
+    "a", "an", "the", "some", "me", "us", "please", "in", "from", "at", "near", "based",
+    "who", "that", "is", "are", "for", "any", "few", "couple", "of", "good",
+    "someone", "somebody", "knows", "with", "experience",
+}
+# Terms made only of these say nothing about who to look for
+_GENERIC = {"candidate", "candidates", "people", "talent", "dev", "devs", "developer", "developers"}
+
+
+def _normalize(text):
+    return " ".join(str(text or "").lower().split()).strip(" .!?,")
+
+
+def _search_terms(text):
+    """
+    Returns the search terms in a clear search request, else None.
+    """
+    text = " ".join(str(text or "").split())
+    if _NOT_A_SEARCH.search(text):
+        return None
+    match = _SEARCH_REQUEST.match(text.strip(" .!"))
+    if not match:
+        return None
+    words = [w.strip(",") for w in (match.group("terms") + (match.group("rest") or "")).split()]
+    words = [w for w in words if w and w.lower() not in _FILLER]
+    if all(w.lower() in _GENERIC for w in words):
+        return None
+    return " ".join(words)
+
+
+def _last_search(history):
+    """
+    The terms of the most recent search in `history`, read from the search
+    reply, or from the user's request if that was answered differently.
+    """
+    for message in reversed(history):
+        content = str(message.get("content") or "")
+        if message.get("role") == "assistant":
+            match = _SEARCH_REPLY.match(content.strip())
+            if match:
+                return match.group(1)
+        elif message.get("role") == "user":
+            terms = _search_terms(content)
+            if terms:
+                return terms
+    return None
+
+
+class ChatRouter:
+    """
+    Answers chat turns without the model where it can. Clear search and
+    "next/more" requests become SEARCH: / SEARCH_NEXT: replies directly;
+    other turns reuse a cached model reply for the same recent history.
+    Anything else goes to the model, and its reply is cached.
+    """
+
+    def __init__(self, fast_path=CHAT_FAST_PATH_ENABLED, max_entries=CHAT_CACHE_MAX_ENTRIES,
+                 ttl=CHAT_CACHE_TTL, history=CHAT_CACHE_HISTORY):
+        self.fast_path = fast_path
+        self.history = history
+        self.cache = TTLCache(max_entries=max_entries, max_bytes=None, ttl=ttl)
+        self.routed = {"search": 0, "search_next": 0}
+        self.model_calls = 0
+        self.model_ms_total = 0.0
+
+    def route(self, history):
+        """
+        Returns a SEARCH: / SEARCH_NEXT: reply for a clear search turn, or
+        None if the turn needs the model.
+        """
+        if not self.fast_path or not history or history[-1].get("role") != "user":
+            return None
+        text = history[-1].get("content")
+        terms = _search_terms(text)
+        if terms:
+            self.routed["search"] += 1
+            return f"SEARCH: {terms}"
+        if _NEXT_REQUEST.match(_normalize(text)):
+            terms = _last_search(history[:-1])
+            if terms:
+                self.routed["search_next"] += 1
+                return f"SEARCH_NEXT: {terms}"
+        return None
+
+    def _key(self, history):
+        return tuple((m.get("role"), _normalize(m.get("content"))) for m in history[-self.history:])
+
+    def lookup(self, history):
+        """
+        Returns the cached model reply for this conversation tail, or None.
+        """
+        return self.cache.get(self._key(history))
+
+    def remember(self, history, content, elapsed_ms):
+        """
+        Caches a model reply and records how long the model took.
+        """
+        self.model_calls += 1
+        self.model_ms_total += elapsed_ms
+        if content:
+            self.cache.set(self._key(history), content)
+
+    def stats(self):
+        routed = sum(self.routed.values())
+        turns = routed + self.cache.hits + self.model_calls
+        model_ms_avg = self.model_ms_total / self.model_calls if self.model_calls else None
+        return {
+            "turns": turns,
+            "fast_path": dict(self.routed),
+            "fast_path_rate": round(routed / turns, 3) if turns else 0.0,
+            "cache": self.cache.stats(),
+            "model_calls": self.model_calls,
+            "model_ms_avg": round(model_ms_avg, 1) if model_ms_avg is not None else None,
+            # Each turn answered locally saved roughly one average model call
+            "saved_ms_est": round((routed + self.cache.hits) * model_ms_avg) if model_ms_avg is not None else None,
+        }
+
+
+CHAT_ROUTER = ChatRouter()
@@ -1,9 +1,12 @@
-from sqlalchemy import create_engine
+import asyncio
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 import os
 from dotenv import load_dotenv
 import urllib.parse
+from metrics import instrument_engine
 
 load_dotenv()
 
@@ -12,28 +15,121 @@ DB_USER = os.getenv("DB_USER", "root")
 DB_PASSWORD = os.getenv("DB_PASSWORD")   # ← FIXED
 DB_NAME = os.getenv("DB_NAME", "trace_db")
 
-if not DB_PASSWORD:
-    raise RuntimeError("DB_PASSWORD not set in .env file")
+# Optional full URL override, e.g. sqlite:///./trace.db for local testing
+DATABASE_URL = os.getenv("DATABASE_URL")
 
-encoded_user = urllib.parse.quote_plus(DB_USER)
-encoded_password = urllib.parse.quote_plus(DB_PASSWORD)
+# Connection pool settings, shared by the sync and async engines
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "3600"))
+DB_CONNECT_TIMEOUT = int(os.getenv("DB_CONNECT_TIMEOUT", "10"))
+# At startup: "create" adds missing tables, "check" only verifies they exist, "skip" leaves the schema alone
+DB_SCHEMA_MODE = os.getenv("DB_SCHEMA_MODE", "create").lower()
 
-SQLALCHEMY_DATABASE_URL = (
-    f"mysql+pymysql://{encoded_user}:{encoded_password}@{DB_HOST}/{DB_NAME}"
-)
+# Set when the database cannot be configured; reported by readiness instead of failing the import
+DATABASE_CONFIG_ERROR = None
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL,
-    pool_recycle=3600,
-    pool_pre_ping=True
-)
+if DATABASE_URL:
+    SQLALCHEMY_DATABASE_URL = DATABASE_URL
+else:
+    if not DB_PASSWORD:
+        DATABASE_CONFIG_ERROR = "DB_PASSWORD not set in .env file"
+
+    encoded_user = urllib.parse.quote_plus(DB_USER)
+    encoded_password = urllib.parse.quote_plus(DB_PASSWORD or "")
+
+    SQLALCHEMY_DATABASE_URL = (
+        f"mysql+pymysql://{encoded_user}:{encoded_password}@{DB_HOST}/{DB_NAME}"
+    )
+
+def _async_url(url):
+    """
+    Maps a sync driver URL onto its asyncio counterpart.
+    """
+    override = os.getenv("ASYNC_DATABASE_URL")
+    if override:
+        return override
+    for sync_prefix, async_prefix in (
+        ("mysql+pymysql://", "mysql+aiomysql://"),
+        ("mysql://", "mysql+aiomysql://"),
+        ("sqlite+pysqlite://", "sqlite+aiosqlite://"),
+        ("sqlite://", "sqlite+aiosqlite://"),
+    ):
+        if url.startswith(sync_prefix):
+            return async_prefix + url[len(sync_prefix):]
+    return url
+
+ASYNC_DATABASE_URL = _async_url(SQLALCHEMY_DATABASE_URL)
+
+def _engine_kwargs(url):
+    if url.startswith("sqlite"):
+        return {"connect_args": {"check_same_thread": False}} if "aiosqlite" not in url else {}
+    return {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": True,
+        "connect_args": {"connect_timeout": DB_CONNECT_TIMEOUT},
+    }
+
+engine = create_engine(SQLALCHEMY_DATABASE_URL, **_engine_kwargs(SQLALCHEMY_DATABASE_URL))
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+# Async engine for request handlers, so queries never block the event loop
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **_engine_kwargs(ASYNC_DATABASE_URL))
+
+# Statement timings for /metrics
+instrument_engine(engine)
+instrument_engine(async_engine.sync_engine)
+
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+def _require_config():
+    if DATABASE_CONFIG_ERROR:
+        raise RuntimeError(DATABASE_CONFIG_ERROR)
+
+async def ensure_schema(mode=None):
+    """
+    Applies DB_SCHEMA_MODE and returns the tables that were missing. Under
+    "check", missing tables raise instead of being created.
+    """
+    mode = mode or DB_SCHEMA_MODE
+    if mode == "skip":
+        return []
+    _require_config()
+    import models  # noqa: F401 -- registers the tables on Base.metadata
+    async with async_engine.begin() as conn:
+        existing = await conn.run_sync(lambda sync_conn: set(inspect(sync_conn).get_table_names()))
+        missing = sorted(set(Base.metadata.tables) - existing)
+        if missing and mode == "check":
+            raise RuntimeError(f"Missing tables: {', '.join(missing)}")
+        if missing:
+            await conn.run_sync(Base.metadata.create_all)
+    return missing
+
+async def ping(timeout=2.0):
+    """
+    Round trip to the database; raises if it does not answer within `timeout`.
+    """
+    _require_config()
+
+    async def select_one():
+        async with async_engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+
+    await asyncio.wait_for(select_one(), timeout)
@@ -0,0 +1,281 @@
+import asyncio
+import contextvars
+import heapq
+import itertools
+import os
+import random
+import time
+from contextlib import contextmanager
+from app_logging import get_logger
+from metrics import upstream_call
+
+log = get_logger("github_scheduler")
+
+# Comma-separated personal access tokens; requests rotate across them.
+# Falls back to GITHUB_TOKEN, then to unauthenticated access.
+GITHUB_TOKENS = [
+    t.strip() for t in (os.getenv("GITHUB_TOKENS") or os.getenv("GITHUB_TOKEN") or "").split(",") if t.strip()
+]
+# Token bucket pacing for all GitHub traffic
+GITHUB_RATE_PER_SECOND = float(os.getenv("GITHUB_RATE_PER_SECOND", "10"))
+GITHUB_BURST = int(os.getenv("GITHUB_BURST", "20"))
+# Background requests leave this much of each token's remaining quota to searches
+GITHUB_INTERACTIVE_RESERVE = int(os.getenv("GITHUB_INTERACTIVE_RESERVE", "5"))
+# Retries after a 403/429 rate-limit response, with jittered exponential backoff
+GITHUB_MAX_RETRIES = int(os.getenv("GITHUB_MAX_RETRIES", "3"))
+GITHUB_BACKOFF_BASE = float(os.getenv("GITHUB_BACKOFF_BASE", "1"))
+GITHUB_BACKOFF_MAX = float(os.getenv("GITHUB_BACKOFF_MAX", "60"))
+# Interactive requests fail fast instead of waiting longer than this for quota
+GITHUB_MAX_WAIT = float(os.getenv("GITHUB_MAX_WAIT", "10"))
+
+INTERACTIVE = 0
+BACKGROUND = 1
+
+# Priority of GitHub requests made by the current task (and tasks it spawns)
+_PRIORITY = contextvars.ContextVar("github_priority", default=INTERACTIVE)
+
+
+class PromotablePriority:
+    """
+    A priority that can be raised to INTERACTIVE while its requests are
+    queued, for background work a user has started waiting on. Pass it to
+    github_priority in place of a plain level.
+    """
+
+    def __init__(self, level=BACKGROUND):
+        self.level = level
+
+
+def _level(priority):
+    return priority.level if isinstance(priority, PromotablePriority) else priority
+
+
+@contextmanager
+def github_priority(priority):
+    """
+    Runs the block's GitHub requests at `priority`, e.g. BACKGROUND for
+    refreshes and prefetches, or a PromotablePriority.
+    """
+    token = _PRIORITY.set(priority)
+    try:
+        yield
+    finally:
+        _PRIORITY.reset(token)
+
+
+class GitHubRateLimited(Exception):
+    """
+    Raised when GitHub quota will not be available within GITHUB_MAX_WAIT;
+    `retry_after` is the estimated wait in seconds.
+    """
+
+    def __init__(self, retry_after):
+        super().__init__(f"GitHub rate limit reached, retry in {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+def _resource(url):
+    # GitHub budgets search and core API calls separately
+    return "search" if "/search/" in url else "core"
+
+
+class _Credential:
+    def __init__(self, token):
+        self.token = token
+        self.remaining = {}  # resource -> requests left in the current window
+        self.reset_at = {}  # resource -> wall-clock time the window resets
+        self.blocked_until = 0.0  # monotonic; set by Retry-After / backoff
+        self.requests = 0
+
+    def left(self, resource):
+        if time.time() >= self.reset_at.get(resource, 0):
+            return None  # Unknown or reset: assume quota is available
+        return self.remaining.get(resource)
+
+    def ready_in(self, resource, reserve):
+        """
+        Seconds until this credential may send a request for `resource`.
+        """
+        wait = max(0.0, self.blocked_until - time.monotonic())
+        left = self.left(resource)
+        if left is not None and left <= reserve:
+            wait = max(wait, self.reset_at[resource] - time.time())
+        return wait
+
+
+class GitHubScheduler:
+    """
+    Single gate for GitHub traffic. Requests queue by priority (interactive
+    before background), are paced by a token bucket, and go out on the
+    credential with the most remaining quota, as reported by the
+    X-RateLimit-* headers. Rate-limited responses (403/429) block that
+    credential for Retry-After / until reset, or back off with jitter, and
+    the request is retried.
+    """
+
+    def __init__(self, tokens=None, rate=GITHUB_RATE_PER_SECOND, burst=GITHUB_BURST, max_wait=GITHUB_MAX_WAIT):
+        self.credentials = [_Credential(t) for t in (tokens if tokens is not None else GITHUB_TOKENS)] or [_Credential(None)]
+        self.rate = rate
+        self.burst = burst
+        self.max_wait = max_wait
+        self._tokens = float(burst)
+        self._refilled = time.monotonic()
+        self._queue = []  # (priority, seq)
+        self._seq = itertools.count()
+        self._cond = None
+        self.sent = {INTERACTIVE: 0, BACKGROUND: 0}
+        self.rate_limited = 0
+        self.retries = 0
+        self.rejected = 0
+        self.promoted = 0
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._refilled) * self.rate)
+        self._refilled = now
+
+    def _try_take(self, resource, priority):
+        """
+        Returns (credential, 0) if a request can go now, else (None, wait).
+        """
+        self._refill()
+        reserve = GITHUB_INTERACTIVE_RESERVE if priority == BACKGROUND else 0
+        waits = []
+        for i, c in enumerate(self.credentials):
+            left = c.left(resource)
+            # Soonest available first, then the most remaining quota (unknown counts as most)
+            waits.append((c.ready_in(resource, reserve), -(float("inf") if left is None else left), i))
+        credential_wait, _, index = min(waits)
+        bucket_wait = 0.0 if self._tokens >= 1 else (1 - self._tokens) / self.rate
+        wait = max(credential_wait, bucket_wait)
+        if wait > 0:
+            return None, wait
+        self._tokens -= 1
+        credential = self.credentials[index]
+        left = credential.left(resource)
+        if left is not None:
+            credential.remaining[resource] = left - 1
+        return credential, 0.0
+
+    async def _acquire(self, resource, priority):
+        if self._cond is None:
+            self._cond = asyncio.Condition()
+        entry = (_level(priority), next(self._seq))
+        deadline = time.monotonic() + self.max_wait
+        async with self._cond:
+            heapq.heappush(self._queue, entry)
+            self._cond.notify_all()
+            try:
+                while True:
+                    if entry[0] != _level(priority):
+                        # Promoted while queued: move up, keeping the place among equals
+                        self._queue.remove(entry)
+                        entry = (_level(priority), entry[1])
+                        heapq.heapify(self._queue)
+                        heapq.heappush(self._queue, entry)
+                    if self._queue[0] == entry:
+                        credential, wait = self._try_take(resource, entry[0])
+                        if credential is not None:
+                            heapq.heappop(self._queue)
+                            return credential
+                        if entry[0] == INTERACTIVE and time.monotonic() + wait > deadline:
+                            self.rejected += 1
+                            raise GitHubRateLimited(wait)
+                        try:
+                            await asyncio.wait_for(self._cond.wait(), wait)
+                        except asyncio.TimeoutError:
+                            pass
+                    else:
+                        await self._cond.wait()
+            except BaseException:
+                if entry in self._queue:
+                    self._queue.remove(entry)
+                    heapq.heapify(self._queue)
+                raise
+            finally:
+                self._cond.notify_all()
+
+    async def promote(self, priority):
+        """
+        Raises a PromotablePriority to INTERACTIVE; its queued requests move
+        ahead of background work and lose the background reserve.
+        """
+        if priority.level == INTERACTIVE:
+            return
+        priority.level = INTERACTIVE
+        self.promoted += 1
+        if self._cond is not None:
+            async with self._cond:
+                self._cond.notify_all()
+
+    def _observe(self, credential, resource, resp):
+        headers = resp.headers
+        resource = headers.get("X-RateLimit-Resource", resource)
+        if "X-RateLimit-Remaining" in headers:
+            credential.remaining[resource] = int(headers["X-RateLimit-Remaining"])
+        if "X-RateLimit-Reset" in headers:
+            credential.reset_at[resource] = float(headers["X-RateLimit-Reset"])
+
+    def _limited_for(self, credential, resource, resp, attempt):
+        """
+        If `resp` is a rate-limit response, returns how long to block the
+        credential; otherwise None.
+        """
+        if resp.status_code not in (403, 429):
+            return None
+        retry_after = resp.headers.get("Retry-After")
+        if retry_after is not None:
+            return float(retry_after)
+        if resp.headers.get("X-RateLimit-Remaining") == "0":
+            return max(1.0, credential.reset_at.get(resource, 0) - time.time())
+        if resp.status_code == 429 or "rate limit" in resp.text.lower():
+            # Secondary limit without hints: exponential backoff with full jitter
+            return random.uniform(0, min(GITHUB_BACKOFF_MAX, GITHUB_BACKOFF_BASE * 2 ** attempt)) + 0.1
+        return None  # A plain 403 (e.g. forbidden resource) is not retried
+
+    async def request(self, client, method, url, headers=None, **kwargs):
+        """
+        Sends one GitHub request through the scheduler and returns the final
+        httpx.Response. Raises GitHubRateLimited if quota is exhausted for
+        longer than the caller may wait, or still limited after retries.
+        """
+        resource = _resource(url)
+        priority = _PRIORITY.get()
+        for attempt in range(GITHUB_MAX_RETRIES + 1):
+            credential = await self._acquire(resource, priority)
+            request_headers = dict(headers or {})
+            if credential.token:
+                request_headers["Authorization"] = f"Bearer {credential.token}"
+            credential.requests += 1
+            self.sent[_level(priority)] += 1
+            with upstream_call("github", resource) as call:
+                resp = await client.request(method, url, headers=request_headers, **kwargs)
+                call["outcome"] = str(resp.status_code)
+            self._observe(credential, resource, resp)
+            blocked_for = self._limited_for(credential, resource, resp, attempt)
+            if blocked_for is None:
+                return resp
+            self.rate_limited += 1
+            credential.blocked_until = time.monotonic() + blocked_for
+            log.info("github_rate_limited", status=resp.status_code, blocked_for=round(blocked_for, 1), attempt=attempt)
+            if attempt < GITHUB_MAX_RETRIES:
+                self.retries += 1
+        raise GitHubRateLimited(blocked_for)
+
+    def stats(self):
+        return {
+            "credentials": len(self.credentials),
+            "sent_interactive": self.sent[INTERACTIVE],
+            "sent_background": self.sent[BACKGROUND],
+            "queued": len(self._queue),
+            "rate_limited": self.rate_limited,
+            "retries": self.retries,
+            "rejected": self.rejected,
+            "promoted": self.promoted,
+            "remaining": [
+                {resource: c.left(resource) for resource in ("core", "search")} for c in self.credentials
+            ],
+        }
+
+
+GITHUB_SCHEDULER = GitHubScheduler()
@@ -0,0 +1,176 @@
+import asyncio
+import base64
+import json
+import os
+import re
+import time
+
+from integrations import get_http_client
+from app_logging import get_logger
+
+log = get_logger("google_verifier")
+
+GOOGLE_CERTS_URL = os.getenv("GOOGLE_CERTS_URL", "https://www.googleapis.com/oauth2/v1/certs")
+# OAuth client id expected in the token's `aud`; unset skips the audience check
+GOOGLE_CLIENT_ID = os.getenv("GOOGLE_CLIENT_ID") or None
+# Used when the certs response carries no Cache-Control max-age
+GOOGLE_CERTS_DEFAULT_MAX_AGE = float(os.getenv("GOOGLE_CERTS_DEFAULT_MAX_AGE", "3600"))
+# Background refresh starts this many seconds before the certs expire
+GOOGLE_CERTS_REFRESH_MARGIN = float(os.getenv("GOOGLE_CERTS_REFRESH_MARGIN", "300"))
+# Minimum gap between refetches triggered by unknown key ids
+GOOGLE_CERTS_MIN_REFETCH_INTERVAL = float(os.getenv("GOOGLE_CERTS_MIN_REFETCH_INTERVAL", "30"))
+GOOGLE_CLOCK_SKEW = int(os.getenv("GOOGLE_CLOCK_SKEW", "10"))
+# Fetch the certs at startup instead of on the first Google sign-in (an outbound request)
+GOOGLE_CERTS_PREFETCH = os.getenv("GOOGLE_CERTS_PREFETCH", "false").lower() in ("1", "true", "yes")
+
+GOOGLE_ISSUERS = ("accounts.google.com", "https://accounts.google.com")
+
+
+def _google_jwt():
+    # google-auth pulls in its crypto backends; imported on first use, not at boot
+    from google.auth import jwt
+    return jwt
+
+
+def _token_key_id(token):
+    """
+    Reads `kid` from the (unverified) JWT header.
+    """
+    try:
+        header = token.split(".", 1)[0]
+        header += "=" * (-len(header) % 4)
+        return json.loads(base64.urlsafe_b64decode(header)).get("kid")
+    except (ValueError, AttributeError):
+        raise ValueError("Malformed token header")
+
+
+def _max_age(cache_control):
+    match = re.search(r"max-age=(\d+)", cache_control or "")
+    return float(match.group(1)) if match else GOOGLE_CERTS_DEFAULT_MAX_AGE
+
+
+def _jwk_to_pem(jwk):
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric.rsa import RSAPublicNumbers
+
+    def as_int(value):
+        return int.from_bytes(base64.urlsafe_b64decode(value + "=" * (-len(value) % 4)), "big")
+
+    public_key = RSAPublicNumbers(as_int(jwk["e"]), as_int(jwk["n"])).public_key()
+    return public_key.public_bytes(
+        serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+    ).decode()
+
+
+class GoogleTokenVerifier:
+    """
+    Verifies Google ID tokens against an in-memory copy of Google's signing
+    certs. The certs are kept for their Cache-Control max-age, refreshed in
+    the background shortly before they expire, and refetched once when a
+    token names a key id we have not seen.
+    """
+
+    def __init__(self, certs_url=GOOGLE_CERTS_URL, audience=GOOGLE_CLIENT_ID):
+        self.certs_url = certs_url
+        self.audience = audience
+        self._certs = {}
+        self._expires_at = 0.0
+        self._last_fetch = 0.0
+        self._lock = None
+        self._refresh_task = None
+        self.fetches = 0
+        self.unknown_kid_refetches = 0
+
+    async def verify(self, token):
+        """
+        Returns the token's claims, or raises ValueError if it is invalid.
+        """
+        key_id = _token_key_id(token)
+        certs = await self._current_certs()
+        if key_id and key_id not in certs:
+            if time.monotonic() - self._last_fetch >= GOOGLE_CERTS_MIN_REFETCH_INTERVAL:
+                self.unknown_kid_refetches += 1
+                certs = await self._refresh()
+            if key_id not in certs:
+                raise ValueError(f"Token signed with unknown key id {key_id}")
+
+        claims = _google_jwt().decode(
+            token, certs=certs, audience=self.audience, clock_skew_in_seconds=GOOGLE_CLOCK_SKEW
+        )
+        if claims.get("iss") not in GOOGLE_ISSUERS:
+            raise ValueError(f"Wrong issuer: {claims.get('iss')}")
+        return claims
+
+    async def _current_certs(self):
+        if self._certs and time.monotonic() < self._expires_at:
+            return self._certs
+        return await self._refresh()
+
+    async def _refresh(self):
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        fetched_before = self._last_fetch
+        async with self._lock:
+            # Another caller refreshed while we waited for the lock
+            if self._last_fetch != fetched_before and self._certs:
+                return self._certs
+
+            resp = await get_http_client().get(self.certs_url)
+            resp.raise_for_status()
+            body = resp.json()
+            if "keys" in body:
+                certs = {key["kid"]: _jwk_to_pem(key) for key in body["keys"]}
+            else:
+                certs = body
+
+            max_age = _max_age(resp.headers.get("Cache-Control"))
+            self._certs = certs
+            self._last_fetch = time.monotonic()
+            self._expires_at = self._last_fetch + max_age
+            self.fetches += 1
+            self._schedule_refresh(max(1.0, max_age - GOOGLE_CERTS_REFRESH_MARGIN))
+            return certs
+
+    def _schedule_refresh(self, delay):
+        # Replace any pending refresh, unless we are running inside it
+        pending = self._refresh_task
+        if pending is not None and pending is not asyncio.current_task():
+            pending.cancel()
+        self._refresh_task = asyncio.create_task(self._refresh_later(delay))
+
+    async def _refresh_later(self, delay):
+        await asyncio.sleep(delay)
+        try:
+            await self._refresh()
+        except Exception as e:
+            # Keep serving the cached certs; verify() refetches once they expire
+            log.warning("google_certs_refresh_failed", error=str(e))
+
+    async def warm(self):
+        """
+        Readies the first sign-in without any network access, unless
+        GOOGLE_CERTS_PREFETCH also asks for the certs up front.
+        """
+        if GOOGLE_CERTS_PREFETCH:
+            try:
+                await self._current_certs()
+            except Exception as e:
+                log.warning("google_certs_prefetch_failed", error=str(e))
+        # Import google-auth on a worker thread so the first sign-in does not import it on the loop
+        await asyncio.get_running_loop().run_in_executor(None, _google_jwt)
+
+    def close(self):
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            self._refresh_task = None
+
+    def stats(self):
+        return {
+            "keys": len(self._certs),
+            "fetches": self.fetches,
+            "unknown_kid_refetches": self.unknown_kid_refetches,
+            "expires_in": round(max(0.0, self._expires_at - time.monotonic()), 1),
+        }
+
+
+GOOGLE_VERIFIER = GoogleTokenVerifier()
@@ -0,0 +1,90 @@
+import asyncio
+import os
+import time
+from app_logging import get_logger
+
+log = get_logger("health")
+
+# Startup checks that run longer than this are marked failed
+STARTUP_CHECK_TIMEOUT = float(os.getenv("STARTUP_CHECK_TIMEOUT", "30"))
+# Readiness pings the database at most this often; probes in between reuse the result
+READINESS_PING_INTERVAL = float(os.getenv("READINESS_PING_INTERVAL", "5"))
+READINESS_PING_TIMEOUT = float(os.getenv("READINESS_PING_TIMEOUT", "2"))
+
+
+class Readiness:
+    """
+    Startup phases and background checks (e.g. the schema) that must pass
+    before the app takes traffic. Liveness only needs the process to
+    answer; readiness also needs every check done and the database up.
+    """
+
+    def __init__(self):
+        self.timings = {}  # phase -> ms
+        self.checks = {}  # name -> "pending", "ok" or the failure
+        self._tasks = []
+        self._ping = (0.0, None)  # (monotonic time, error or None)
+
+    def record(self, phase, started):
+        """
+        Records a phase that began at perf_counter() `started`.
+        """
+        self.timings[phase] = round((time.perf_counter() - started) * 1000, 1)
+
+    def start_check(self, name, coro, timeout=STARTUP_CHECK_TIMEOUT):
+        """
+        Runs `coro` in the background, so the server accepts connections
+        (and answers liveness) while it runs; readiness waits for it.
+        """
+        self.checks[name] = "pending"
+
+        async def run():
+            started = time.perf_counter()
+            try:
+                result = await asyncio.wait_for(coro, timeout)
+                self.checks[name] = "ok"
+                log.info("startup_check_passed", check=name, result=result)
+            except asyncio.CancelledError:
+                self.checks[name] = "cancelled"
+                raise
+            except Exception as e:
+                self.checks[name] = f"failed: {e}"
+                log.error("startup_check_failed", check=name, error=str(e))
+            finally:
+                self.record(name, started)
+
+        self._tasks.append(asyncio.create_task(run()))
+
+    async def close(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _database(self):
+        from database import ping
+        checked_at, error = self._ping
+        if time.monotonic() - checked_at >= READINESS_PING_INTERVAL:
+            try:
+                await ping(READINESS_PING_TIMEOUT)
+                error = None
+            except Exception as e:
+                error = str(e) or type(e).__name__
+            self._ping = (time.monotonic(), error)
+        return error
+
+    async def check(self):
+        """
+        Returns (ready, detail) for the readiness probe.
+        """
+        checks = dict(self.checks)
+        database = await self._database()
+        checks["database"] = "ok" if database is None else f"failed: {database}"
+        ready = all(state == "ok" for state in checks.values())
+        return ready, {"status": "ready" if ready else "not_ready", "checks": checks}
+
+    def stats(self):
+        return {"timings_ms": self.timings, "checks": dict(self.checks)}
+
+
+READINESS = Readiness()
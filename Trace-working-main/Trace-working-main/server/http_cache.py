@@ -0,0 +1,195 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# Where GitHub responses are persisted between restarts
+GITHUB_CACHE_PATH = os.getenv(
+    "GITHUB_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "github_cache.sqlite3"),
+)
+# Responses younger than this are served without touching the network
+GITHUB_CACHE_FRESH_SECONDS = float(os.getenv("GITHUB_CACHE_FRESH_SECONDS", "300"))
+GITHUB_CACHE_ENABLED = os.getenv("GITHUB_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+# Responses not revalidated for this long are deleted, and at most this many are kept (oldest go first)
+GITHUB_CACHE_MAX_AGE = float(os.getenv("GITHUB_CACHE_MAX_AGE", str(7 * 24 * 3600)))
+GITHUB_CACHE_MAX_ENTRIES = int(os.getenv("GITHUB_CACHE_MAX_ENTRIES", "20000"))
+# Eviction runs once per this many stores, and on open
+GITHUB_CACHE_EVICT_EVERY = int(os.getenv("GITHUB_CACHE_EVICT_EVERY", "200"))
+
+COUNTERS = ("fresh_hits", "revalidated", "misses", "stores", "evicted")
+
+
+class ConditionalResponseCache:
+    """
+    SQLite-backed cache of JSON responses keyed by URL, keeping the ETag and
+    Last-Modified validators so later requests can be revalidated with
+    If-None-Match / If-Modified-Since. Hit counters are kept in memory and
+    written out with the next store, so the hit rate survives restarts
+    without a write per lookup.
+
+    SQLite calls run in worker threads, one at a time, never on the event
+    loop. The table is bounded by age and entry count.
+    """
+
+    def __init__(self, path=GITHUB_CACHE_PATH, fresh_seconds=GITHUB_CACHE_FRESH_SECONDS,
+                 max_age=GITHUB_CACHE_MAX_AGE, max_entries=GITHUB_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.fresh_seconds = fresh_seconds
+        self.max_age = max_age
+        self.max_entries = max_entries
+        self.entries = 0  # As of the last eviction pass
+        self.counters = dict.fromkeys(COUNTERS, 0)  # Persisted totals plus this process
+        self._unflushed = dict.fromkeys(COUNTERS, 0)
+        self._stores_since_evict = 0
+        self._lock = threading.Lock()  # Held for every use of the connection
+        self._counter_lock = threading.Lock()
+        self._conn = None
+
+    def _open(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " url TEXT PRIMARY KEY, body TEXT NOT NULL, etag TEXT,"
+            " last_modified TEXT, fetched_at REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS responses_fetched_at ON responses (fetched_at)")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)"
+        )
+        persisted = conn.execute("SELECT name, value FROM counters").fetchall()
+        with self._counter_lock:
+            for name, value in persisted:
+                self.counters[name] = self.counters.get(name, 0) + value
+        self._conn = conn
+        self._evict()
+
+    def _call(self, fn, *args):
+        # Runs in a worker thread; the lock keeps the shared connection to one caller
+        with self._lock:
+            if self._conn is None:
+                self._open()
+            return fn(*args)
+
+    async def _run(self, fn, *args):
+        return await asyncio.to_thread(self._call, fn, *args)
+
+    def _lookup(self, url):
+        return self._conn.execute(
+            "SELECT body, etag, last_modified, fetched_at FROM responses WHERE url = ?", (url,)
+        ).fetchone()
+
+    async def lookup(self, url):
+        row = await self._run(self._lookup, url)
+        if row is None:
+            return None
+        body, etag, last_modified, fetched_at = row
+        return {
+            "body": json.loads(body),
+            "etag": etag,
+            "last_modified": last_modified,
+            "age": time.time() - fetched_at,
+        }
+
+    def is_fresh(self, entry):
+        return entry is not None and entry["age"] < self.fresh_seconds
+
+    def conditional_headers(self, entry):
+        headers = {}
+        if entry is None:
+            return headers
+        if entry["etag"]:
+            headers["If-None-Match"] = entry["etag"]
+        if entry["last_modified"]:
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def _store(self, url, body, etag, last_modified):
+        self._conn.execute(
+            "INSERT OR REPLACE INTO responses (url, body, etag, last_modified, fetched_at)"
+            " VALUES (?, ?, ?, ?, ?)",
+            (url, body, etag, last_modified, time.time()),
+        )
+        self._stores_since_evict += 1
+        if self._stores_since_evict >= GITHUB_CACHE_EVICT_EVERY:
+            self._evict()
+        self._flush_counters()
+
+    async def store(self, url, body, etag=None, last_modified=None):
+        self.record("stores")
+        await self._run(self._store, url, json.dumps(body), etag, last_modified)
+
+    def _touch(self, url):
+        self._conn.execute("UPDATE responses SET fetched_at = ? WHERE url = ?", (time.time(), url))
+        self._flush_counters()
+
+    async def touch(self, url):
+        """
+        Marks a cached response as just revalidated (304 Not Modified).
+        """
+        await self._run(self._touch, url)
+
+    def _evict(self):
+        self._stores_since_evict = 0
+        evicted = self._conn.execute(
+            "DELETE FROM responses WHERE fetched_at < ?", (time.time() - self.max_age,)
+        ).rowcount
+        count = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        if count > self.max_entries:
+            evicted += self._conn.execute(
+                "DELETE FROM responses WHERE url IN"
+                " (SELECT url FROM responses ORDER BY fetched_at LIMIT ?)",
+                (count - self.max_entries,),
+            ).rowcount
+            count = self.max_entries
+        self.entries = count
+        if evicted:
+            self.record("evicted", evicted)
+
+    def record(self, counter, n=1):
+        """
+        Counts a cache event in memory; it reaches the database with the
+        next write.
+        """
+        with self._counter_lock:
+            self.counters[counter] += n
+            self._unflushed[counter] += n
+
+    def _flush_counters(self):
+        with self._counter_lock:
+            pending = [(name, n) for name, n in self._unflushed.items() if n]
+            self._unflushed = dict.fromkeys(COUNTERS, 0)
+        if not pending:
+            return
+        try:
+            self._conn.executemany(
+                "INSERT INTO counters (name, value) VALUES (?, ?)"
+                " ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+                pending,
+            )
+        except sqlite3.Error:
+            # Kept for the next write
+            with self._counter_lock:
+                for name, n in pending:
+                    self._unflushed[name] += n
+            raise
+
+    def stats(self):
+        with self._counter_lock:
+            stats = dict(self.counters)
+        stats["entries"] = self.entries
+        hits = stats["fresh_hits"] + stats["revalidated"]
+        lookups = hits + stats["misses"]
+        stats["hit_rate"] = round(hits / lookups, 3) if lookups else 0.0
+        return stats
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._flush_counters()
+                self._conn.close()
+                self._conn = None
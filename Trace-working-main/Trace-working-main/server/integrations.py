@@ -1,66 +1,250 @@
-
 import httpx
 import random
 import asyncio
+import os
+import uuid
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from search_sessions import SearchSessionStore
+from caching import SingleFlight
+from http_cache import ConditionalResponseCache, GITHUB_CACHE_ENABLED
+from semantic import SEMANTIC_RANKER
+from candidate_store import CANDIDATE_STORE
+from github_scheduler import GITHUB_SCHEDULER, BACKGROUND, GitHubRateLimited, PromotablePriority, github_priority
+from app_logging import get_logger
+
+log = get_logger("integrations")
+
+GITHUB_API_URL = os.getenv("GITHUB_API_URL", "https://api.github.com")
+GITHUB_HEADERS = {"User-Agent": "TRACE-TeamFinder"}
+
+# Max number of per-user detail lookups in flight for one search
+GITHUB_DETAIL_CONCURRENCY = int(os.getenv("GITHUB_DETAIL_CONCURRENCY", "8"))
+# Seconds allowed for enriching a whole search page; late lookups are dropped
+GITHUB_DETAIL_DEADLINE = float(os.getenv("GITHUB_DETAIL_DEADLINE", "5"))
+# Users fetched per GitHub search page; GitHub serves at most the first 1000 results
+GITHUB_PAGE_SIZE = int(os.getenv("GITHUB_PAGE_SIZE", "15"))
+GITHUB_SEARCH_RESULT_CAP = 1000
+# Prefetch the next page once a session has this many unread candidates or fewer
+SEARCH_PREFETCH_MARGIN = int(os.getenv("SEARCH_PREFETCH_MARGIN", "6"))
 
-async def fetch_github_users(query, limit=5):
+# Shared HTTP client settings
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "20"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "10"))
+HTTP2_ENABLED = os.getenv("HTTP2_ENABLED", "false").lower() in ("1", "true", "yes")
+
+# Connection reuse counters for the shared client
+HTTP_CLIENT_STATS = {"requests": 0, "new_connections": 0, "tls_handshakes": 0}
+
+async def _trace_connection_events(event_name, info):
+    if event_name == "connection.connect_tcp.complete":
+        HTTP_CLIENT_STATS["new_connections"] += 1
+    elif event_name == "connection.start_tls.complete":
+        HTTP_CLIENT_STATS["tls_handshakes"] += 1
+
+class _CountingTransport(httpx.AsyncHTTPTransport):
     """
-    Fetches users from GitHub Public API based on keywords.
+    Pooled transport that counts requests and freshly opened connections,
+    so the handshake rate under load can be read from http_client_stats().
     """
-    url = f"https://api.github.com/search/users?q={query}&per_page={limit}"
-    
-    async with httpx.AsyncClient() as client:
-        print(f"DEBUG: Fetching GitHub users with URL: {url}")
+    async def handle_async_request(self, request):
+        HTTP_CLIENT_STATS["requests"] += 1
+        request.extensions.setdefault("trace", _trace_connection_events)
+        return await super().handle_async_request(request)
+
+_http_client = None
+
+def _build_http_client():
+    http2 = HTTP2_ENABLED
+    if http2:
+        try:
+            import h2  # noqa: F401
+        except ImportError:
+            log.warning("http2_unavailable", reason="h2 is not installed, using HTTP/1.1")
+            http2 = False
+
+    limits = httpx.Limits(
+        max_connections=HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+        keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+    )
+    timeout = httpx.Timeout(HTTP_READ_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT)
+    return httpx.AsyncClient(
+        transport=_CountingTransport(limits=limits, http2=http2),
+        timeout=timeout,
+        headers=GITHUB_HEADERS,
+    )
+
+async def start_http_client():
+    """
+    Opens the app-wide pooled client. Called from the FastAPI lifespan.
+    """
+    global _http_client
+    if _http_client is None:
+        _http_client = _build_http_client()
+    return _http_client
+
+async def close_http_client():
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+def get_http_client():
+    """
+    Returns the shared client, creating it on first use outside the app
+    (scripts, benchmarks).
+    """
+    global _http_client
+    if _http_client is None:
+        _http_client = _build_http_client()
+    return _http_client
+
+def http_client_stats():
+    stats = dict(HTTP_CLIENT_STATS)
+    stats["reused_connections"] = max(0, stats["requests"] - stats["new_connections"])
+    stats["reuse_ratio"] = round(stats["reused_connections"] / stats["requests"], 3) if stats["requests"] else 0.0
+    return stats
+
+# Persistent ETag/Last-Modified cache for GitHub profile lookups
+GITHUB_CACHE = ConditionalResponseCache() if GITHUB_CACHE_ENABLED else None
+
+async def _get_cached_json(client, url):
+    """
+    GETs a GitHub URL through the conditional cache. Returns (status, data);
+    a 304 revalidation is reported as 200 with the stored body.
+    """
+    if GITHUB_CACHE is None:
+        resp = await GITHUB_SCHEDULER.request(client, "GET", url)
+        return resp.status_code, resp.json() if resp.status_code == 200 else None
+
+    entry = await GITHUB_CACHE.lookup(url)
+    if GITHUB_CACHE.is_fresh(entry):
+        GITHUB_CACHE.record("fresh_hits")
+        return 200, entry["body"]
+
+    resp = await GITHUB_SCHEDULER.request(client, "GET", url, headers=GITHUB_CACHE.conditional_headers(entry))
+    if resp.status_code == 304 and entry is not None:
+        await GITHUB_CACHE.touch(url)
+        GITHUB_CACHE.record("revalidated")
+        return 200, entry["body"]
+
+    GITHUB_CACHE.record("misses")
+    if resp.status_code != 200:
+        return resp.status_code, None
+    data = resp.json()
+    await GITHUB_CACHE.store(url, data, resp.headers.get("ETag"), resp.headers.get("Last-Modified"))
+    return 200, data
+
+async def _fetch_user_details(client, user_url, semaphore):
+    """
+    Fetches one user's profile. Failures yield {} so the batch survives.
+    """
+    async with semaphore:
         try:
-            resp = await client.get(url, headers={"User-Agent": "TRACE-TeamFinder"})
-            print(f"DEBUG: GitHub API Status: {resp.status_code}")
-            if resp.status_code == 200:
-                data = resp.json()
-                users = []
-                for item in data.get("items", []):
-                    # Fetch detailed user info for better display
-                    user_url = item.get("url")
-                    details_resp = await client.get(user_url, headers={"User-Agent": "TRACE-TeamFinder"})
-                    details = details_resp.json() if details_resp.status_code == 200 else {}
-                    
-                    users.append({
-                        "id": item.get("id"),
-                        "name": details.get("name") or item.get("login"),
-                        "username": item.get("login"),
-                        "avatar": item.get("avatar_url"),
-                        "source": "GitHub",
-                        "link": item.get("html_url"),
-                        "bio": details.get("bio") or "Open source contributor",
-                        "public_repos": details.get("public_repos", 0),
-                        "followers": details.get("followers", 0)
-                    })
-                return users
+            status, data = await _get_cached_json(client, user_url)
+            return data if status == 200 else {}
         except Exception as e:
-            print(f"GitHub API Error: {e}")
-            return []
+            log.debug("github_detail_failed", url=user_url, error=str(e))
+            return {}
+
+class GitHubSearchFailed(Exception):
+    """
+    Raised instead of returning [] when the caller asked to tell a failed
+    search apart from an empty one.
+    """
+
+async def fetch_github_users(query, limit=5, concurrency=None, deadline=None, page=1, raise_errors=False):
+    """
+    Fetches users from GitHub Public API based on keywords.
+    Detail lookups run concurrently, capped at `concurrency`, and must
+    finish within `deadline` seconds; stragglers fall back to search data.
+    `page` selects which `limit`-sized page of search results to fetch.
+    A failed search returns [], or raises GitHubSearchFailed with
+    `raise_errors`.
+    """
+    url = f"{GITHUB_API_URL}/search/users"
+    params = {"q": query, "per_page": limit, "page": page}
+    concurrency = concurrency or GITHUB_DETAIL_CONCURRENCY
+    deadline = deadline if deadline is not None else GITHUB_DETAIL_DEADLINE
+    client = get_http_client()
+    
+    try:
+        resp = await GITHUB_SCHEDULER.request(client, "GET", url, params=params)
+        log.debug("github_search", query=query, page=page, status=resp.status_code)
+        if resp.status_code == 200:
+            data = resp.json()
+            items = data.get("items", [])
+
+            # Fetch detailed user info for better display, in parallel
+            semaphore = asyncio.Semaphore(concurrency)
+            tasks = [
+                asyncio.create_task(_fetch_user_details(client, item.get("url"), semaphore))
+                for item in items
+            ]
+            if tasks:
+                _, pending = await asyncio.wait(tasks, timeout=deadline)
+                if pending:
+                    log.debug("github_detail_deadline", missed=len(pending), deadline=deadline)
+                    for task in pending:
+                        task.cancel()
+                    await asyncio.gather(*pending, return_exceptions=True)
+
+            users = []
+            for item, task in zip(items, tasks):
+                details = task.result() if not task.cancelled() else {}
+                
+                users.append({
+                    "id": item.get("id"),
+                    "name": details.get("name") or item.get("login"),
+                    "username": item.get("login"),
+                    "avatar": item.get("avatar_url"),
+                    "source": "GitHub",
+                    "link": item.get("html_url"),
+                    "bio": details.get("bio") or "Open source contributor",
+                    "location": details.get("location"),
+                    "public_repos": details.get("public_repos", 0),
+                    "followers": details.get("followers", 0)
+                })
+            return users
+        error = f"status {resp.status_code}"
+    except GitHubRateLimited:
+        # Surface exhausted quota instead of looking like "no results"
+        raise
+    except Exception as e:
+        error = str(e) or type(e).__name__
+    log.warning("github_search_failed", query=query, page=page, error=error)
+    if raise_errors:
+        raise GitHubSearchFailed(error)
+    return []
 
 async def get_github_user_details(username):
     """
     Fetches a specific user's detailed profile to get their location.
     """
-    url = f"https://api.github.com/users/{username}"
+    url = f"{GITHUB_API_URL}/users/{username}"
+    client = get_http_client()
     
-    async with httpx.AsyncClient() as client:
-        print(f"DEBUG: Fetching details for user: {username}")
-        try:
-            resp = await client.get(url, headers={"User-Agent": "TRACE-TeamFinder"})
-            print(f"DEBUG: User Details Status: {resp.status_code}")
-            if resp.status_code == 200:
-                data = resp.json()
-                return {
-                    "location": data.get("location"),
-                    "name": data.get("name"),
-                    "bio": data.get("bio"),
-                    "avatar": data.get("avatar_url")
-                }
-        except Exception as e:
-            print(f"Error fetching user details: {e}")
-            return None
+    try:
+        status, data = await _get_cached_json(client, url)
+        log.debug("github_user", username=username, status=status)
+        if status == 200:
+            return {
+                "location": data.get("location"),
+                "name": data.get("name"),
+                "bio": data.get("bio"),
+                "avatar": data.get("avatar_url")
+            }
+    except GitHubRateLimited:
+        raise
+    except Exception as e:
+        log.warning("github_user_failed", username=username, error=str(e))
+        return None
     return None
 
 
@@ -86,47 +270,201 @@ def mock_linkedin_coursera_enrichment(base_speed=0.2):
     return None
 
 
-# In-memory cache for search sessions
-# Structure: { "query_string": { "candidates": [], "pointer": 0 } }
-SEARCH_SESSION_CACHE = {}
+# Bounded store of enriched results per query, with per-session cursors
+SEARCH_SESSIONS = SearchSessionStore()
+# Concurrent identical searches share one upstream lookup
+SEARCH_FLIGHTS = SingleFlight()
+# Foreground and prefetch fetches of the same further page share one lookup
+SEARCH_PAGE_FLIGHTS = SingleFlight()
+SEARCH_PAGE_STATS = {"fetched": 0, "prefetches": 0, "foreground_waits": 0, "promoted": 0, "failed": 0}
+_prefetch_tasks = set()
+# (cache key, page) -> priority of the prefetch fetching it, so a user who joins it can promote it
+_prefetch_priorities = {}
+
+def search_page_stats():
+    return {**SEARCH_PAGE_STATS, "prefetching": len(_prefetch_tasks)}
+
+async def cancel_prefetches():
+    """
+    Cancels background page prefetches. Called from the FastAPI lifespan.
+    """
+    for task in list(_prefetch_tasks):
+        task.cancel()
+    await asyncio.gather(*_prefetch_tasks, return_exceptions=True)
 
-async def search_candidates(query: str, location: str = None, load_more: bool = False):
+async def search_candidates(query: str, location: str = None, load_more: bool = False, session_id: str = None):
     """
     Orchestrates the search across "multiple" APIs with pagination support.
+    `session_id` keeps each user's position in the result buffer separate;
+    without one the call gets a cursor of its own.
     """
+    if session_id is None:
+        session_id = uuid.uuid4().hex
     # 1. Construct a unique key for the search session
     search_query = query
     if location:
         search_query += f' location:"{location}"'
     
-    cache_key = search_query.lower().strip()
+    cache_key = " ".join(search_query.lower().split())
     
-    # 2. Check cache if loading more
-    if load_more and cache_key in SEARCH_SESSION_CACHE:
-        session = SEARCH_SESSION_CACHE[cache_key]
-        pointer = session["pointer"]
-        candidates = session["candidates"]
-        
-        # Get next batch
-        next_batch = candidates[pointer : pointer + 3]
-        
-        # Update pointer
-        # If we reached the end, we might want to wrap around or just stay at the end
-        # For this demo, let's just cap it.
-        session["pointer"] = min(len(candidates), pointer + 3)
-        
-        if not next_batch:
-             # Try to generate/fetch fresh ones if we ran out? 
-             # For now, just return empty implies "no more results"
-             pass
-             
-        return next_batch
-
-    # 3. New Search (or cache miss on load_more)
-    print(f"DEBUG: Executing search with query: {search_query}")
+    # 2. Serve from the session store when possible, fetching further
+    #    GitHub pages only once the buffer runs out
+    if load_more:
+        await _fill_buffer(query, search_query, cache_key, session_id, 3)
+        next_batch = SEARCH_SESSIONS.next_page(session_id, cache_key, 3)
+        if next_batch is not None:
+            _prefetch_next_page(query, search_query, cache_key, session_id)
+            # Empty batch implies "no more results"
+            return next_batch
+    else:
+        cached = SEARCH_SESSIONS.get_results(cache_key)
+        if cached is not None:
+            SEARCH_SESSIONS.set_cursor(session_id, cache_key, 3)
+            _prefetch_next_page(query, search_query, cache_key, session_id)
+            return cached[:3]
+
+    # 3. Local candidate store, then GitHub, shared by identical searches in flight
+    results = await SEARCH_FLIGHTS.do(
+        cache_key, lambda: _load_results(query, location, search_query, cache_key)
+    )
+
+    if results:
+        SEARCH_SESSIONS.set_cursor(session_id, cache_key, 3) # We are about to return the first 3
+        _prefetch_next_page(query, search_query, cache_key, session_id)
+    
+    return results[:3] # Return top 3 as requested
+
+
+async def _fill_buffer(query, search_query, cache_key, session_id, size):
+    """
+    Fetches further GitHub pages until the session has `size` unread
+    candidates or GitHub runs out, joining a prefetch already in flight.
+    A joined prefetch is promoted to interactive priority, since a user is
+    now waiting on it.
+    """
+    while SEARCH_SESSIONS.unread(session_id, cache_key, size) < size:
+        page = SEARCH_SESSIONS.pending_page(cache_key)
+        if page is None:
+            return
+        SEARCH_PAGE_STATS["foreground_waits"] += 1
+        priority = _prefetch_priorities.get((cache_key, page))
+        if priority is not None and priority.level == BACKGROUND:
+            SEARCH_PAGE_STATS["promoted"] += 1
+            await GITHUB_SCHEDULER.promote(priority)
+        try:
+            await _fetch_page(query, search_query, cache_key, page)
+        except GitHubRateLimited:
+            # Serve what is buffered; only fail if there is nothing left to show
+            if SEARCH_SESSIONS.unread(session_id, cache_key, size) == 0:
+                raise
+            return
+        except GitHubSearchFailed:
+            # The page stays pending, so the next load_more tries it again
+            return
+
+
+def _prefetch_next_page(query, search_query, cache_key, session_id):
+    """
+    Starts a background fetch of the next GitHub page when this session is
+    close to the end of the buffer, so the next load_more reads from memory.
+    """
+    page = SEARCH_SESSIONS.pending_page(cache_key)
+    if page is None or SEARCH_SESSIONS.unread(session_id, cache_key) > SEARCH_PREFETCH_MARGIN:
+        return
+    key = (cache_key, page)
+    if key in _prefetch_priorities:
+        # Already being prefetched; a second task would only join the same fetch
+        return
+
+    # Registered before the task first runs, so a load_more right behind it can promote it
+    priority = _prefetch_priorities[key] = PromotablePriority(BACKGROUND)
+
+    async def run():
+        try:
+            with github_priority(priority):
+                await _fetch_page(query, search_query, cache_key, page)
+        except Exception as e:
+            log.warning("search_prefetch_failed", query=search_query, page=page, error=str(e))
+
+    def finished(task):
+        _prefetch_tasks.discard(task)
+        if _prefetch_priorities.get(key) is priority:
+            del _prefetch_priorities[key]
+
+    SEARCH_PAGE_STATS["prefetches"] += 1
+    task = asyncio.create_task(run())
+    _prefetch_tasks.add(task)
+    task.add_done_callback(finished)
+
+
+async def _fetch_page(query, search_query, cache_key, page):
+    """
+    Fetches, stores and appends one further GitHub page to the buffer.
+    Raises GitHubSearchFailed, leaving the page pending, if GitHub did not
+    answer, so an error never looks like the end of the results.
+    """
+    async def load():
+        try:
+            results = await _fetch_and_score(query, search_query, page=page, raise_errors=True)
+        except GitHubSearchFailed:
+            SEARCH_PAGE_STATS["failed"] += 1
+            raise
+        CANDIDATE_STORE.schedule_upsert(query, results)
+        results = await SEMANTIC_RANKER.rerank(query, results)
+        SEARCH_PAGE_STATS["fetched"] += 1
+        SEARCH_SESSIONS.append_results(cache_key, page, results, exhausted=_last_page(page, results))
+
+    await SEARCH_PAGE_FLIGHTS.do((cache_key, page), load)
+
+
+def _last_page(page, results):
+    # A short page from a successful fetch, or GitHub's search result cap,
+    # means there is nothing further
+    return len(results) < GITHUB_PAGE_SIZE or page * GITHUB_PAGE_SIZE >= GITHUB_SEARCH_RESULT_CAP
+
+
+async def _load_results(query, location, search_query, cache_key):
+    """
+    Builds the full result buffer for a search key: local candidate store
+    first, then GitHub, re-ranked and saved to the session store.
+    """
+    local = await CANDIDATE_STORE.lookup(query, location, limit=GITHUB_PAGE_SIZE)
+    if local is not None:
+        results, stale = local
+        # Local answers need not match GitHub's first page; duplicates are skipped on append
+        next_page = 1
+        log.debug("search_local_hit", query=search_query, profiles=len(results), stale=stale)
+        if stale:
+            CANDIDATE_STORE.schedule_refresh(
+                cache_key, lambda: _refresh_search(query, search_query, cache_key)
+            )
+    else:
+        results = await _fetch_and_score(query, search_query)
+        # Stored in the background; the response does not wait for the write
+        CANDIDATE_STORE.schedule_upsert(query, results)
+        next_page = None if _last_page(1, results) else 2
+
+    # Re-rank by meaning, so "frontend" surfaces React developers first.
+    # Leaves the score order in place if local embeddings are unavailable.
+    results = await SEMANTIC_RANKER.rerank(query, results)
+    
+    # Save to Cache (skip failed fetches so the next call retries upstream)
+    if results:
+        SEARCH_SESSIONS.save_results(cache_key, results, next_page)
+    return results
+
+
+async def _fetch_and_score(query, search_query, page=1, raise_errors=False):
+    """
+    Fetches one page of GitHub users for the query and enriches and scores
+    them, best first.
+    """
+    log.debug("search_upstream", query=search_query, page=page)
     
     # INCREASE FETCH LIMIT to build a buffer for "Next" requests
-    github_candidates = await fetch_github_users(search_query, limit=15)
+    github_candidates = await fetch_github_users(
+        search_query, limit=GITHUB_PAGE_SIZE, page=page, raise_errors=raise_errors
+    )
     
     results = []
     
@@ -156,11 +494,17 @@ async def search_candidates(query: str, location: str = None, load_more: bool =
     
     # Sort by score descending
     results.sort(key=lambda x: x['score'], reverse=True)
-    
-    # Save to Cache
-    SEARCH_SESSION_CACHE[cache_key] = {
-        "candidates": results,
-        "pointer": 3 # We are about to return the first 3
-    }
-    
-    return results[:3] # Return top 3 as requested
+    return results
+
+
+async def _refresh_search(query, search_query, cache_key):
+    """
+    Background refresh of a stale local answer: refetch, store, and replace
+    the buffered results for the query.
+    """
+    with github_priority(BACKGROUND):
+        results = await _fetch_and_score(query, search_query)
+    if results:
+        await CANDIDATE_STORE.upsert(query, results)
+        next_page = None if _last_page(1, results) else 2
+        SEARCH_SESSIONS.save_results(cache_key, await SEMANTIC_RANKER.rerank(query, results), next_page)
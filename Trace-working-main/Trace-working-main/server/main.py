@@ -1,16 +1,76 @@
+import time
+
+# Cold-start timing starts before the framework imports
+_IMPORT_STARTED = time.perf_counter()
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse, PlainTextResponse, Response, JSONResponse
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 import random
-from integrations import search_candidates, get_github_user_details
-from fastapi import Depends, HTTPException, status
+import json
+import asyncio
+from contextlib import asynccontextmanager
+from integrations import search_candidates, get_github_user_details, start_http_client, close_http_client, http_client_stats, search_page_stats, cancel_prefetches, SEARCH_SESSIONS, SEARCH_FLIGHTS, GITHUB_CACHE
+from candidate_store import CANDIDATE_STORE
+from github_scheduler import GITHUB_SCHEDULER, GitHubRateLimited
+from fastapi import Depends, HTTPException, Header, status
 from fastapi.security import OAuth2PasswordBearer
 from datetime import datetime, timedelta
-from auth import Token, User, verify_password, create_access_token, get_password_hash
-from google.oauth2 import id_token
-from google.auth.transport import requests as google_requests
+from auth import Token, User, create_access_token, decode_access_token, hash_password_async, verify_and_update_password_async, shutdown_hash_executor, TOKEN_CLAIMS_CACHE
+from jose import JWTError
+from caching import TTLCache
+import os
+import uuid
+from typing import Optional
+from google_verifier import GOOGLE_VERIFIER
+from search_index import CandidateIndex
+from semantic import SEMANTIC_RANKER
+from app_logging import configure_logging, shutdown_logging, get_logger, log_stats, RequestIdMiddleware
+from metrics import METRICS, MetricsMiddleware
+from profiling import ProfilingMiddleware, LOOP_WATCHDOG, PROFILES, is_admin, profile_summaries, profiling_stats
+from health import READINESS
+
+log = get_logger("api")
 
-app = FastAPI(title="TRACE API", description="Backend for TRACE: AI-Driven Team Formation")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    started = time.perf_counter()
+    # Log events go through a queue to a writer thread, never stdout on the loop
+    configure_logging()
+    # Schema work runs in the background so the port opens at once; /readyz waits for it
+    READINESS.start_check("schema", ensure_schema())
+    # Reports callbacks that hold the event loop longer than LOOP_BLOCK_THRESHOLD_MS
+    LOOP_WATCHDOG.start()
+    # One pooled HTTP client for all outbound integrations
+    await start_http_client()
+    # Import google-auth off the loop; the certs are fetched on first sign-in
+    # unless GOOGLE_CERTS_PREFETCH is set
+    asyncio.create_task(GOOGLE_VERIFIER.warm())
+    from ai_engine import INFERENCE_POOL, MOCK_CANDIDATE_POOL, CONVERSATION_WINDOW
+    # Build the Ollama client off the loop, before the first chat needs it
+    asyncio.create_task(INFERENCE_POOL.warm())
+    # Pre-generate mock candidate pools while the model is otherwise idle
+    MOCK_CANDIDATE_POOL.start()
+    READINESS.record("lifespan", started)
+    log.info("startup_complete", **{f"{phase}_ms": ms for phase, ms in READINESS.timings.items()})
+    yield
+    await READINESS.close()
+    await MOCK_CANDIDATE_POOL.close()
+    await CONVERSATION_WINDOW.close()
+    GOOGLE_VERIFIER.close()
+    await cancel_prefetches()
+    await CANDIDATE_STORE.close()
+    await SEMANTIC_RANKER.close()
+    await close_http_client()
+    shutdown_hash_executor()
+    if GITHUB_CACHE:
+        GITHUB_CACHE.close()
+    await LOOP_WATCHDOG.close()
+    shutdown_logging()
+
+app = FastAPI(title="TRACE API", description="Backend for TRACE: AI-Driven Team Formation", lifespan=lifespan)
 
 # CORS setup
 app.add_middleware(
@@ -19,12 +79,93 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Request-ID", "X-Profile-Id"],
 )
+app.add_middleware(ProfilingMiddleware)
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(RequestIdMiddleware)
+
+@METRICS.collector
+def search_session_metrics():
+    cache = SEARCH_SESSIONS.stats()
+    return [
+        (f"trace_search_session_cache_{name}_total", "counter", f"Search session result cache {name}.", [({}, cache[name])])
+        for name in ("hits", "misses", "evictions", "expirations")
+    ] + [
+        ("trace_search_session_cache_entries", "gauge", "Search result buffers held.", [({}, cache["entries"])]),
+        ("trace_search_flights_coalesced_total", "counter", "Searches served by joining an identical in-flight search.",
+         [({}, SEARCH_FLIGHTS.stats()["coalesced"])]),
+    ]
 
 @app.get("/")
 async def root():
     return {"message": "Welcome to TRACE API"}
 
+@app.get("/healthz")
+async def liveness():
+    # The process is up and its event loop answers; never touches dependencies
+    return {"status": "ok"}
+
+@app.get("/readyz")
+async def readiness():
+    ready, detail = await READINESS.check()
+    return JSONResponse(detail, status_code=200 if ready else 503)
+
+@app.get("/api/stats")
+async def stats():
+    from ai_engine import INFERENCE_POOL, CHAT_ROUTER, CONVERSATION_WINDOW, MOCK_CANDIDATE_POOL, stream_stats
+    return {
+        "inference": INFERENCE_POOL.stats(),
+        "chat_stream": stream_stats(),
+        "chat_router": CHAT_ROUTER.stats(),
+        "chat_history": CONVERSATION_WINDOW.stats(),
+        "mock_candidates": MOCK_CANDIDATE_POOL.stats(),
+        "startup": READINESS.stats(),
+        "logging": log_stats(),
+        "profiling": profiling_stats(),
+        "google_certs": GOOGLE_VERIFIER.stats(),
+        "token_claims": TOKEN_CLAIMS_CACHE.stats(),
+        "users": USER_CACHE.stats(),
+        "http_client": http_client_stats(),
+        "search_sessions": SEARCH_SESSIONS.stats(),
+        "search_flights": SEARCH_FLIGHTS.stats(),
+        "search_pages": search_page_stats(),
+        "github_scheduler": GITHUB_SCHEDULER.stats(),
+        "github_cache": GITHUB_CACHE.stats() if GITHUB_CACHE else None,
+        "semantic": SEMANTIC_RANKER.stats(),
+        "candidate_store": CANDIDATE_STORE.stats(),
+    }
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    # Prometheus text exposition format
+    return PlainTextResponse(METRICS.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+def require_admin(x_admin_token: str = Header(default="")):
+    if not is_admin(x_admin_token):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin token required")
+
+@app.get("/api/admin/profiles", dependencies=[Depends(require_admin)])
+async def list_profiles():
+    return profile_summaries()
+
+@app.get("/api/admin/profiles/{profile_id}", dependencies=[Depends(require_admin)])
+async def download_profile(profile_id: str, format: str = "speedscope"):
+    # speedscope JSON, or "collapsed" stacks for flamegraph.pl (speedscope opens both)
+    profile = PROFILES.peek(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found or expired")
+    if format == "collapsed":
+        body, media_type, suffix = profile.collapsed(), "text/plain", "txt"
+    else:
+        body, media_type, suffix = json.dumps(profile.speedscope()), "application/json", "speedscope.json"
+    return Response(body, media_type=media_type,
+                    headers={"Content-Disposition": f'attachment; filename="profile-{profile_id}.{suffix}"'})
+
+@app.get("/api/admin/loop-blocks", dependencies=[Depends(require_admin)])
+async def loop_blocks():
+    return LOOP_WATCHDOG.report()
+
 class SkillMatchRequest(BaseModel):
     user_skills: list[str]
     required_skills: list[str]
@@ -46,6 +187,36 @@ async def match_skills(request: SkillMatchRequest):
         "ai_analysis": "Candidate shows strong potential in required areas."
     }
 
+class MatchItem(BaseModel):
+    id: int | str
+    skills: list[str]
+
+class BatchMatchRequest(BaseModel):
+    candidates: list[MatchItem]
+    jobs: list[MatchItem]
+    top_k: int = 10
+    # Skip the random "AI" adjustment so identical requests give identical results
+    deterministic: bool = True
+    seed: int | None = None
+
+@app.post("/api/match/batch")
+async def match_skills_batch(request: BatchMatchRequest):
+    """
+    Scores N candidates against M job requirement sets in one call and
+    returns the top_k candidates per job.
+    """
+    from matching import score_batch
+    # NumPy releases the GIL, so large batches run in the threadpool off the event loop
+    results = await run_in_threadpool(
+        score_batch,
+        [c.model_dump() for c in request.candidates],
+        [j.model_dump() for j in request.jobs],
+        top_k=max(0, request.top_k),
+        deterministic=request.deterministic,
+        seed=request.seed,
+    )
+    return {"results": results}
+
 # Mock DB with functional search links
 MOCK_CANDIDATES = [
     {
@@ -94,49 +265,92 @@ MOCK_CANDIDATES = [
     }
 ]
 
+# Inverted index over the local candidate pool, kept in sync via add/remove
+CANDIDATE_INDEX = CandidateIndex(MOCK_CANDIDATES)
+
+# Same as oauth2_scheme below, but signed-out callers get None instead of a 401
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/login", auto_error=False)
+
+def session_key(session_id: Optional[str], token: Optional[str]) -> str:
+    """
+    Key for a caller's search cursors and chat summary: the per-tab id the
+    client sends, scoped to the signed-in user so ids never mix across
+    accounts. A caller without an id gets a fresh key, sharing nothing.
+    """
+    owner = "anon"
+    if token:
+        try:
+            owner = decode_access_token(token).get("sub") or owner
+        except JWTError:
+            pass
+    return f"{owner}:{session_id or uuid.uuid4().hex}"
+
 @app.get("/api/search")
-async def search_api(query: str = ""):
+async def search_api(query: str = "", session_id: Optional[str] = None, limit: int = 50,
+                     token: Optional[str] = Depends(optional_oauth2_scheme)):
     if not query:
         return {"candidates": MOCK_CANDIDATES}
     
     # Use real integration
-    results = await search_candidates(query)
+    retry_after = None
+    try:
+        results = await search_candidates(query, session_id=session_key(session_id, token))
+    except GitHubRateLimited as e:
+        results = []
+        retry_after = round(e.retry_after)
     
     # Fallback if no results found or API fails
     if not results:
-         query = query.lower()
-         results = [
-            c for c in MOCK_CANDIDATES 
-            if query in c["name"].lower() or 
-            query in c["role"].lower() or
-            any(query in s.lower() for s in c["skills"])
-        ]
+         results = CANDIDATE_INDEX.search(query, limit=limit)
+
+    # No keyword hit: look for candidates close in meaning (e.g. "frontend" -> React)
+    if not results:
+         results = await SEMANTIC_RANKER.search(query, MOCK_CANDIDATES, k=min(limit, 10))
 
+    if retry_after is not None:
+        # Local results only; tell the client when GitHub can be asked again
+        return {"candidates": results, "rate_limited": True, "retry_after": retry_after}
     return {"candidates": results}
 
+@app.get("/api/search/suggest")
+async def search_suggest(prefix: str = "", limit: int = 10):
+    # Type-ahead over indexed names, roles and skills
+    return {"suggestions": CANDIDATE_INDEX.suggest(prefix, limit=min(limit, 50))}
+
 class FindNearbyRequest(BaseModel):
     username: str = ""
     skill: str = ""
     manual_location: str = None
+    session_id: Optional[str] = None
 
 @app.post("/api/find-nearby")
-async def find_nearby(request: FindNearbyRequest):
+async def find_nearby(request: FindNearbyRequest, token: Optional[str] = Depends(optional_oauth2_scheme)):
     location = request.manual_location
 
-    # 1. If no manual location, try to get from GitHub
-    if not location and request.username:
-        user_details = await get_github_user_details(request.username)
-        if user_details:
-             location = user_details.get("location")
-    
-    if not location:
+    try:
+        # 1. If no manual location, try to get from GitHub
+        if not location and request.username:
+            user_details = await get_github_user_details(request.username)
+            if user_details:
+                 location = user_details.get("location")
+        
+        if not location:
+            return {
+                "success": False,
+                "message": "Could not determine location. Please enter it manually or check your GitHub profile."
+            }
+        
+        # 2. Search for candidates near that location
+        results = await search_candidates(
+            request.skill, location=location, session_id=session_key(request.session_id, token)
+        )
+    except GitHubRateLimited as e:
         return {
             "success": False,
-            "message": "Could not determine location. Please enter it manually or check your GitHub profile."
+            "rate_limited": True,
+            "retry_after": round(e.retry_after),
+            "message": f"GitHub rate limit reached. Please try again in {round(e.retry_after)} seconds."
         }
-    
-    # 2. Search for candidates near that location
-    results = await search_candidates(request.skill, location=location)
 
     return {
         "success": True,
@@ -146,18 +360,68 @@ async def find_nearby(request: FindNearbyRequest):
     }
 
 # Auth Logic with Database
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 import models
-from database import engine, get_db
+from database import get_async_db, ensure_schema
 
-# Create tables
-models.Base.metadata.create_all(bind=engine)
+async def get_user_by_email(db: AsyncSession, email: str):
+    result = await db.execute(select(models.User).where(models.User.email == email))
+    return result.scalars().first()
 
-def get_user_by_email(db: Session, email: str):
-    return db.query(models.User).filter(models.User.email == email).first()
+async def get_user_by_username(db: AsyncSession, username: str):
+    result = await db.execute(select(models.User).where(models.User.username == username))
+    return result.scalars().first()
+
+# Write-through cache of user rows (as API models) for authenticated routes
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "2048"))
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "300"))
+USER_CACHE = TTLCache(max_entries=USER_CACHE_SIZE, ttl=USER_CACHE_TTL)
+
+def cache_user(db_user) -> User:
+    """
+    Converts a DB row to the API model and refreshes its cache entry.
+    Every code path that changes a user must go through here.
+    """
+    user = User(
+        username=db_user.username,
+        email=db_user.email,
+        full_name=db_user.full_name,
+        picture=db_user.picture,
+        github_link=db_user.github_link,
+        linkedin_link=db_user.linkedin_link,
+        created_at=db_user.created_at
+    )
+    USER_CACHE.set(db_user.username, user)
+    return user
 
-def get_user_by_username(db: Session, username: str):
-    return db.query(models.User).filter(models.User.username == username).first()
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/login")
+
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)) -> User:
+    """
+    Resolves the bearer token to a user. Hot tokens and users are served
+    from memory, skipping both the signature check and the DB query.
+    """
+    try:
+        payload = decode_access_token(token)
+    except JWTError as e:
+        log.debug("jwt_invalid", error=str(e))
+        raise HTTPException(status_code=401, detail="Invalid token", headers={"WWW-Authenticate": "Bearer"})
+
+    username = payload.get("sub")
+    if username is None:
+        log.debug("jwt_missing_subject")
+        raise HTTPException(status_code=401, detail="Invalid token", headers={"WWW-Authenticate": "Bearer"})
+
+    user = USER_CACHE.get(username)
+    if user is None:
+        log.debug("user_cache_miss", username=username)
+        db_user = await get_user_by_username(db, username)
+        if not db_user:
+            log.debug("user_not_found", username=username)
+            raise HTTPException(status_code=404, detail="User not found")
+        user = cache_user(db_user)
+    return user
 
 class LoginRequest(BaseModel):
     email: str
@@ -169,14 +433,14 @@ class LoginResponse(BaseModel):
     user: User  # Pydantic User model from auth.py
 
 @app.post("/api/login", response_model=LoginResponse)
-async def login_for_access_token(form_data: LoginRequest, db: Session = Depends(get_db)):
+async def login_for_access_token(form_data: LoginRequest, db: AsyncSession = Depends(get_async_db)):
     # Check DB
-    db_user = get_user_by_email(db, form_data.email)
+    db_user = await get_user_by_email(db, form_data.email)
     
     # Fallback to demo user if not in DB (for smooth transition)
     if not db_user and form_data.email == "demo@trace.ai" and form_data.password == "password123":
         # Create demo user in DB if missing
-        hashed = get_password_hash("password123")
+        hashed = await hash_password_async("password123")
         db_user = models.User(
             username="demo@trace.ai",
             email="demo@trace.ai",
@@ -187,15 +451,22 @@ async def login_for_access_token(form_data: LoginRequest, db: Session = Depends(
             disabled=False
         )
         db.add(db_user)
-        db.commit()
-        db.refresh(db_user)
+        await db.commit()
+        await db.refresh(db_user)
 
-    if not db_user or not verify_password(form_data.password, db_user.hashed_password):
+    # Argon2 runs in the hashing executor, not on the event loop
+    valid, new_hash = await verify_and_update_password_async(form_data.password, db_user.hashed_password) if db_user else (False, None)
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
+
+    if new_hash:
+        # Cost parameters changed since this hash was made; upgrade it transparently
+        db_user.hashed_password = new_hash
+        await db.commit()
         
     access_token_expires = timedelta(minutes=30)
     access_token = create_access_token(
@@ -203,15 +474,7 @@ async def login_for_access_token(form_data: LoginRequest, db: Session = Depends(
     )
     
     # Convert SQLAlchemy model to Pydantic model for response
-    user_response = User(
-        username=db_user.username, 
-        email=db_user.email, 
-        full_name=db_user.full_name,
-        picture=db_user.picture,
-        github_link=db_user.github_link,
-        linkedin_link=db_user.linkedin_link,
-        created_at=db_user.created_at
-    )
+    user_response = cache_user(db_user)
     return {"access_token": access_token, "token_type": "bearer", "user": user_response}
 
 
@@ -220,28 +483,26 @@ class GoogleLoginRequest(BaseModel):
     token: str
 
 @app.post("/api/login/google", response_model=LoginResponse)
-async def google_login(request: GoogleLoginRequest, db: Session = Depends(get_db)):
-    print(f"DEBUG: Google Login Attempt with token: {request.token[:20]}...")
+async def google_login(request: GoogleLoginRequest, db: AsyncSession = Depends(get_async_db)):
+    log.debug("google_login_attempt")
     try:
-        # Verify the token
-        id_info = id_token.verify_oauth2_token(request.token, google_requests.Request())
-        print(f"DEBUG: Token Verified. Info keys: {id_info.keys()}")
+        # Verify the token against the cached Google signing certs
+        id_info = await GOOGLE_VERIFIER.verify(request.token)
+        log.debug("google_token_verified", claims=sorted(id_info.keys()))
         
         email = id_info.get("email")
         name = id_info.get("name")
         picture = id_info.get("picture")
-        print(f"DEBUG: Extracted - Email: {email}, Name: {name}, Picture: {picture}")
         
         if not email:
-             print("DEBUG: No email found in token")
+             log.debug("google_token_without_email")
              raise HTTPException(status_code=400, detail="Invalid Google Token: No email found")
 
         # Check if user exists in DB
-        db_user = get_user_by_email(db, email)
-        print(f"DEBUG: User in DB: {db_user}")
+        db_user = await get_user_by_email(db, email)
         
         if not db_user:
-            print("DEBUG: Creating new user...")
+            log.info("google_user_created", email=email)
             # Create new user
             db_user = models.User(
                 username=email,
@@ -253,42 +514,33 @@ async def google_login(request: GoogleLoginRequest, db: Session = Depends(get_db
                 disabled=False
             )
             db.add(db_user)
-            db.commit()
-            db.refresh(db_user)
-            print("DEBUG: New user created and committed.")
+            await db.commit()
+            await db.refresh(db_user)
         else:
-            print("DEBUG: Updating existing user...")
+            log.debug("google_user_updated", email=email)
             # Update user info (picture/name)
             db_user.picture = picture
             db_user.full_name = name
-            db.commit()
-            db.refresh(db_user)
-            print("DEBUG: User updated.")
+            await db.commit()
+            await db.refresh(db_user)
             
         access_token_expires = timedelta(minutes=30)
         access_token = create_access_token(
             data={"sub": db_user.username}, expires_delta=access_token_expires
         )
         
-        user_response = User(
-            username=db_user.username,
-            email=db_user.email,
-            full_name=db_user.full_name,
-            picture=db_user.picture,
-            github_link=db_user.github_link,
-            linkedin_link=db_user.linkedin_link,
-            created_at=db_user.created_at
-        )
-        print("DEBUG: Login successful, returning response.")
+        # Google may have changed the name/picture, so refresh the cached row
+        user_response = cache_user(db_user)
+        log.info("google_login", username=db_user.username)
         
         return {"access_token": access_token, "token_type": "bearer", "user": user_response}
         
     except ValueError as e:
         # Invalid token
-        print(f"DEBUG: Token Verification Failed: {e}")
+        log.warning("google_token_rejected", error=str(e))
         raise HTTPException(status_code=401, detail=f"Invalid Google Token: {str(e)}")
     except Exception as e:
-        print(f"DEBUG: Unexpected Error: {e}")
+        log.error("google_login_failed", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Internal Server Error: {str(e)}")
 
 
@@ -296,71 +548,81 @@ class UpdateProfileRequest(BaseModel):
     github_link: str = None
     linkedin_link: str = None
 
-@app.put("/api/user/profile", response_model=User)
-async def update_profile(request: UpdateProfileRequest, token: str = Depends(OAuth2PasswordBearer(tokenUrl="/api/login")), db: Session = Depends(get_db)):
-    print(f"DEBUG: Update Profile Request: {request}")
-    # Verify token
-    try:
-        # Quick verify logic as we don't have verify_token exported cleanly, reusing logic
-        # Ideally move verify_token to auth.py and import it
-        # For now, decoding manually as implemented in many tutorials or importing if available
-        # Implementation of get_current_user logic:
-        from jose import jwt, JWTError
-        from auth import SECRET_KEY, ALGORITHM
-        
-        print("DEBUG: Decoding token...")
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        print(f"DEBUG: Token Decoded. Username: {username}")
-        if username is None:
-            print("DEBUG: Username missing in token")
-            raise HTTPException(status_code=401, detail="Invalid token")
-            
-    except JWTError as e:
-         print(f"DEBUG: JWT Error: {e}")
-         raise HTTPException(status_code=401, detail="Invalid token")
-    except Exception as e:
-         print(f"DEBUG: Token verification exception: {e}")
-         raise HTTPException(status_code=401, detail="Token validation failed")
+@app.get("/api/user/me", response_model=User)
+async def read_current_user(current_user: User = Depends(get_current_user)):
+    return current_user
 
-    print(f"DEBUG: Fetching user {username} from DB...")
-    db_user = get_user_by_username(db, username)
+@app.put("/api/user/profile", response_model=User)
+async def update_profile(request: UpdateProfileRequest, current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
+    log.debug("profile_update", username=current_user.username, fields=sorted(request.model_fields_set))
+    # Writes need the live row, not the cached copy
+    db_user = await get_user_by_username(db, current_user.username)
     if not db_user:
-         print("DEBUG: User not found in DB")
+         log.debug("user_not_found", username=current_user.username)
+         USER_CACHE.pop(current_user.username)
          raise HTTPException(status_code=404, detail="User not found")
          
     try:
         if request.github_link is not None:
-            print(f"DEBUG: Updating GitHub: {request.github_link}")
             db_user.github_link = request.github_link
         if request.linkedin_link is not None:
-            print(f"DEBUG: Updating LinkedIn: {request.linkedin_link}")
             db_user.linkedin_link = request.linkedin_link
             
-        db.commit()
-        db.refresh(db_user)
-        print("DEBUG: Profile updated successfully in DB")
+        await db.commit()
+        await db.refresh(db_user)
     except Exception as e:
-        print(f"DEBUG: Database Error during update: {e}")
-        db.rollback()
+        log.error("profile_update_failed", username=current_user.username, exc_info=True)
+        await db.rollback()
+        USER_CACHE.pop(current_user.username)
         raise HTTPException(status_code=500, detail=f"Database Update Failed: {str(e)}")
     
-    return User(
-        username=db_user.username,
-        email=db_user.email,
-        full_name=db_user.full_name,
-        picture=db_user.picture,
-        github_link=db_user.github_link,
-        linkedin_link=db_user.linkedin_link,
-        created_at=db_user.created_at
-    )
+    return cache_user(db_user)
 
 class ChatRequest(BaseModel):
     history: list[dict]
+    session_id: Optional[str] = None
 
 @app.post("/api/chat")
-async def chat_endpoint(request: ChatRequest):
-    from ai_engine import chat_with_assistant
+async def chat_endpoint(request: ChatRequest, token: Optional[str] = Depends(optional_oauth2_scheme)):
+    from ai_engine import chat_with_assistant, InferenceOverloaded
     # Response is now a dictionary {type, content, data}
-    response = await chat_with_assistant(request.history)
+    try:
+        response = await chat_with_assistant(request.history, session_id=session_key(request.session_id, token))
+    except InferenceOverloaded:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Assistant is busy, please retry shortly",
+            headers={"Retry-After": "5"},
+        )
     return {"response": response}
+
+@app.post("/api/chat/stream")
+async def chat_stream_endpoint(request: ChatRequest, token: Optional[str] = Depends(optional_oauth2_scheme)):
+    """
+    Server-Sent Events version of /api/chat. Emits `token` events as the
+    model generates, or `status` + `search_results` for search turns,
+    then a `done` event with ttfb_ms / total_ms.
+    """
+    from ai_engine import stream_chat_with_assistant, INFERENCE_POOL, InferenceOverloaded
+    try:
+        INFERENCE_POOL.check_admission()
+    except InferenceOverloaded:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Assistant is busy, please retry shortly",
+            headers={"Retry-After": "5"},
+        )
+
+    session_id = session_key(request.session_id, token)
+
+    async def event_source():
+        async for event, data in stream_chat_with_assistant(request.history, session_id=session_id):
+            yield f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+READINESS.record("import", _IMPORT_STARTED)
@@ -0,0 +1,93 @@
+import numpy as np
+
+# Same weighting as ai_engine.calculate_match_score
+POINTS_PER_SKILL = 20
+AI_ADJUSTMENT_RANGE = (-5, 15)
+# Set bits in each byte value, for counting matches in packed bitsets
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+class SkillVocabulary:
+    """
+    Maps skill names to bit positions, shared by candidates and jobs so
+    both sides encode into the same bitsets.
+    """
+
+    def __init__(self):
+        self._index = {}
+
+    def __len__(self):
+        return len(self._index)
+
+    def add(self, skills):
+        for skill in skills:
+            self._index.setdefault(skill, len(self._index))
+
+    def encode(self, skill_lists):
+        """
+        One packed bitset per skill list: a uint8 row with one bit per
+        vocabulary entry, eight entries to a byte.
+        """
+        bits = np.zeros((len(skill_lists), len(self._index)), dtype=bool)
+        for row, skills in enumerate(skill_lists):
+            cols = [self._index[s] for s in skills if s in self._index]
+            bits[row, cols] = True
+        return np.packbits(bits, axis=1)
+
+
+def score_batch(candidates, jobs, top_k=10, deterministic=True, seed=None):
+    """
+    Scores every candidate against every job in one pass and returns the
+    top_k candidates per job.
+
+    `candidates` and `jobs` are lists of {"id", "skills"}. Skill overlap is
+    the popcount of the AND of the two packed bitsets; scores follow
+    calculate_match_score (20 points per matched skill, clipped to 0-100).
+    With deterministic=False the same random "AI adjustment" is added per
+    pair, drawn from `seed` if given.
+    """
+    # Only skills some job asks for can contribute to a score, so the
+    # vocabulary (and the matrix width) is the union of job requirements
+    vocab = SkillVocabulary()
+    for job in jobs:
+        vocab.add(job["skills"])
+
+    candidate_bits = vocab.encode([c["skills"] for c in candidates])
+    job_bits = vocab.encode([j["skills"] for j in jobs])
+
+    # (jobs, candidates) matched-skill counts, one job at a time to keep the AND at N x bytes
+    overlap = np.empty((len(jobs), len(candidates)), dtype=np.int32)
+    for j in range(len(jobs)):
+        overlap[j] = _POPCOUNT[candidate_bits & job_bits[j]].sum(axis=1, dtype=np.int32)
+    scores = overlap * POINTS_PER_SKILL
+    if not deterministic:
+        rng = np.random.default_rng(seed)
+        low, high = AI_ADJUSTMENT_RANGE
+        scores = scores + rng.integers(low, high + 1, size=scores.shape)
+    scores = np.clip(scores, 0, 100).astype(np.int32)
+
+    k = min(top_k, len(candidates))
+    results = []
+    for j, job in enumerate(jobs):
+        row = scores[j]
+        if k == 0:
+            top = np.array([], dtype=np.int64)
+        else:
+            # Everything above the k-th best score, then ties in candidate order
+            threshold = np.partition(row, len(row) - k)[len(row) - k]
+            above = np.flatnonzero(row > threshold)
+            ties = np.flatnonzero(row == threshold)[: k - len(above)]
+            top = np.concatenate([above, ties])
+            top = top[np.lexsort((top, -row[top]))]
+        required = set(job["skills"])
+        matches = []
+        for c in top:
+            matched = [s for s in candidates[c]["skills"] if s in required]
+            matches.append({
+                "candidate_id": candidates[c]["id"],
+                "score": int(row[c]),
+                "matched_skills": matched,
+                "reason": f"Matched {len(matched)} core skills. AI analysis suggests good cultural fit.",
+            })
+        results.append({"job_id": job["id"], "matches": matches})
+    return results
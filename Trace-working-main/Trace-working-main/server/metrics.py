@@ -0,0 +1,243 @@
+import asyncio
+import bisect
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+# Seconds; spans a cached lookup through a slow model generation
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=None):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value):
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Sharded:
+    """
+    Keeps one private series table per thread, so recording never takes a
+    lock or races another thread; a scrape sums the shards. The only lock
+    is taken once per thread, when its shard is first created.
+    """
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._shards = []
+        self._shards_lock = threading.Lock()
+
+    def _shard(self):
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = {}
+            with self._shards_lock:
+                self._shards.append(shard)
+        return shard
+
+    def _merged(self):
+        merged = {}
+        for shard in list(self._shards):
+            for labels, series in list(shard.items()):
+                merged.setdefault(labels, []).append(series)
+        return merged
+
+
+class Counter(_Sharded):
+    kind = "counter"
+
+    def inc(self, *labels, amount=1):
+        shard = self._shard()
+        shard[labels] = shard.get(labels, 0) + amount
+
+    def samples(self):
+        merged = self._merged()
+        if not merged and not self.labelnames:
+            return [(self.name, (), None, 0)]
+        return [(self.name, labels, None, sum(parts)) for labels, parts in merged.items()]
+
+
+class Gauge(Counter):
+    """
+    Up/down gauge; each thread records its own delta and a scrape sums them.
+    """
+    kind = "gauge"
+
+    def dec(self, *labels, amount=1):
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram(_Sharded):
+    kind = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, *labels):
+        shard = self._shard()
+        series = shard.get(labels)
+        if series is None:
+            # Per-bucket counts, then the +Inf bucket, then the running sum
+            series = shard[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def samples(self):
+        samples = []
+        for labels, parts in self._merged().items():
+            counts = [sum(p[i] for p in parts) for i in range(len(self.buckets) + 1)]
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                samples.append((f"{self.name}_bucket", labels, f'le="{_number(bound)}"', cumulative))
+            samples.append((f"{self.name}_sum", labels, None, sum(p[-1] for p in parts)))
+            samples.append((f"{self.name}_count", labels, None, cumulative))
+        return samples
+
+
+class Registry:
+    """
+    Holds metrics and scrape-time collectors, and renders both in the
+    Prometheus text exposition format.
+    """
+
+    def __init__(self):
+        self.metrics = []
+        self.collectors = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def collector(self, fn):
+        """
+        Registers `fn() -> [(name, kind, help, [(labels dict, value)])]`,
+        called on each scrape for values already counted elsewhere.
+        """
+        self.collectors.append(fn)
+        return fn
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, extra, value in metric.samples():
+                lines.append(f"{name}{_labels(metric.labelnames, labels, extra)} {_number(value)}")
+        for collect in self.collectors:
+            for name, kind, help, samples in collect():
+                lines.append(f"# HELP {name} {help}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    lines.append(f"{name}{_labels(labels.keys(), labels.values())} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+METRICS = Registry()
+
+HTTP_REQUEST_DURATION = METRICS.register(Histogram(
+    "trace_http_request_duration_seconds", "HTTP request latency by route template, method and status.",
+    ("route", "method", "status"),
+))
+HTTP_IN_FLIGHT = METRICS.register(Gauge(
+    "trace_http_requests_in_flight", "HTTP requests currently being served.",
+))
+UPSTREAM_DURATION = METRICS.register(Histogram(
+    "trace_upstream_request_duration_seconds", "Latency of calls to GitHub, Ollama, the database and argon2.",
+    ("upstream", "operation", "outcome"),
+))
+UPSTREAM_IN_FLIGHT = METRICS.register(Gauge(
+    "trace_upstream_requests_in_flight", "Upstream calls currently in flight.", ("upstream",),
+))
+
+
+@contextmanager
+def upstream_call(upstream, operation):
+    """
+    Times the block as one call to `upstream`. The yielded dict's "outcome"
+    (default "ok", "error" on exceptions) can be set to e.g. a status code.
+    """
+    call = {"outcome": "ok"}
+    UPSTREAM_IN_FLIGHT.inc(upstream)
+    start = time.perf_counter()
+    try:
+        yield call
+    except BaseException as e:
+        # A disconnected client closes streams (GeneratorExit) or cancels the task
+        call["outcome"] = "cancelled" if isinstance(e, (asyncio.CancelledError, GeneratorExit)) else "error"
+        raise
+    finally:
+        UPSTREAM_IN_FLIGHT.dec(upstream)
+        UPSTREAM_DURATION.observe(time.perf_counter() - start, upstream, operation, call["outcome"])
+
+
+def instrument_engine(engine):
+    """
+    Records every statement run through a SQLAlchemy engine (for an async
+    engine, pass its sync_engine) as a "db" upstream call.
+    """
+    from sqlalchemy import event
+
+    def started(conn, cursor, statement, parameters, context, executemany):
+        UPSTREAM_IN_FLIGHT.inc("db")
+        conn.info.setdefault("metrics_started", []).append(time.perf_counter())
+
+    def finished(conn, outcome, statement):
+        stack = conn.info.get("metrics_started")
+        if not stack:
+            return
+        UPSTREAM_IN_FLIGHT.dec("db")
+        words = (statement or "").split(None, 1)
+        operation = words[0].lower() if words else "other"
+        UPSTREAM_DURATION.observe(time.perf_counter() - stack.pop(), "db", operation, outcome)
+
+    event.listen(engine, "before_cursor_execute", started)
+    event.listen(engine, "after_cursor_execute",
+                 lambda conn, cursor, statement, *args: finished(conn, "ok", statement))
+    event.listen(engine, "handle_error",
+                 lambda ctx: finished(ctx.connection, "error", ctx.statement) if ctx.connection is not None else None)
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording latency per matched route template (so
+    /api/users/1 and /api/users/2 share a series) and requests in flight.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            HTTP_REQUEST_DURATION.observe(time.perf_counter() - start, route, scope["method"], str(status))
@@ -1,4 +1,4 @@
-from sqlalchemy import Boolean, Column, Integer, String, DateTime
+from sqlalchemy import JSON, Boolean, Column, DateTime, ForeignKey, Integer, String, Text
 from database import Base
 import datetime
 
@@ -15,3 +15,22 @@ class User(Base):
     disabled = Column(Boolean, default=False)
     github_link = Column(String(1024), nullable=True)
     linkedin_link = Column(String(1024), nullable=True)
+
+
+class Candidate(Base):
+    __tablename__ = "candidates"
+
+    id = Column(Integer, primary_key=True, index=True)
+    login = Column(String(255), unique=True, index=True) # GitHub username
+    name = Column(String(255))
+    location = Column(String(255), index=True)
+    bio = Column(Text, nullable=True)
+    score = Column(Integer, default=0)
+    profile = Column(JSON) # Enriched search result as returned by the API
+    fetched_at = Column(DateTime, default=datetime.datetime.utcnow, index=True)
+
+class CandidateSkill(Base):
+    __tablename__ = "candidate_skills"
+
+    candidate_id = Column(Integer, ForeignKey("candidates.id", ondelete="CASCADE"), primary_key=True)
+    skill = Column(String(100), primary_key=True, index=True) # Lowercased
@@ -0,0 +1,420 @@
+import asyncio
+import hmac
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from contextvars import ContextVar
+from caching import TTLCache
+from app_logging import get_logger, REQUEST_ID
+
+log = get_logger("profiling")
+
+# Shared secret for profiling: sent as X-Profile-Token to profile one request, and as
+# X-Admin-Token to download profiles. Headers only, so it never lands in access logs.
+# Unset disables profiling.
+PROFILE_ADMIN_TOKEN = os.getenv("PROFILE_ADMIN_TOKEN", "")
+# Fraction of requests to PROFILE_ROUTES profiled without being asked
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_ROUTES = tuple(
+    p.strip() for p in os.getenv(
+        "PROFILE_ROUTES", "/api/search,/api/find-nearby,/api/chat,/api/chat/stream,/api/login,/api/login/google"
+    ).split(",") if p.strip()
+)
+# Stack sampling period while a profiled request is in flight
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+# Profiles running at once; further requests are served unprofiled
+PROFILE_MAX_CONCURRENT = int(os.getenv("PROFILE_MAX_CONCURRENT", "2"))
+# Finished profiles kept for download
+PROFILE_MAX_STORED = int(os.getenv("PROFILE_MAX_STORED", "50"))
+PROFILE_TTL = float(os.getenv("PROFILE_TTL", "3600"))
+# The event loop counts as blocked when a callback runs longer than this; 0 disables the watchdog
+LOOP_BLOCK_THRESHOLD_MS = float(os.getenv("LOOP_BLOCK_THRESHOLD_MS", "100"))
+LOOP_BLOCK_HISTORY = int(os.getenv("LOOP_BLOCK_HISTORY", "100"))
+
+_THIS_FILE = os.path.abspath(__file__)
+_APP_DIR = os.path.dirname(_THIS_FILE)
+_AWAITING = ("", "[awaiting]", "", 0)
+
+# Profile of the request the current task (and the tasks it spawns) belongs to
+_ACTIVE = ContextVar("active_profile", default=None)
+_running = set()
+
+
+def _frame_key(frame):
+    code = frame.f_code
+    return (frame.f_globals.get("__name__", "?"), getattr(code, "co_qualname", code.co_name),
+            code.co_filename, code.co_firstlineno)
+
+
+def _frame_name(key):
+    return f"{key[0]}.{key[1]}" if key[0] else key[1]
+
+
+def _thread_stack(frame):
+    """
+    Root-first frame keys of a running thread, dropping the event loop's
+    own frames above the callback being run.
+    """
+    stack = []
+    while frame is not None:
+        stack.append(_frame_key(frame))
+        frame = frame.f_back
+    stack.reverse()
+    for i in range(len(stack) - 1, -1, -1):
+        if stack[i][0] == "asyncio.events" and stack[i][1] == "Handle._run":
+            return stack[i + 1:]
+    return stack
+
+
+def _await_stack(coro):
+    """
+    Root-first frame keys of a suspended task, following its await chain.
+    """
+    stack = []
+    while coro is not None:
+        frame = getattr(coro, "cr_frame", None) or getattr(coro, "ag_frame", None) or getattr(coro, "gi_frame", None)
+        if frame is None:
+            break
+        stack.append(_frame_key(frame))
+        coro = getattr(coro, "cr_await", None) or getattr(coro, "ag_await", None) or getattr(coro, "gi_yieldfrom", None)
+    stack.append(_AWAITING)
+    return stack
+
+
+def _is_app(key):
+    return key[2].startswith(_APP_DIR) and key[2] != _THIS_FILE and "site-packages" not in key[2]
+
+
+def _culprit(stack):
+    """
+    Names the call a blocked stack is stuck in: the library function our own
+    code called (e.g. ollama._client.Client.chat), and that calling function.
+    """
+    app = [i for i, key in enumerate(stack) if _is_app(key)]
+    if not app:
+        return _frame_name(stack[-1]), None
+    i = app[-1]
+    return _frame_name(stack[min(i + 1, len(stack) - 1)]), _frame_name(stack[i])
+
+
+# Task factory the loop had before profiling installed its own
+_previous_factory = None
+
+
+def _task_factory(loop, coro, **kwargs):
+    if _previous_factory is not None:
+        task = _previous_factory(loop, coro, **kwargs)
+    else:
+        task = asyncio.Task(coro, loop=loop, **kwargs)
+    profile = _ACTIVE.get()
+    if profile is not None:
+        profile.add_task(task)
+    return task
+
+
+def _install_task_factory(loop):
+    """
+    Lets tasks spawned by a profiled request (e.g. a streamed body) join its
+    profile. Installed only while profiles are running.
+    """
+    global _previous_factory
+    if loop.get_task_factory() is not _task_factory:
+        _previous_factory = loop.get_task_factory()
+        loop.set_task_factory(_task_factory)
+
+
+def _restore_task_factory(loop):
+    global _previous_factory
+    if loop.get_task_factory() is _task_factory:
+        loop.set_task_factory(_previous_factory)
+    _previous_factory = None
+
+
+class RequestProfile:
+    """
+    Wall-clock sampling profile of one request. A thread samples every task
+    the request spawned: the live stack when it is running on the loop, its
+    await chain (ending in "[awaiting]") when it is waiting on I/O, a model
+    or a worker thread.
+    """
+
+    def __init__(self, method, path, loop):
+        self.id = uuid.uuid4().hex[:12]
+        self.request_id = REQUEST_ID.get()
+        self.method = method
+        self.path = path
+        self.status = None
+        self.started = time.time()
+        self.duration_ms = None
+        self.interval = PROFILE_INTERVAL_MS / 1000
+        self.stacks = Counter()
+        self.blocks = []
+        # Added and discarded on the loop thread, read by the sampler: both sides hold the lock
+        self.tasks = set()
+        self._tasks_lock = threading.Lock()
+        self._loop = loop
+        self._loop_thread = threading.get_ident()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"profile-{self.id}", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def add_task(self, task):
+        with self._tasks_lock:
+            self.tasks.add(task)
+        task.add_done_callback(self._discard_task)
+
+    def _discard_task(self, task):
+        with self._tasks_lock:
+            self.tasks.discard(task)
+
+    async def stop(self):
+        self._stop.set()
+        await self._loop.run_in_executor(None, self._thread.join)
+        self.duration_ms = round((time.time() - self.started) * 1000, 1)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            running = asyncio.current_task(self._loop)
+            top = sys._current_frames().get(self._loop_thread)
+            with self._tasks_lock:
+                tasks = list(self.tasks)
+            for task in tasks:
+                if task.done():
+                    continue
+                if task is running and top is not None:
+                    stack = _thread_stack(top)
+                else:
+                    stack = _await_stack(task.get_coro())
+                self.stacks[tuple(stack)] += 1
+
+    def summary(self):
+        return {
+            "id": self.id,
+            "request_id": self.request_id,
+            "method": self.method,
+            "path": self.path,
+            "status": self.status,
+            "started": self.started,
+            "duration_ms": self.duration_ms,
+            "samples": sum(self.stacks.values()),
+            "blocks": self.blocks,
+        }
+
+    def collapsed(self):
+        """
+        Brendan Gregg's collapsed-stack format ("a;b;c count"), which
+        speedscope and flamegraph.pl both open.
+        """
+        lines = []
+        for stack, count in self.stacks.most_common():
+            names = ";".join(_frame_name(key).replace(";", ":").replace(" ", "_") for key in stack)
+            lines.append(f"{names} {count}")
+        return "\n".join(lines) + "\n"
+
+    def speedscope(self):
+        frames, index, samples, weights = [], {}, [], []
+        for stack, count in self.stacks.items():
+            ids = []
+            for key in stack:
+                if key not in index:
+                    index[key] = len(frames)
+                    frame = {"name": _frame_name(key)}
+                    if key[2]:
+                        frame.update(file=key[2], line=key[3])
+                    frames.append(frame)
+                ids.append(index[key])
+            samples.append(ids)
+            weights.append(round(count * self.interval * 1000, 3))
+        name = f"{self.method} {self.path} ({self.id})"
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "exporter": "trace-profiling",
+            "shared": {"frames": frames},
+            "profiles": [{
+                "type": "sampled",
+                "name": name,
+                "unit": "milliseconds",
+                "startValue": 0,
+                "endValue": sum(weights),
+                "samples": samples,
+                "weights": weights,
+            }],
+        }
+
+
+PROFILES = TTLCache(max_entries=PROFILE_MAX_STORED, ttl=PROFILE_TTL)
+
+
+def is_admin(token):
+    return bool(PROFILE_ADMIN_TOKEN) and hmac.compare_digest((token or "").encode(), PROFILE_ADMIN_TOKEN.encode())
+
+
+def _wants_profile(scope):
+    if not PROFILE_ADMIN_TOKEN:
+        return False
+    for name, value in scope["headers"]:
+        if name == b"x-profile-token":
+            return is_admin(value.decode("latin-1"))
+    return PROFILE_SAMPLE_RATE > 0 and scope["path"] in PROFILE_ROUTES and random.random() < PROFILE_SAMPLE_RATE
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware that profiles a request when an admin asks for it (or
+    it is sampled), stores the profile under the id returned in the
+    X-Profile-Id response header, and leaves other requests untouched.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not _wants_profile(scope) or len(_running) >= PROFILE_MAX_CONCURRENT:
+            return await self.app(scope, receive, send)
+        loop = asyncio.get_running_loop()
+        _install_task_factory(loop)
+        profile = RequestProfile(scope["method"], scope["path"], loop)
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                profile.status = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [(b"x-profile-id", profile.id.encode())]
+            await send(message)
+
+        profile.add_task(asyncio.current_task())
+        token = _ACTIVE.set(profile)
+        _running.add(profile)
+        profile.start()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            _ACTIVE.reset(token)
+            _running.discard(profile)
+            if not _running:
+                _restore_task_factory(loop)
+            await profile.stop()
+            PROFILES.set(profile.id, profile)
+            log.info("request_profiled", profile_id=profile.id, path=profile.path,
+                     duration_ms=profile.duration_ms, samples=sum(profile.stacks.values()))
+
+
+class LoopWatchdog:
+    """
+    Detects event-loop blocking: a heartbeat task ticks on the loop, and a
+    thread that sees it late samples the loop thread's stack until it
+    recovers. Each block is reported with the call it was stuck in.
+    """
+
+    def __init__(self, threshold_ms=LOOP_BLOCK_THRESHOLD_MS):
+        self.threshold = threshold_ms / 1000
+        self.interval = self.threshold / 4
+        self.recent = deque(maxlen=LOOP_BLOCK_HISTORY)
+        self.culprits = {}  # culprit -> [blocks, total_ms, max_ms]
+        self.blocks = 0
+        self._beat = 0.0
+        self._task = None
+        self._thread = None
+        self._stop = threading.Event()
+
+    def start(self):
+        if self.threshold <= 0 or self._thread is not None:
+            return
+        self._loop_thread = threading.get_ident()
+        self._beat = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.create_task(self._heartbeat())
+        self._thread = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._thread.start()
+
+    async def close(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._thread.join(timeout=1)
+        self._thread = None
+
+    async def _heartbeat(self):
+        while True:
+            self._beat = time.monotonic()
+            await asyncio.sleep(self.interval)
+
+    def _watch(self):
+        stacks, due, profiles = None, 0.0, ()
+        while not self._stop.wait(self.interval / 2):
+            beat = self._beat
+            if time.monotonic() - beat - self.interval > self.threshold:
+                frame = sys._current_frames().get(self._loop_thread)
+                if frame is not None:
+                    if stacks is None:
+                        # Requests in flight while the loop is stuck are the ones it delayed
+                        stacks, due, profiles = Counter(), beat + self.interval, list(_running)
+                    stacks[tuple(_thread_stack(frame))] += 1
+            elif stacks is not None:
+                self._record(stacks, (beat - due) * 1000, profiles)
+                stacks = None
+
+    def _record(self, stacks, duration_ms, profiles):
+        stack = stacks.most_common(1)[0][0]
+        culprit, caller = _culprit(stack) if stack else ("unknown", None)
+        block = {
+            "at": time.time(),
+            "duration_ms": round(duration_ms, 1),
+            "culprit": culprit,
+            "caller": caller,
+            "stack": ";".join(_frame_name(key) for key in stack),
+        }
+        self.blocks += 1
+        self.recent.append(block)
+        totals = self.culprits.setdefault(culprit, [0, 0.0, 0.0])
+        totals[0] += 1
+        totals[1] += duration_ms
+        totals[2] = max(totals[2], duration_ms)
+        for profile in profiles:
+            profile.blocks.append(block)
+        log.warning("event_loop_blocked", duration_ms=block["duration_ms"], culprit=culprit, caller=caller)
+
+    def report(self):
+        return {
+            "threshold_ms": self.threshold * 1000,
+            "blocks": self.blocks,
+            "culprits": sorted(
+                ({"culprit": c, "blocks": n, "total_ms": round(total, 1), "max_ms": round(worst, 1)}
+                 for c, (n, total, worst) in list(self.culprits.items())),
+                key=lambda c: c["total_ms"], reverse=True,
+            ),
+            "recent": list(self.recent)[::-1],
+        }
+
+    def stats(self):
+        worst = max(self.culprits.items(), key=lambda item: item[1][1], default=None)
+        return {
+            "threshold_ms": self.threshold * 1000,
+            "blocks": self.blocks,
+            "worst_culprit": worst[0] if worst else None,
+        }
+
+
+LOOP_WATCHDOG = LoopWatchdog()
+
+
+def profile_summaries():
+    return [profile.summary() for profile in reversed(PROFILES.values())]
+
+
+def profiling_stats():
+    return {
+        "enabled": bool(PROFILE_ADMIN_TOKEN),
+        "sample_rate": PROFILE_SAMPLE_RATE,
+        "running": len(_running),
+        "stored": len(PROFILES),
+        "loop_blocks": LOOP_WATCHDOG.stats(),
+    }
@@ -0,0 +1,182 @@
+import re
+from collections import defaultdict
+
+_TOKEN_RE = re.compile(r"[a-z0-9+#.]+")
+
+INDEXED_FIELDS = ("name", "role", "skills")
+
+
+def tokenize(text):
+    return _TOKEN_RE.findall(text.lower())
+
+
+def _field_texts(candidate, field):
+    value = candidate.get(field) or ""
+    return [v for v in value if v] if isinstance(value, list) else [value]
+
+
+def _matches(candidate, query):
+    """
+    The original linear-scan predicate: substring of name, role or a skill.
+    """
+    return (
+        query in (candidate.get("name") or "").lower()
+        or query in (candidate.get("role") or "").lower()
+        or any(query in s.lower() for s in candidate.get("skills") or [])
+    )
+
+
+class _Trie:
+    """
+    Character trie over indexed terms, used to expand a prefix into the
+    terms it covers (type-ahead and prefix search).
+    """
+
+    _END = "$"
+
+    def __init__(self):
+        self.root = {}
+
+    def add(self, term):
+        node = self.root
+        for ch in term:
+            node = node.setdefault(ch, {})
+        node[self._END] = term
+
+    def remove(self, term):
+        path = [self.root]
+        for ch in term:
+            node = path[-1].get(ch)
+            if node is None:
+                return
+            path.append(node)
+        path[-1].pop(self._END, None)
+        # Prune branches that no longer lead to any term
+        for depth in range(len(term), 0, -1):
+            if path[depth]:
+                break
+            del path[depth - 1][term[depth - 1]]
+
+    def terms(self, prefix, limit=None):
+        node = self.root
+        for ch in prefix:
+            node = node.get(ch)
+            if node is None:
+                return []
+        found = []
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            for key, child in node.items():
+                if key == self._END:
+                    found.append(child)
+                    if limit and len(found) >= limit:
+                        return found
+                else:
+                    stack.append(child)
+        return found
+
+
+class CandidateIndex:
+    """
+    In-memory candidate store with a per-field inverted index (name, role,
+    skills) and a shared term trie. Supports incremental add/remove.
+
+    search() returns the same candidates as the old substring scan for
+    queries that start at a word boundary, without touching every record.
+    """
+
+    def __init__(self, candidates=()):
+        # Postings hold insertion sequence numbers, so sorting hits by plain
+        # ints reproduces the original list order cheaply
+        self._seq_by_id = {}
+        self._by_seq = {}
+        self._seq = 0
+        self._postings = {field: defaultdict(set) for field in INDEXED_FIELDS}
+        self._trie = _Trie()
+        for candidate in candidates:
+            self.add(candidate)
+
+    def __len__(self):
+        return len(self._by_seq)
+
+    def _terms(self, candidate, field):
+        return {t for text in _field_texts(candidate, field) for t in tokenize(text)}
+
+    def add(self, candidate):
+        doc_id = candidate["id"]
+        if doc_id in self._seq_by_id:
+            self.remove(doc_id)
+        seq = self._seq
+        self._seq += 1
+        self._seq_by_id[doc_id] = seq
+        self._by_seq[seq] = candidate
+        for field in INDEXED_FIELDS:
+            postings = self._postings[field]
+            for term in self._terms(candidate, field):
+                if term not in postings:
+                    self._trie.add(term)
+                postings[term].add(seq)
+
+    def remove(self, doc_id):
+        seq = self._seq_by_id.pop(doc_id, None)
+        if seq is None:
+            return
+        candidate = self._by_seq.pop(seq)
+        for field in INDEXED_FIELDS:
+            postings = self._postings[field]
+            for term in self._terms(candidate, field):
+                ids = postings.get(term)
+                if ids is None:
+                    continue
+                ids.discard(seq)
+                if not ids:
+                    del postings[term]
+                    if not any(term in self._postings[f] for f in INDEXED_FIELDS):
+                        self._trie.remove(term)
+
+    def _field_matches(self, field, query_terms, expansions):
+        postings = self._postings[field]
+        result = None
+        for term in query_terms:
+            ids = set()
+            for expanded in expansions[term]:
+                ids |= postings.get(expanded, set())
+            result = ids if result is None else result & ids
+            if not result:
+                return set()
+        return result or set()
+
+    def search(self, query, limit=None):
+        query = query.lower().strip()
+        query_terms = tokenize(query)
+        if not query_terms:
+            return []
+        expansions = {term: self._trie.terms(term) for term in query_terms}
+        seqs = set()
+        for field in INDEXED_FIELDS:
+            seqs |= self._field_matches(field, query_terms, expansions)
+        # Confirm the phrase match so results equal the old substring scan,
+        # stopping as soon as the page is full
+        hits = []
+        for seq in sorted(seqs):
+            candidate = self._by_seq[seq]
+            if _matches(candidate, query):
+                hits.append(candidate)
+                if limit and len(hits) >= limit:
+                    break
+        return hits
+
+    def suggest(self, prefix, limit=10):
+        """
+        Type-ahead: indexed terms starting with `prefix`, most common first.
+        """
+        prefix = prefix.lower().strip()
+        if not prefix:
+            return []
+        terms = self._trie.terms(prefix)
+
+        def frequency(term):
+            return sum(len(self._postings[f].get(term, ())) for f in INDEXED_FIELDS)
+
+        return sorted(terms, key=lambda t: (-frequency(t), t))[:limit]
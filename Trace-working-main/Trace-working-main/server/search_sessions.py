@@ -0,0 +1,91 @@
+import os
+from caching import TTLCache
+
+# Result buffers expire after this many seconds and are bounded by count and size
+SEARCH_SESSION_TTL = float(os.getenv("SEARCH_SESSION_TTL", "900"))
+SEARCH_SESSION_MAX_ENTRIES = int(os.getenv("SEARCH_SESSION_MAX_ENTRIES", "512"))
+SEARCH_SESSION_MAX_BYTES = int(os.getenv("SEARCH_SESSION_MAX_BYTES", str(32 * 1024 * 1024)))
+# Cursors are tiny, so allow many more of them than result buffers
+SEARCH_CURSOR_MAX_ENTRIES = int(os.getenv("SEARCH_CURSOR_MAX_ENTRIES", "10000"))
+
+
+class SearchSessionStore:
+    """
+    Holds enriched search results per normalized query, plus a separate
+    read cursor for every (session_id, query) pair so users who type the
+    same text page through the shared buffer independently. Each buffer also
+    remembers the next upstream page to fetch when readers near its end.
+    """
+
+    def __init__(self, ttl=SEARCH_SESSION_TTL, max_entries=SEARCH_SESSION_MAX_ENTRIES,
+                 max_bytes=SEARCH_SESSION_MAX_BYTES, max_cursors=SEARCH_CURSOR_MAX_ENTRIES):
+        self.results = TTLCache(max_entries=max_entries, max_bytes=max_bytes, ttl=ttl)
+        self.cursors = TTLCache(max_entries=max_cursors, max_bytes=None, ttl=ttl)
+        # key -> next upstream page number, or None once upstream is exhausted
+        self.pages = TTLCache(max_entries=max_entries, max_bytes=None, ttl=ttl)
+
+    def get_results(self, key):
+        return self.results.get(key)
+
+    def save_results(self, key, candidates, next_page=None):
+        self.results.set(key, candidates)
+        self.pages.set(key, next_page)
+
+    def pending_page(self, key):
+        """
+        Returns the next upstream page to fetch for a live buffer, or None.
+        """
+        if self.results.peek(key) is None:
+            return None
+        return self.pages.peek(key)
+
+    def append_results(self, key, page, candidates, exhausted=False):
+        """
+        Appends one fetched upstream page to the buffer, skipping people it
+        already holds. Ignored (returns False) if the buffer was replaced or
+        already moved past `page` while it was being fetched.
+        """
+        buffered = self.results.peek(key)
+        if buffered is None or self.pages.peek(key) != page:
+            return False
+        seen = {c.get("username") for c in buffered}
+        fresh = [c for c in candidates if c.get("username") not in seen]
+        self.results.set(key, buffered + fresh)
+        self.pages.set(key, None if exhausted else page + 1)
+        return True
+
+    def unread(self, session_id, key, size=3):
+        """
+        Number of buffered candidates this session has not been shown yet.
+        """
+        candidates = self.results.peek(key)
+        if candidates is None:
+            return 0
+        return max(0, len(candidates) - self.cursors.peek((session_id, key), size))
+
+    def set_cursor(self, session_id, key, position):
+        self.cursors.set((session_id, key), position)
+
+    def next_page(self, session_id, key, size=3):
+        """
+        Returns the next `size` candidates for this session, or None when the
+        query has no live buffer. An exhausted buffer yields [].
+        """
+        candidates = self.results.get(key)
+        if candidates is None:
+            return None
+        # A session that never ran the initial search has implicitly seen page one
+        pointer = self.cursors.peek((session_id, key), size)
+        next_batch = candidates[pointer : pointer + size]
+        self.cursors.set((session_id, key), min(len(candidates), pointer + size))
+        return next_batch
+
+    def clear(self):
+        self.results.clear()
+        self.cursors.clear()
+        self.pages.clear()
+
+    def stats(self):
+        stats = self.results.stats()
+        stats["cursors"] = len(self.cursors)
+        return stats
@@ -0,0 +1,337 @@
+import asyncio
+import hashlib
+import json
+import os
+import time
+
+from caching import TTLCache
+from app_logging import get_logger
+
+# numpy is imported inside VectorIndex, which SemanticRanker only builds on first use
+
+log = get_logger("semantic")
+
+EMBED_MODEL = os.getenv("EMBED_MODEL", "nomic-embed-text")
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "32"))
+# Embeddings sit on the search path, so they get a much shorter budget than chat
+EMBED_TIMEOUT = float(os.getenv("EMBED_TIMEOUT", "5"))
+VECTOR_INDEX_DIR = os.getenv(
+    "VECTOR_INDEX_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "vector_index"),
+)
+SEMANTIC_RANKING_ENABLED = os.getenv("SEMANTIC_RANKING_ENABLED", "true").lower() in ("1", "true", "yes")
+# Share of the final ordering given to semantic similarity vs. the TRACE score
+SEMANTIC_WEIGHT = float(os.getenv("SEMANTIC_WEIGHT", "0.4"))
+# After an embedding failure (e.g. Ollama down), skip the stage for this long
+SEMANTIC_RETRY_AFTER = float(os.getenv("SEMANTIC_RETRY_AFTER", "60"))
+# New vectors are persisted at most this often, in a thread, not on every upsert
+VECTOR_INDEX_SAVE_DELAY = float(os.getenv("VECTOR_INDEX_SAVE_DELAY", "5"))
+
+
+def candidate_text(candidate):
+    """
+    The text embedded for a candidate: name, role, bio and skills.
+    """
+    skills = ", ".join(candidate.get("skills") or [])
+    parts = [candidate.get("name"), candidate.get("role"), candidate.get("bio"), f"Skills: {skills}" if skills else None]
+    return ". ".join(p for p in parts if p)
+
+
+def candidate_key(candidate):
+    if candidate.get("username"):
+        return f"github:{candidate['username']}"
+    return f"local:{candidate.get('id')}"
+
+
+def _digest(text):
+    return hashlib.sha1(text.encode()).hexdigest()
+
+
+class VectorIndex:
+    """
+    Unit-normalised embeddings in a memory-mapped float32 file, with a JSON
+    manifest mapping keys to rows and content hashes. Rows are rewritten in
+    place when a candidate's text changes and appended otherwise; the file
+    doubles in capacity as it fills. Upserts only touch memory; loading,
+    `reserve` and `save` touch the disk and are meant to run off the event
+    loop.
+    """
+
+    def __init__(self, directory=VECTOR_INDEX_DIR):
+        self.directory = directory
+        self.vectors_path = os.path.join(directory, "vectors.f32")
+        self.manifest_path = os.path.join(directory, "manifest.json")
+        self.dim = None
+        self.count = 0
+        self.rows = {}  # key -> (row, content hash)
+        self._vectors = None
+        self.dirty = False
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.manifest_path):
+            return
+        import numpy as np
+        with open(self.manifest_path) as f:
+            manifest = json.load(f)
+        self.dim = manifest["dim"]
+        self.count = manifest["count"]
+        self.rows = {key: tuple(value) for key, value in manifest["rows"].items()}
+        self._vectors = np.memmap(self.vectors_path, dtype=np.float32, mode="r+").reshape(-1, self.dim)
+
+    def snapshot(self):
+        """
+        The state `save` writes, taken on the loop so later upserts do not
+        change it mid-write. Clears the dirty flag.
+        """
+        self.dirty = False
+        return self._vectors, {"dim": self.dim, "count": self.count, "rows": dict(self.rows)}
+
+    def save(self, snapshot):
+        """
+        Flushes the vectors, then replaces the manifest, so the manifest
+        never names a row that is not on disk. Blocking; run it in a thread.
+        """
+        vectors, manifest = snapshot
+        if vectors is None:
+            return
+        vectors.flush()
+        tmp = self.manifest_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(manifest, f)
+        os.replace(tmp, self.manifest_path)
+
+    def _ensure_capacity(self, needed):
+        import numpy as np
+        capacity = 0 if self._vectors is None else self._vectors.shape[0]
+        if needed <= capacity:
+            return
+        new_capacity = max(needed, capacity * 2, 1024)
+        os.makedirs(self.directory, exist_ok=True)
+        if self._vectors is not None:
+            self._vectors.flush()
+            del self._vectors
+        # Growing the file keeps existing rows; the new tail reads as zeros
+        with open(self.vectors_path, "ab") as f:
+            f.truncate(new_capacity * self.dim * 4)
+        self._vectors = np.memmap(self.vectors_path, dtype=np.float32, mode="r+", shape=(new_capacity, self.dim))
+
+    def reserve(self, items, dim):
+        """
+        Grows the file so `upsert(items, ...)` only writes to memory.
+        Blocking; run it in a thread.
+        """
+        if self.dim is None:
+            self.dim = dim
+        self._ensure_capacity(self.count + sum(1 for key, _ in items if key not in self.rows))
+
+    def stale(self, items):
+        """
+        Returns the (key, text) pairs whose embedding is missing or outdated.
+        """
+        return [(key, text) for key, text in items if self.rows.get(key, (None, None))[1] != _digest(text)]
+
+    def upsert(self, items, vectors):
+        import numpy as np
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if self.dim is None:
+            self.dim = vectors.shape[1]
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors = vectors / np.maximum(norms, 1e-12)
+        new_keys = [key for key, _ in items if key not in self.rows]
+        self._ensure_capacity(self.count + len(new_keys))
+        for (key, text), vector in zip(items, vectors):
+            row = self.rows[key][0] if key in self.rows else self.count
+            if key not in self.rows:
+                self.count += 1
+            self._vectors[row] = vector
+            self.rows[key] = (row, _digest(text))
+        self.dirty = True
+
+    def vectors_for(self, keys):
+        import numpy as np
+        return np.stack([self._vectors[self.rows[key][0]] for key in keys])
+
+    def search(self, query_vector, k=10, keys=None):
+        """
+        Brute-force cosine top-k over the whole index, or over `keys`.
+        Returns [(key, similarity)], best first.
+        """
+        if self._vectors is None or self.count == 0:
+            return []
+        import numpy as np
+        query = np.asarray(query_vector, dtype=np.float32)
+        query = query / max(float(np.linalg.norm(query)), 1e-12)
+        if keys is None:
+            keys_by_row = {row: key for key, (row, _) in self.rows.items()}
+            sims = self._vectors[: self.count] @ query
+            k = min(k, self.count)
+            top = np.argpartition(-sims, k - 1)[:k]
+            top = top[np.argsort(-sims[top])]
+            return [(keys_by_row[int(r)], float(sims[r])) for r in top]
+        sims = self.vectors_for(keys) @ query
+        order = np.argsort(-sims)[:k]
+        return [(keys[i], float(sims[i])) for i in order]
+
+    def stats(self):
+        return {"vectors": self.count, "dim": self.dim, "path": self.vectors_path}
+
+
+class SemanticRanker:
+    """
+    Embeds candidates through the local Ollama embeddings API (only new or
+    changed ones, in batches) and re-ranks search results by similarity to
+    the query.
+    """
+
+    def __init__(self, index=None):
+        self._index = index
+        self.query_cache = TTLCache(max_entries=1024, ttl=3600, max_bytes=None)
+        self.embedded = 0
+        self.saves = 0
+        self.disabled_until = 0.0
+        self._save_task = None
+        self._save_lock = asyncio.Lock()
+        # Held while the index is opened or its file grown, both in a worker thread
+        self._index_lock = asyncio.Lock()
+
+    @property
+    def index(self):
+        """
+        The vector index, or None until the first `ensure` opens it.
+        """
+        return self._index
+
+    async def _open_index(self):
+        if self._index is None:
+            async with self._index_lock:
+                if self._index is None:
+                    # Reads the manifest and maps the vectors file
+                    self._index = await asyncio.to_thread(VectorIndex)
+        return self._index
+
+    async def _embed(self, texts):
+        from ai_engine import INFERENCE_POOL
+        vectors = []
+        for start in range(0, len(texts), EMBED_BATCH_SIZE):
+            vectors.extend(await INFERENCE_POOL.embed(EMBED_MODEL, texts[start:start + EMBED_BATCH_SIZE], timeout=EMBED_TIMEOUT))
+        return vectors
+
+    async def ensure(self, candidates):
+        index = await self._open_index()
+        items = [(candidate_key(c), candidate_text(c)) for c in candidates]
+        stale = index.stale(items)
+        if stale:
+            vectors = await self._embed([text for _, text in stale])
+            async with self._index_lock:
+                await asyncio.to_thread(index.reserve, stale, len(vectors[0]))
+                index.upsert(stale, vectors)
+            self.embedded += len(stale)
+            self._schedule_save()
+        return [key for key, _ in items]
+
+    def _schedule_save(self):
+        # Upserts within VECTOR_INDEX_SAVE_DELAY share one write
+        if self._save_task is None:
+            self._save_task = asyncio.create_task(self._save_later())
+
+    async def _save_later(self):
+        await asyncio.sleep(VECTOR_INDEX_SAVE_DELAY)
+        # Upserts from here on schedule the next save
+        self._save_task = None
+        await self.save()
+
+    async def save(self):
+        """
+        Persists pending upserts in a worker thread, one save at a time.
+        """
+        async with self._save_lock:
+            if self._index is None or not self._index.dirty:
+                return
+            try:
+                await asyncio.to_thread(self._index.save, self._index.snapshot())
+                self.saves += 1
+            except Exception as e:
+                # Still dirty, so the next upsert or shutdown tries again
+                self._index.dirty = True
+                log.warning("vector_index_save_failed", error=str(e))
+
+    async def close(self):
+        """
+        Skips the pending delay and writes what it would have.
+        """
+        if self._save_task is not None:
+            self._save_task.cancel()
+            await asyncio.gather(self._save_task, return_exceptions=True)
+            self._save_task = None
+        await self.save()
+
+    async def embed_query(self, query):
+        vector = self.query_cache.get(query)
+        if vector is None:
+            vector = (await self._embed([query]))[0]
+            self.query_cache.set(query, vector)
+        return vector
+
+    def available(self):
+        return SEMANTIC_RANKING_ENABLED and time.monotonic() >= self.disabled_until
+
+    def _failed(self, error):
+        log.debug("semantic_skipped", error=str(error))
+        self.disabled_until = time.monotonic() + SEMANTIC_RETRY_AFTER
+
+    async def rerank(self, query, candidates):
+        """
+        Orders candidates by a blend of their TRACE score and query
+        similarity, adding a `relevance` field. Returns the input unchanged
+        if embeddings are unavailable.
+        """
+        if not candidates or not query or not self.available():
+            return candidates
+        try:
+            keys = await self.ensure(candidates)
+            query_vector = await self.embed_query(query)
+        except Exception as e:
+            self._failed(e)
+            return candidates
+        similarity = dict(self.index.search(query_vector, k=len(keys), keys=keys))
+        ranked = []
+        for key, candidate in zip(keys, candidates):
+            ranked.append({**candidate, "relevance": round(similarity[key], 3)})
+        ranked.sort(
+            key=lambda c: (1 - SEMANTIC_WEIGHT) * c.get("score", 0) + SEMANTIC_WEIGHT * 100 * c["relevance"],
+            reverse=True,
+        )
+        return ranked
+
+    async def search(self, query, candidates, k=10, min_similarity=0.5):
+        """
+        Nearest candidates to `query` among `candidates` (e.g. the local
+        pool), for when keyword matching finds nothing.
+        """
+        if not candidates or not query or not self.available():
+            return []
+        try:
+            keys = await self.ensure(candidates)
+            query_vector = await self.embed_query(query)
+        except Exception as e:
+            self._failed(e)
+            return []
+        by_key = dict(zip(keys, candidates))
+        return [by_key[key] for key, sim in self.index.search(query_vector, k=k, keys=keys) if sim >= min_similarity]
+
+    def stats(self):
+        # Not opened just to report on it
+        stats = self._index.stats() if self._index is not None else {"vectors": None, "dim": None, "path": None}
+        stats.update({
+            "enabled": SEMANTIC_RANKING_ENABLED,
+            "embedded": self.embedded,
+            "saves": self.saves,
+            "unsaved": self._index is not None and self._index.dirty,
+            "query_cache": self.query_cache.stats(),
+            "backoff_remaining": round(max(0.0, self.disabled_until - time.monotonic()), 1),
+        })
+        return stats
+
+
+SEMANTIC_RANKER = SemanticRanker()